@@ -12,6 +12,7 @@ import redis
 import json
 import threading
 import time
+from redisbroadcast import shared_connection_pool
 
 
 class AdminStatusListener:
@@ -25,17 +26,22 @@ class AdminStatusListener:
     """
     def __init__(self, simulator, redis_host='redis', redis_port=6379):
         self.simulator = simulator
-        self.r = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.r = redis.Redis(connection_pool=shared_connection_pool(redis_host, redis_port))
         self.pubsub = self.r.pubsub()
         self.pubsub.subscribe('admin:scooter_status_update')
 
-        self.scooter_by_id = {sc.id: sc for sc in simulator.scooters}
-
         # Background thread - dormant until Redis publishes a message
         self.thread = threading.Thread(target=self._listen, daemon=True)
         self.thread.start()
         print("[AdminListener] Started - listening on channel 'admin:scooter_status_update'")
 
+    def scooter_by_id(self, scooter_id):
+        """
+        The simulator's scooter for an id as it arrives from Redis (None if unknown).
+        Uses the simulator's normalized id index, so scooters added later are found too.
+        """
+        return self.simulator.find_scooter(scooter_id)
+
     def _listen(self):
         """
         Process incoming admin status messages.
@@ -6,17 +6,91 @@ Holds the api-functions used in the device/simulation-container.
 import requests
 import json
 import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from config import API_BASE_URL
 
 JWT_TOKEN = os.getenv("JWT_TOKEN")
 HEADERS = {"Authorization": f"Bearer {JWT_TOKEN}", "Content-Type": "application/json"}
 
+
+def _new_session():
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    return session
+
+# One pooled keep-alive session for every simulator in the process
+SESSION = _new_session()
+
+def reset_session():
+    """ Replace the shared session, e.g. in a forked worker that must not reuse the parent's sockets. """
+    global SESSION
+    SESSION = _new_session()
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Call statistics per endpoint (served by metrics.py)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Upper bounds (seconds) of the latency histogram buckets
+HTTP_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+# Endpoint ("PUT /bikes/{id}/status/sim") -> calls, failures, summed seconds, calls per latency bucket
+HTTP_STATS = {}
+_http_stats_lock = threading.Lock()
+
+
+def record_http_call(endpoint, seconds, ok):
+    """ Count one backend call (both api.py and async_api.py): its latency, and whether it failed. """
+    with _http_stats_lock:
+        stats = HTTP_STATS.get(endpoint)
+        if stats is None:
+            stats = {"calls": 0, "failures": 0, "seconds": 0.0, "buckets": [0] * len(HTTP_LATENCY_BUCKETS)}
+            HTTP_STATS[endpoint] = stats
+
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        if not ok:
+            stats["failures"] += 1
+
+        for index, bound in enumerate(HTTP_LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][index] += 1
+                break
+
+
+def http_stats_snapshot():
+    """ Copy of HTTP_STATS, safe to hand to another thread or process. """
+    with _http_stats_lock:
+        return {endpoint: dict(stats, buckets=list(stats["buckets"])) for endpoint, stats in HTTP_STATS.items()}
+
+
+def merge_http_stats(total, stats):
+    """ Add the per-endpoint counts of stats (HTTP_STATS format, e.g. from another process) into total. """
+    for endpoint, figures in stats.items():
+        merged = total.setdefault(endpoint, {"calls": 0, "failures": 0, "seconds": 0.0, "buckets": [0] * len(HTTP_LATENCY_BUCKETS)})
+        merged["calls"] += figures["calls"]
+        merged["failures"] += figures["failures"]
+        merged["seconds"] += figures["seconds"]
+        merged["buckets"] = [a + b for a, b in zip(merged["buckets"], figures["buckets"])]
+    return total
+
+
+def reset_http_stats():
+    """ Forget all counted calls, e.g. the ones a forked worker inherited from its parent. """
+    with _http_stats_lock:
+        HTTP_STATS.clear()
+
+
 def fetch_users():
     """ Fetch all users from the backend API, and if unsuccessful, fallback on generic JohnDoe-list as a backup. """
-    url = "http://system:3000/api/v1/customers" # noqa: S112
+    url = f"{API_BASE_URL}/customers"
+    started = time.perf_counter()
     try:
-        response = requests.get(url, timeout=5, headers=HEADERS)
+        response = SESSION.get(url, timeout=5, headers=HEADERS)
         response.raise_for_status()
         customers = response.json()
+        record_http_call("GET /customers", time.perf_counter() - started, True)
         return [ 
             { 
                 "user_id": customer["customer_id"], 
@@ -25,6 +99,7 @@ def fetch_users():
             for customer in customers 
         ]
     except Exception as e:
+        record_http_call("GET /customers", time.perf_counter() - started, False)
         print("Failed to load users from API:", e)
         print("Using fallback user list.")
         return [ 
@@ -32,16 +107,20 @@ def fetch_users():
             for uid in range(1, 21) 
         ]
 
-RENTAL_API = "http://system:3000/api/v1/rentals" # noqa: S112
+RENTAL_API = f"{API_BASE_URL}/rentals"
 
 def fetch_rentals():
     """ Fetch all rentals from the backend API. """
     url = f"{RENTAL_API}"
+    started = time.perf_counter()
     try:
-        response = requests.get(url, timeout=10, headers=HEADERS)
+        response = SESSION.get(url, timeout=10, headers=HEADERS)
         response.raise_for_status()
-        return response.json()
+        rentals = response.json()
+        record_http_call("GET /rentals", time.perf_counter() - started, True)
+        return rentals
     except Exception as e:
+        record_http_call("GET /rentals", time.perf_counter() - started, False)
         print("Failed to fetch rentals from API:", e)
         return []
 
@@ -58,9 +137,11 @@ def create_rental(customer_id, bike_id, start_point, start_zone):
         "start_zone": start_zone
     }
 
+    started = time.perf_counter()
+    data = None
     try:
         print(f"[API] Creating rental -> POST {url} | payload: {json.dumps(payload)}")
-        response = requests.post(url, json=payload, timeout=10, headers=HEADERS)
+        response = SESSION.post(url, json=payload, timeout=10, headers=HEADERS)
         print(f"[API] Response {response.status_code}: {response.text}")
 
         if response.status_code == 201:
@@ -68,16 +149,17 @@ def create_rental(customer_id, bike_id, start_point, start_zone):
             rental_id = data.get("rental_id")
             if rental_id:
                 print(f"[API] Rental started successfully -> real rental_id = {rental_id}")
-                return data
             else:
                 print("[API] Rental created but no rental_id in response")
+                data = None
         else:
             print(f"[API] Failed to create rental - status {response.status_code}")
 
     except Exception as e:
         print(f"[API] Exception while creating rental: {e}")
 
-    return None
+    record_http_call("POST /rentals/sim", time.perf_counter() - started, data is not None)
+    return data
 
 def complete_rental(rental_id, end_point, end_zone, route):
     """
@@ -95,26 +177,29 @@ def complete_rental(rental_id, end_point, end_zone, route):
         "route": route
     }
 
+    started = time.perf_counter()
+    completed = False
     try:
         print(f"[API] Completing rental -> PUT {url}")
         print(f"[API] Payload size: {len(route)} points")
-        response = requests.put(url, json=payload, timeout=15, headers=HEADERS)
+        response = SESSION.put(url, json=payload, timeout=15, headers=HEADERS)
         print(f"[API] Response {response.status_code}: {response.text}")
 
         if response.status_code in (200, 204):
             print(f"[API] Rental {rental_id} completed and persisted successfully")
-            return True
+            completed = True
         else:
             print(f"[API] Failed to complete rental -> status {response.status_code}")
 
     except Exception as e:
         print(f"[API] Exception while completing rental {rental_id}: {e}")
 
-    return False
+    record_http_call("PUT /rentals/sim/{id}", time.perf_counter() - started, completed)
+    return completed
 
 
 
-BIKE_API = "http://system:3000/api/v1/bikes" 
+BIKE_API = f"{API_BASE_URL}/bikes"
 
 
 def update_bike_status(bike_id, new_status):
@@ -132,13 +217,16 @@ def update_bike_status(bike_id, new_status):
     url = f"{BIKE_API}/{bike_id}/status/sim"
     payload = {"status": new_status}
 
+    started = time.perf_counter()
+    updated = False
     try:
         print(f"[API] Updating bike status -> PUT {url} | payload: {json.dumps(payload)}")
-        response = requests.put(url, json=payload, timeout=10, headers=HEADERS)
+        response = SESSION.put(url, json=payload, timeout=10, headers=HEADERS)
         print(f"[API] Response {response.status_code}: {response.text}")
 
         if response.status_code in (200, 201, 204):
             print(f"[API] Bike {bike_id} status successfully updated to '{new_status}'")
+            updated = True
             return True
         else:
             print(f"[API] Failed to update bike {bike_id} status -> HTTP {response.status_code}")
@@ -147,6 +235,9 @@ def update_bike_status(bike_id, new_status):
     except requests.RequestException as e:
         print(f"[API] Exception while updating bike {bike_id} status: {e}")
         return False
+
+    finally:
+        record_http_call("PUT /bikes/{id}/status/sim", time.perf_counter() - started, updated)
     
 
 def update_bike_status_and_position(bike_id, new_status, lat, lng):
@@ -165,13 +256,16 @@ def update_bike_status_and_position(bike_id, new_status, lat, lng):
     url = f"{BIKE_API}/{bike_id}/status/sim"
     payload = {"status": new_status, "lat": float(lat), "lng": float(lng)}
 
+    started = time.perf_counter()
+    updated = False
     try:
         print(f"[API] Updating bike status and position -> PUT {url} | payload: {json.dumps(payload)}")
-        response = requests.put(url, json=payload, timeout=10, headers=HEADERS)
+        response = SESSION.put(url, json=payload, timeout=10, headers=HEADERS)
         print(f"[API] Response {response.status_code}: {response.text}")
 
         if response.status_code in (200, 201, 204):
             print(f"[API] Bike {bike_id} status and position successfully updated -> '{new_status}' @ ({lat}, {lng})")
+            updated = True
             return True
         else:
             print(f"[API] Failed to update bike {bike_id} status and position -> HTTP {response.status_code}")
@@ -181,3 +275,5 @@ def update_bike_status_and_position(bike_id, new_status, lat, lng):
         print(f"[API] Exception while updating bike {bike_id} status and position: {e}")
         return False
 
+    finally:
+        record_http_call("PUT /bikes/{id}/status/sim", time.perf_counter() - started, updated)
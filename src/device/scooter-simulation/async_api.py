@@ -0,0 +1,146 @@
+"""
+@module async_api
+
+Async variants of the backend writes made from the tick path, used by the async simulator
+(see async_simulator.py).
+
+Same endpoints, payloads, timeouts and logging as their blocking counterparts in api.py,
+but on one pooled httpx.AsyncClient, so the writes of a whole tick can be in flight at once
+instead of each one stalling the city for up to its timeout.
+
+The blocking functions in api.py stay as they are, for the synchronous simulators and the
+scenario scripts.
+"""
+import json
+import time
+import httpx
+from api import HEADERS, RENTAL_API, BIKE_API, record_http_call
+from config import ASYNC_MAX_CONCURRENCY
+
+
+# One pooled keep-alive client for every async simulator in the process (bound to the
+# event loop it is first used in, so it is created lazily)
+_client = None
+
+
+def get_client():
+    """ The shared AsyncClient, created on first use. """
+    global _client
+    if _client is None:
+        limits = httpx.Limits(max_connections=ASYNC_MAX_CONCURRENCY, max_keepalive_connections=ASYNC_MAX_CONCURRENCY)
+        _client = httpx.AsyncClient(headers=HEADERS, limits=limits)
+    return _client
+
+
+async def aclose():
+    """ Close the shared client, e.g. before the event loop it runs on shuts down. """
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+async def create_rental(customer_id, bike_id, start_point, start_zone):
+    """
+    Create a new rental by sending customer_id, bike_id and start_point.
+    Returns the created rental object (including rental_id) on success, None on failure.
+    """
+    url = f"{RENTAL_API}/sim"
+    payload = {
+        "customer_id": customer_id,
+        "bike_id": bike_id,
+        "start_point": start_point,
+        "start_zone": start_zone
+    }
+
+    started = time.perf_counter()
+    data = None
+    try:
+        print(f"[API] Creating rental -> POST {url} | payload: {json.dumps(payload)}")
+        response = await get_client().post(url, json=payload, timeout=10)
+        print(f"[API] Response {response.status_code}: {response.text}")
+
+        if response.status_code == 201:
+            data = response.json()
+            rental_id = data.get("rental_id")
+            if rental_id:
+                print(f"[API] Rental started successfully -> real rental_id = {rental_id}")
+            else:
+                print("[API] Rental created but no rental_id in response")
+                data = None
+        else:
+            print(f"[API] Failed to create rental - status {response.status_code}")
+
+    except Exception as e:
+        print(f"[API] Exception while creating rental: {e}")
+
+    record_http_call("POST /rentals/sim", time.perf_counter() - started, data is not None)
+    return data
+
+
+async def complete_rental(rental_id, end_point, end_zone, route):
+    """
+    Complete an existing rental by providing end_point and full route.
+    Returns True on success, False on failure.
+    """
+    if not route:
+        print(f"[API] No route coordinates to send for rental {rental_id}")
+        return False
+
+    url = f"{RENTAL_API}/sim/{rental_id}"
+    payload = {
+        "end_point": end_point,
+        "end_zone": end_zone,
+        "route": route
+    }
+
+    started = time.perf_counter()
+    completed = False
+    try:
+        print(f"[API] Completing rental -> PUT {url}")
+        print(f"[API] Payload size: {len(route)} points")
+        response = await get_client().put(url, json=payload, timeout=15)
+        print(f"[API] Response {response.status_code}: {response.text}")
+
+        if response.status_code in (200, 204):
+            print(f"[API] Rental {rental_id} completed and persisted successfully")
+            completed = True
+        else:
+            print(f"[API] Failed to complete rental -> status {response.status_code}")
+
+    except Exception as e:
+        print(f"[API] Exception while completing rental {rental_id}: {e}")
+
+    record_http_call("PUT /rentals/sim/{id}", time.perf_counter() - started, completed)
+    return completed
+
+
+async def update_bike_status_and_position(bike_id, new_status, lat, lng):
+    """
+    Update the status and coordinates of a given bike via the backend API
+    (see api.update_bike_status_and_position).
+    """
+    url = f"{BIKE_API}/{bike_id}/status/sim"
+    payload = {"status": new_status, "lat": float(lat), "lng": float(lng)}
+
+    started = time.perf_counter()
+    updated = False
+    try:
+        print(f"[API] Updating bike status and position -> PUT {url} | payload: {json.dumps(payload)}")
+        response = await get_client().put(url, json=payload, timeout=10)
+        print(f"[API] Response {response.status_code}: {response.text}")
+
+        if response.status_code in (200, 201, 204):
+            print(f"[API] Bike {bike_id} status and position successfully updated -> '{new_status}' @ ({lat}, {lng})")
+            updated = True
+            return True
+        else:
+            print(f"[API] Failed to update bike {bike_id} status and position -> HTTP {response.status_code}")
+            return False
+
+    except httpx.HTTPError as e:
+        print(f"[API] Exception while updating bike {bike_id} status and position: {e}")
+        return False
+
+    finally:
+        record_http_call("PUT /bikes/{id}/status/sim", time.perf_counter() - started, updated)
@@ -0,0 +1,225 @@
+"""
+@module async_simulator
+
+Async variants of the simulators, for an asyncio run loop.
+
+In the synchronous simulators every backend write (bike status, rental create/complete) and
+every Redis read blocks the tick where it happens, so one slow backend call stalls the
+entire city. Here the tick itself is unchanged - still one synchronous pass over the fleet -
+but the writes it makes are only recorded, and sent once the pass is done:
+
+1. the tick's Redis writes go out in one pipeline (AsyncScooterBroadcaster.flush)
+2. the backend writes run concurrently, at most max_concurrency at a time, while the
+   writes of any one scooter keep the order they were made in
+3. the Redis writes made by those (completed rentals) go out in a second pipeline
+
+A rental started this tick runs under its generated rental_id until the backend has
+answered; the real rental_id is then adopted and its recorded coordinates renamed, before
+the next tick. The create and complete calls of a rental share one id holder, so a rental
+that also ends this tick is completed under the real rental_id as well. Locally, statuses are applied right away, exactly as in the synchronous path
+(which also applies them whether the DB write succeeded or not).
+
+The run loop awaits advance_phase_async() instead of calling advance_phase(); see
+scenarios/simulation_helper.run_simulation_async.
+"""
+
+import asyncio
+import time
+from functools import partial
+
+import async_api
+from simulator import Simulator
+from fleet_simulator import FleetSimulator
+from config import ASYNC_MAX_CONCURRENCY
+
+
+class AsyncTickMixin:
+    """
+    Defers the backend writes of a Simulator (either engine) to the end of the tick, and sends
+    them concurrently. Needs an AsyncScooterBroadcaster as rbroadcast.
+    """
+    def __init__(self, *args, max_concurrency=ASYNC_MAX_CONCURRENCY, **kwargs):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+
+        # Backend writes made this tick, not sent yet: scooter id -> calls in the order made
+        self._deferred_writes = {}
+
+        # Rentals created this tick: generated rental_id -> [rental_id], the real one once known
+        self._created_rental_ids = {}
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Async tick and phase
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    async def tick_async(self, slot=None):
+        """
+        tick(), then send everything it wrote.
+        """
+        self.profiler.begin_tick()
+        self.tick(slot)
+        await self.send_deferred_writes()
+        self.profiler.end_tick()
+
+    async def advance_phase_async(self, slot=0):
+        """
+        Tick and publish one phase slot, then send everything it wrote (see Simulator.advance_phase).
+        """
+        started = time.perf_counter()
+        published_before = self.rbroadcast.states_published
+        ops_before, bytes_before = self.rbroadcast.redis_ops, self.rbroadcast.redis_bytes
+        self.profiler.begin_tick()
+
+        self.tick(slot if self.phase_slots > 1 else None)
+        self.profiler.timed("redis", self.publish_states, self.scooters_in_slot(slot))
+        await self.send_deferred_writes()
+        self.profiler.end_tick()
+
+        self.phase_load[slot] = {
+            "scooters": len(self.scooters_in_slot(slot)),
+            "published": self.rbroadcast.states_published - published_before,
+            "redis_ops": self.rbroadcast.redis_ops - ops_before,
+            "redis_bytes": self.rbroadcast.redis_bytes - bytes_before,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    async def send_deferred_writes(self):
+        """
+        Send the buffered Redis writes, then the deferred backend writes - concurrently across
+        scooters and in order per scooter - then the Redis writes those made.
+        """
+        profiler = self.profiler
+
+        started = time.perf_counter()
+        await self.rbroadcast.flush()
+        profiler.add("redis", time.perf_counter() - started)
+
+        writes, self._deferred_writes = self._deferred_writes, {}
+        self._created_rental_ids = {}
+        if not writes:
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send_in_order(calls):
+            async with semaphore:
+                for call in calls:
+                    await call()
+
+        # Wall time of the concurrent writes (the Redis reads among them included)
+        started, attributed = time.perf_counter(), profiler.attributed
+        results = await asyncio.gather(
+            *(send_in_order(calls) for calls in writes.values()),
+            return_exceptions=True
+        )
+        profiler.add("backend_http", time.perf_counter() - started - (profiler.attributed - attributed))
+
+        for scooter_id, result in zip(writes, results):
+            if isinstance(result, Exception):
+                print(f"[AsyncSimulator] WARNING: Deferred write failed: scooter {scooter_id} | {result}")
+
+        started = time.perf_counter()
+        await self.rbroadcast.flush()
+        profiler.add("redis", time.perf_counter() - started)
+
+    def _defer(self, scooter_id, call):
+        self._deferred_writes.setdefault(scooter_id, []).append(call)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Deferred backend writes (overriding the blocking ones in Simulator)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _update_bike_status_position_db_first(self, scooter, new_status):
+        self._defer(scooter.id, partial(self._send_status_and_position, scooter.id, new_status, scooter.lat, scooter.lng))
+
+    async def _send_status_and_position(self, scooter_id, new_status, lat, lng):
+        try:
+            success = await async_api.update_bike_status_and_position(scooter_id, new_status, lat, lng)
+            if success:
+                print(f"[Simulator] Status and position updated: scooter {scooter_id} -> '{new_status}' @ ({lat}, {lng})")
+            else:
+                print(f"[Simulator] WARNING: Status+position update failed: scooter {scooter_id} -> '{new_status}'")
+        except Exception as e:
+            print(f"[Simulator] WARNING: Status+position update threw: scooter {scooter_id} -> '{new_status}' | {e}")
+
+    def _create_rental_db_first(self, scooter, rental_state):
+        rental_id = [rental_state.rental_id]
+        self._created_rental_ids[rental_state.rental_id] = rental_id
+
+        self._defer(scooter.id, partial(
+            self._send_create_rental,
+            scooter.id,
+            rental_state,
+            rental_id,
+            {"lat": float(scooter.lat), "lng": float(scooter.lng)},
+        ))
+
+    async def _send_create_rental(self, scooter_id, rental_state, rental_id, start_point):
+        real_data = await async_api.create_rental(
+            customer_id=rental_state.user_id,
+            bike_id=scooter_id,
+            start_point=start_point,
+            start_zone=rental_state.start_zone,
+        )
+
+        generated_id = rental_id[0]
+        real_id = real_data.get("rental_id") if isinstance(real_data, dict) else None
+        if real_id and real_id != generated_id:
+            # Shared with a completion deferred this tick, which runs after this call
+            rental_id[0] = real_id
+            if rental_state.rental_id == generated_id:
+                rental_state.rental_id = real_id
+            self.rbroadcast.rename_coords(generated_id, real_id)
+
+    def _complete_rental_and_publish(self, scooter, rental_state, end_zone, current_time):
+        """
+        Complete rental via API, then publish summary to Redis - after the tick, on a snapshot
+        of the rental (the rental state is reset before then). A rental created this tick is
+        completed under the rental_id its create call resolves.
+        """
+        if not rental_state.active or not rental_state.rental_id:
+            return None
+
+        rental_state.end_zone = end_zone
+        end_point = {"lat": float(scooter.lat), "lng": float(scooter.lng)}
+        rental_id = self._created_rental_ids.get(rental_state.rental_id, [rental_state.rental_id])
+
+        self._defer(scooter.id, partial(
+            self._send_complete_rental,
+            scooter,
+            rental_state.copy(),
+            rental_id,
+            end_point,
+            current_time,
+        ))
+        return None
+
+    async def _send_complete_rental(self, scooter, rental_state, rental_id, end_point, current_time):
+        rental_state.rental_id = rental_id[0]
+        path_coordinates = await self.rbroadcast.load_coords(rental_state.rental_id)
+
+        # Ensure last coordinate has 0 speed (realistic stop)
+        if path_coordinates:
+            path_coordinates[-1]["spd"] = 0.0
+
+        await async_api.complete_rental(
+            rental_id=rental_state.rental_id,
+            end_point=end_point,
+            end_zone=rental_state.end_zone,
+            route=path_coordinates,
+        )
+
+        self._publish_completed_rental(scooter, rental_state, current_time, path_coordinates)
+
+
+class AsyncSimulator(AsyncTickMixin, Simulator):
+    """
+    The classic per-scooter Simulator with backend writes sent concurrently after each tick.
+    """
+
+
+class AsyncFleetSimulator(AsyncTickMixin, FleetSimulator):
+    """
+    The NumPy FleetSimulator with backend writes sent concurrently after each tick.
+    """
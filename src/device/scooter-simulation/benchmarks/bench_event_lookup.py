@@ -0,0 +1,150 @@
+"""
+@module bench_event_lookup
+
+Benchmark for applying bursts of admin and rental events (Simulator.find_scooter).
+
+Builds a fleet of N scooters, queues a burst of admin status updates and of external rental
+starts for random scooters - with string ids, as they arrive from Redis - and times one
+application of each burst at the top of a tick. It is measured twice: with the normalized
+id index, and with the former linear scans (exact, then int-coerced, then str-coerced match)
+patched back in. Redis and the backend API are replaced by offline stand-ins.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_event_lookup.py --scooters 10000 --events 1000
+"""
+
+import os
+import argparse
+import contextlib
+import random
+import time
+
+# Fail fast on any backend call that is not stubbed below
+os.environ.setdefault("SIM_API_URL", "http://127.0.0.1:9/api/v1")
+
+from bench_sharding import NullRedis, USERS, install_offline_backend, stand_in_city
+from simulator import Simulator
+from scooter import Scooter
+from redisbroadcast import ScooterBroadcaster
+from clock import VirtualClock
+from scenarios.routes.v1.routes import MALMOE_ROUTES
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# The former lookup (three linear scans)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def linear_find_scooter(scooters, scooter_id):
+    for scooter in scooters:
+        if scooter.id == scooter_id:
+            return scooter
+
+    try:
+        target_id_int = int(scooter_id)
+        for scooter in scooters:
+            if scooter.id == target_id_int:
+                return scooter
+    except (TypeError, ValueError):
+        pass
+
+    target_id_str = str(scooter_id)
+    for scooter in scooters:
+        if str(scooter.id) == target_id_str:
+            return scooter
+
+    return None
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Fleet and bursts
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def build(count, city, linear=False):
+    """
+    A Simulator with `count` stationary scooters, optionally with the former lookup.
+    """
+    rng = random.Random(7)
+    scooters = []
+    for sid in range(1, count + 1):
+        lat, lng = rng.choice(MALMOE_ROUTES[rng.choice(list(MALMOE_ROUTES))])
+        scooter = Scooter(sid=sid, lat=lat, lng=lng, battery=rng.uniform(30, 100))
+        scooter.status = "available"
+        scooters.append(scooter)
+
+    rbroadcast = ScooterBroadcaster()
+    rbroadcast.r = NullRedis()
+
+    simulator = Simulator(scooters=scooters, routes={}, city=city, rbroadcast=rbroadcast, clock=VirtualClock())
+    simulator.user_pool = list(USERS)
+
+    if linear:
+        simulator.find_scooter = lambda scooter_id: linear_find_scooter(simulator.scooters, scooter_id)
+
+    return simulator
+
+
+def queue_bursts(simulator, events, seed=11):
+    rng = random.Random(seed)
+    count = len(simulator.scooters)
+
+    for _ in range(events):
+        simulator.enqueue_admin_status_update(str(rng.randint(1, count)), rng.choice(["needService", "available"]))
+
+    for position in range(events):
+        simulator.enqueue_rental_event({
+            "type": "rental_started",
+            "scooter_id": str(rng.randint(1, count)),
+            "rental_id": f"bench-{position}",
+            "user_id": 1,
+            "user_name": "JohnDoe1",
+        })
+
+
+def measure(count, events, city, linear):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        simulator = build(count, city, linear=linear)
+        queue_bursts(simulator, events)
+        now = simulator.clock.time()
+
+        started = time.perf_counter()
+        simulator._apply_queued_admin_status_updates(now)
+        admin = time.perf_counter() - started
+
+        started = time.perf_counter()
+        simulator._apply_external_rental_events(now)
+        rental = time.perf_counter() - started
+
+    external = sum(state.external_active for state in simulator.states.values())
+    return admin, rental, external
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scooters", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--events", type=int, default=1_000)
+    args = parser.parse_args()
+
+    install_offline_backend()
+    city = stand_in_city({rid: wps for rid, wps in MALMOE_ROUTES.items() if len(wps) >= 2})
+
+    print(f"{args.events}-event bursts (admin updates, then rental starts), string ids")
+    print()
+    print(f"{'scooters':>9} {'lookup':>7} {'admin ms':>9} {'rental ms':>10} {'speedup':>8}")
+
+    for count in args.scooters:
+        results = {}
+        for lookup, linear in (("linear", True), ("index", False)):
+            results[lookup] = measure(count, args.events, city, linear)
+
+        # Both lookups must resolve the same scooters
+        assert results["linear"][2] == results["index"][2]
+
+        for lookup, (admin, rental, _) in results.items():
+            linear_total = sum(results["linear"][:2])
+            print(
+                f"{count:>9} {lookup:>7} {admin * 1000:>9.1f} {rental * 1000:>10.1f} "
+                f"{linear_total / (admin + rental):>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
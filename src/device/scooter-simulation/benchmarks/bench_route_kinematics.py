@@ -0,0 +1,161 @@
+"""
+@module bench_route_kinematics
+
+Benchmark for the batched route kinematics kernel (kinematics.route_kinematics) against
+the per-scooter path (Simulator.compute_update).
+
+Places N moving scooters at random points along the real Malmö/Karlskrona/Umeå routes,
+checks that the kernel reproduces compute_update exactly (also on long, multi-waypoint
+ticks), and reports the per-tick cost of both paths at 1k/10k/100k moving scooters.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_route_kinematics.py
+"""
+
+import argparse
+import random
+import time
+import numpy as np
+
+from kinematics import route_kinematics
+from fleet import PackedRoutes
+from simulator import Simulator
+from scooter_state import ScooterState
+from route_table import compile_routes
+from config import UPDATE_INTERVAL
+from scenarios.routes.v1.routes import MALMOE_ROUTES, KARLSKRONA_ROUTES, UMEA_ROUTES
+
+
+def all_routes():
+    """
+    Every real route with at least two waypoints, keyed by a running route id.
+    """
+    routes = {}
+    for city_routes in (MALMOE_ROUTES, KARLSKRONA_ROUTES, UMEA_ROUTES):
+        for waypoints in city_routes.values():
+            if len(waypoints) >= 2:
+                routes[len(routes)] = list(waypoints)
+    return routes
+
+
+ROUTES = all_routes()
+ROUTE_TABLES = compile_routes(ROUTES)
+PACKED_ROUTES = PackedRoutes(ROUTE_TABLES)
+
+
+def place_scooters(count, seed=42):
+    """
+    Random (route id, reversed, position, target index) per scooter.
+    Scooters sit somewhere on the segment leading to their target waypoint.
+    """
+    rng = random.Random(seed)
+    route_ids = list(ROUTES)
+    fleet = []
+
+    for _ in range(count):
+        route_id = rng.choice(route_ids)
+        reverse = rng.random() < 0.5
+        route = ROUTES[route_id][::-1] if reverse else ROUTES[route_id]
+        index = rng.randrange(1, len(route))
+        (lat_a, lng_a), (lat_b, lng_b) = route[index - 1], route[index]
+        t = rng.random()
+        fleet.append((route_id, reverse, lat_a + (lat_b - lat_a) * t, lng_a + (lng_b - lng_a) * t, index))
+
+    return fleet
+
+
+def batched_inputs(fleet, elapsed_time=UPDATE_INTERVAL):
+    return {
+        "lat": np.array([s[2] for s in fleet]),
+        "lng": np.array([s[3] for s in fleet]),
+        "route_slot": np.array([PACKED_ROUTES.slot(s[0]) for s in fleet]),
+        "route_index": np.array([s[4] for s in fleet]),
+        "reverse": np.array([s[1] for s in fleet]),
+        "routes": PACKED_ROUTES,
+        "elapsed_time": elapsed_time,
+    }
+
+
+class _Scooter:
+    def __init__(self, sid, lat, lng):
+        self.id = sid
+        self.lat = lat
+        self.lng = lng
+
+
+def scalar_simulator(fleet, elapsed_time=UPDATE_INTERVAL):
+    """
+    A Simulator carrying only the state compute_update reads (skips __init__, which
+    talks to the backend).
+    """
+    simulator = Simulator.__new__(Simulator)
+    simulator.tick_interval = elapsed_time
+    simulator.states = {sid: ScooterState(s[2], s[3], route_index=s[4]) for sid, s in enumerate(fleet)}
+    return simulator
+
+
+def run_scalar(fleet, elapsed_time=UPDATE_INTERVAL):
+    simulator = scalar_simulator(fleet, elapsed_time)
+    directions = [ROUTE_TABLES[s[0]].for_trip(int(s[1])) for s in fleet]
+    return [
+        simulator.compute_update(_Scooter(sid, s[2], s[3]), direction)
+        for sid, (s, direction) in enumerate(zip(fleet, directions))
+    ], simulator
+
+
+def check_parity(fleet, elapsed_time=UPDATE_INTERVAL):
+    """
+    The kernel must reproduce compute_update exactly (positions, speed, index, flags).
+    """
+    scalar, simulator = run_scalar(fleet, elapsed_time)
+    batched = route_kinematics(**batched_inputs(fleet, elapsed_time))
+
+    for sid, update in enumerate(scalar):
+        assert update["lat"] == batched["lat"][sid], sid
+        assert update["lng"] == batched["lng"][sid], sid
+        assert update["speed_kmh"] == batched["speed_kmh"][sid], sid
+        assert update["route_finished"] == batched["route_finished"][sid], sid
+        assert simulator.states[sid].route_index == batched["route_index"][sid], sid
+
+    return len(scalar)
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scalar-max", type=int, default=100_000,
+                        help="skip the per-scooter path above this fleet size")
+    args = parser.parse_args()
+
+    # Long ticks make scooters cross several waypoints (and route ends) per tick
+    for elapsed_time in (UPDATE_INTERVAL, 60.0, 600.0):
+        checked = check_parity(place_scooters(5_000, seed=7), elapsed_time)
+        print(f"Parity: kernel matches compute_update for {checked} scooters ({elapsed_time:.0f}s ticks)")
+    print()
+    print(f"{'moving':>10} {'kernel ms/tick':>16} {'per-scooter ms/tick':>20} {'speedup':>9}")
+
+    for size in args.sizes:
+        fleet = place_scooters(size)
+        inputs = batched_inputs(fleet)
+        kernel = best_of(args.repeats, lambda: route_kinematics(**inputs))
+
+        if size <= args.scalar_max:
+            scalar = best_of(1, lambda: run_scalar(fleet))
+            print(f"{size:>10} {kernel * 1000:>16.2f} {scalar * 1000:>20.2f} {scalar / kernel:>8.1f}x")
+        else:
+            print(f"{size:>10} {kernel * 1000:>16.2f} {'-':>20} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+@module bench_sharding
+
+Throughput benchmark for the sharded simulator (sharding.ShardedSimulator).
+
+Plans N scooters on the real Malmö routes inside a stand-in city, then measures
+scooter-ticks per second for an increasing number of worker processes. Redis and the
+backend API are replaced by offline stand-ins in every worker, so only the simulation
+itself is measured. Scaling can only be near-linear up to the number of free CPU cores.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_sharding.py --scooters 20000 --workers 1 2 4 8
+"""
+
+import os
+import sys
+import argparse
+import random
+import time
+
+# Fail fast on any backend call that is not stubbed below
+os.environ.setdefault("SIM_API_URL", "http://127.0.0.1:9/api/v1")
+
+from city import City
+from sharding import ShardedSimulator
+from clock import VirtualClock
+from scenarios.routes.v1.routes import MALMOE_ROUTES
+from fakes import stand_in_zones
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Offline stand-ins for Redis and the backend
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class NullRedis:
+    """
+    Accepts every write and drops it.
+    """
+    def pipeline(self, transaction=True):
+        return NullRedis()
+
+    def execute(self):
+        return []
+
+    def lrange(self, key, start, end):
+        return []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+USERS = [{"user_id": uid, "user_name": f"JohnDoe{uid}"} for uid in range(1, 201)]
+
+
+def _create_rental(**kwargs):
+    return {"rental_id": f"bench-{random.getrandbits(40):x}"}
+
+
+def install_offline_backend(simulator=None, shard_id=None):
+    """
+    Worker initializer: stub the backend calls, silence Redis and the per-scooter logging
+    for this process.
+    """
+    import simulator as simulator_module
+
+    simulator_module.create_rental = _create_rental
+    simulator_module.complete_rental = lambda **kwargs: True
+    simulator_module.update_bike_status_and_position = lambda *args, **kwargs: True
+
+    if simulator is not None:
+        simulator.rbroadcast.r = NullRedis()
+        sys.stdout = open(os.devnull, "w")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Stand-in city and fleet
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def stand_in_city(routes):
+    """
+    City zone around all routes, with one slow/parking/charging zone on every route.
+    """
+    return City("Bench", stand_in_zones(routes))
+
+
+def build(workers, scooters, engine, seed=42):
+    """
+    A ShardedSimulator with `scooters` route-assigned scooters spread over all routes.
+    """
+    rng = random.Random(seed)
+    routes = {route_id: waypoints for route_id, waypoints in MALMOE_ROUTES.items() if len(waypoints) >= 2}
+    route_ids = list(routes)
+
+    simulator = ShardedSimulator(
+        scooters=[],
+        routes=routes,
+        city=stand_in_city(routes),
+        shards=workers,
+        engine=engine,
+        clock=VirtualClock(),
+        initializer=install_offline_backend
+    )
+    simulator.user_pool = USERS
+
+    for sid in range(1, scooters + 1):
+        route_id = rng.choice(route_ids)
+        waypoint_index = rng.randrange(len(routes[route_id]))
+        lat, lng = routes[route_id][waypoint_index]
+
+        scooter = simulator.create_scooter(sid=sid, lat=lat, lng=lng, battery=rng.uniform(30, 100))
+        scooter.status = "available"
+        simulator.scooters.append(scooter)
+        simulator.register_scooter(scooter, route_id=route_id, waypoint_index=waypoint_index)
+
+    return simulator
+
+
+def measure(workers, scooters, ticks, warmup, engine):
+    simulator = build(workers, scooters, engine)
+    try:
+        simulator.start()
+        for _ in range(warmup):
+            simulator.tick()
+            simulator.clock.advance(simulator.tick_interval)
+
+        started = time.perf_counter()
+        for _ in range(ticks):
+            simulator.tick()
+            simulator.clock.advance(simulator.tick_interval)
+        elapsed = time.perf_counter() - started
+    finally:
+        simulator.close()
+
+    return elapsed / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scooters", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--engine", choices=("classic", "fleet"), default="classic")
+    args = parser.parse_args()
+
+    install_offline_backend()
+
+    print(f"{args.scooters} scooters, {args.engine} engine, {os.cpu_count()} CPU core(s)")
+    print()
+    print(f"{'workers':>8} {'ms/tick':>10} {'scooter-ticks/s':>16} {'speedup':>9} {'efficiency':>11}")
+
+    baseline = None
+    for workers in args.workers:
+        per_tick = measure(workers, args.scooters, args.ticks, args.warmup, args.engine)
+        baseline = baseline or per_tick * args.workers[0]
+        speedup = baseline / per_tick
+        print(
+            f"{workers:>8} {per_tick * 1000:>10.1f} {args.scooters / per_tick:>16.0f} "
+            f"{speedup:>8.2f}x {speedup / workers:>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+@module bench_simulation
+
+End-to-end simulator benchmark, with no network: the real city setup (City.from_api, user
+pool, scooter activation) and tick path (advance_phase) against an in-process Redis and
+backend API (see fakes.py), each with a configurable latency.
+
+For every city and fleet size, in a fresh process, it loads the city's real routes with a
+stand-in zone set (or, for "synthetic", a generated city - see scenarios/synthetic_city.py),
+introduces the scooters the way the scenario scripts do, and measures:
+
+- startup: seconds from setup to the end of the first tick
+- ticks per second, tick duration (mean/p50/max) and tick cost per scooter
+- RSS after the run, and peak RSS
+- Redis commands, round trips and payload bytes per tick
+- backend HTTP requests per tick, by endpoint
+
+Results are written as JSON (with the commit they were measured on), so runs on different
+commits can be compared with --compare.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_simulation.py --scooters 1000 10000 100000
+    PYTHONPATH=. python benchmarks/bench_simulation.py --cities malmoe --scooters 1000 --output new.json --compare old.json
+    PYTHONPATH=. python benchmarks/bench_simulation.py --cities synthetic --scooters 10000 --seed 7
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from scenarios.routes.v1.routes import MALMOE_ROUTES, KARLSKRONA_ROUTES, UMEA_ROUTES
+from scenarios.routes.v1.cache.route_waypoint_cache import ROUTE_WAYPOINT_CACHE_BY_CITY
+from scenarios.synthetic_city import generate_city
+from fakes import FakeRedis, FakeBackend, stand_in_zones
+
+
+# City key -> (city name as in the backend, routes, key in the route waypoint cache)
+CITIES = {
+    "malmoe": ("Malmö", MALMOE_ROUTES, "Malmoe"),
+    "karlskrona": ("Karlskrona", KARLSKRONA_ROUTES, "Karlskrona"),
+    "umea": ("Umeå", UMEA_ROUTES, "Umea"),
+}
+
+# Generated on demand (generate_city with its default scale)
+SYNTHETIC = "synthetic"
+
+CUSTOMERS = 2000
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# One benchmark case (runs in its own process)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def run_case(city_key, scooters, engine, ticks, warmup, http_latency, redis_latency, seed=42):
+    import api
+    from config import API_BASE_URL
+    from clock import VirtualClock
+    from scenarios.simulation_helper import setup_city_simulation, load_route_assigned_scooters_in_batches
+
+    if city_key == SYNTHETIC:
+        synthetic = generate_city(seed=seed)
+        city_name, routes, zones, cache_key = synthetic.name, synthetic.routes, synthetic.zones, None
+    else:
+        city_name, routes, cache_key = CITIES[city_key]
+        routes = {route_id: waypoints for route_id, waypoints in routes.items() if waypoints}
+        zones = stand_in_zones(routes)
+
+    backend = FakeBackend(API_BASE_URL, zones={city_name: zones}, customers=CUSTOMERS, latency=http_latency)
+    backend.install(api.SESSION)
+    fake_redis = FakeRedis(latency=redis_latency)
+
+    # The simulator logs every backend call and status change
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+
+        simulator, fleet, ordered_routes, next_sid = setup_city_simulation(
+            city_name=city_name,
+            routes=routes,
+            start_sid=1,
+            user_id_min=1,
+            user_id_max=CUSTOMERS,
+            engine=engine
+        )
+        simulator.rbroadcast.r = fake_redis
+        simulator.clock = VirtualClock()
+
+        load_route_assigned_scooters_in_batches(
+            simulator=simulator,
+            scooters=fleet,
+            ordered_routes=ordered_routes,
+            next_sid=next_sid,
+            num_batches=math.ceil(scooters / len(ordered_routes)),
+            max_sid=scooters,
+            route_waypoint_cache=ROUTE_WAYPOINT_CACHE_BY_CITY.get(cache_key)
+        )
+        setup_requests = dict(backend.requests)
+
+        def tick():
+            simulator.advance_phase(0)
+            simulator.clock.advance(simulator.tick_interval)
+
+        tick()
+        startup = time.perf_counter() - started
+
+        for _ in range(warmup):
+            tick()
+
+        redis_before = (sum(fake_redis.commands.values()), fake_redis.round_trips, simulator.rbroadcast.redis_bytes)
+        http_before = backend.requests.copy()
+
+        durations = []
+        for _ in range(ticks):
+            tick_started = time.perf_counter()
+            tick()
+            durations.append(time.perf_counter() - tick_started)
+
+    commands, round_trips, redis_bytes = (
+        sum(fake_redis.commands.values()) - redis_before[0],
+        fake_redis.round_trips - redis_before[1],
+        simulator.rbroadcast.redis_bytes - redis_before[2],
+    )
+    http = backend.requests - http_before
+    mean = statistics.fmean(durations)
+
+    return {
+        "city": city_name,
+        "scooters": len(fleet),
+        "engine": engine,
+        "startup_s": round(startup, 3),
+        "ticks_per_s": round(1 / mean, 3),
+        "tick_ms": {
+            "mean": round(mean * 1000, 2),
+            "p50": round(statistics.median(durations) * 1000, 2),
+            "max": round(max(durations) * 1000, 2),
+        },
+        "per_scooter_us": round(mean / len(fleet) * 1e6, 3),
+        "rss_mb": round(_current_rss() / 2**20, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "redis_per_tick": {
+            "commands": round(commands / ticks, 1),
+            "round_trips": round(round_trips / ticks, 1),
+            "bytes": round(redis_bytes / ticks),
+        },
+        "http_per_tick": {
+            "requests": round(sum(http.values()) / ticks, 2),
+            "by_endpoint": {label: round(count / ticks, 2) for label, count in sorted(http.items())},
+        },
+        "setup_http_requests": setup_requests,
+    }
+
+
+def _current_rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_isolated(*args):
+    """
+    run_case in a fresh process, so startup and RSS figures do not carry over between cases.
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_case, args)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Results
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def git_revision():
+    """
+    (commit, has uncommitted changes) of the working tree, (None, None) outside git.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "."], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+
+    previous = {(case["city"], case["scooters"], case["engine"]): case for case in baseline["results"]}
+    print()
+    print(f"Compared with {baseline_path} (commit {str(baseline.get('commit'))[:10]})")
+    print(f"{'city':>12} {'scooters':>9} {'ticks/s':>14} {'us/scooter':>16} {'peak RSS MB':>18}")
+
+    for case in results:
+        old = previous.get((case["city"], case["scooters"], case["engine"]))
+        if old is None:
+            continue
+        print(
+            f"{case['city']:>12} {case['scooters']:>9} "
+            f"{_change(old['ticks_per_s'], case['ticks_per_s']):>14} "
+            f"{_change(old['per_scooter_us'], case['per_scooter_us']):>16} "
+            f"{_change(old['peak_rss_mb'], case['peak_rss_mb']):>18}"
+        )
+
+
+def _change(old, new):
+    return f"{new:g} ({(new - old) / old:+.0%})" if old else f"{new:g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", choices=sorted(CITIES) + [SYNTHETIC], nargs="+", default=["malmoe", "karlskrona", "umea"])
+    parser.add_argument("--scooters", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--engine", choices=("classic", "fleet"), default="classic")
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--http-latency-ms", type=float, default=0.0, help="added to every backend request")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="added to every Redis round trip")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the synthetic city")
+    parser.add_argument("--output", default="bench_simulation.json", help="JSON results file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    print(f"{args.engine} engine, {os.cpu_count()} CPU core(s), commit {str(commit)[:10]}{' (modified)' if dirty else ''}")
+    print(f"HTTP latency {args.http_latency_ms} ms, Redis latency {args.redis_latency_ms} ms")
+    print()
+    print(
+        f"{'city':>12} {'scooters':>9} {'startup s':>10} {'ticks/s':>9} {'ms/tick':>9} {'us/scooter':>11} "
+        f"{'RSS MB':>8} {'redis/tick':>11} {'http/tick':>10}"
+    )
+
+    results = []
+    for city_key in args.cities:
+        for scooters in args.scooters:
+            case = run_isolated(
+                city_key, scooters, args.engine, args.ticks, args.warmup,
+                args.http_latency_ms / 1000, args.redis_latency_ms / 1000, args.seed
+            )
+            results.append(case)
+            print(
+                f"{case['city']:>12} {case['scooters']:>9} {case['startup_s']:>10.2f} {case['ticks_per_s']:>9.2f} "
+                f"{case['tick_ms']['mean']:>9.1f} {case['per_scooter_us']:>11.2f} {case['peak_rss_mb']:>8.1f} "
+                f"{case['redis_per_tick']['commands']:>11.0f} {case['http_per_tick']['requests']:>10.1f}",
+                flush=True
+            )
+
+    report = {
+        "benchmark": "bench_simulation",
+        "commit": commit,
+        "modified": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "engine": args.engine,
+            "ticks": args.ticks,
+            "warmup": args.warmup,
+            "http_latency_ms": args.http_latency_ms,
+            "redis_latency_ms": args.redis_latency_ms,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print()
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+@module bench_state_memory
+
+Memory and lookup benchmark for the per-scooter simulation state (scooter_state.ScooterState).
+
+Registers N scooters twice - once as slotted ScooterState objects in one dict (the current
+layout), once in the former layout of parallel dicts and lock sets keyed by scooter id -
+and reports the bytes allocated per scooter (tracemalloc) and the time for one pass of
+the lookups the tick loop does for every scooter.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_state_memory.py --scooters 10000 100000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from scooter_state import ScooterState, LOCK_DEACTIVATED
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# The two layouts
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def slotted_states(count):
+    """
+    Current layout: one ScooterState per scooter.
+    """
+    return {
+        sid: ScooterState(55.6 + sid * 1e-6, 13.0 + sid * 1e-6, route_id=sid % 40, route_index=sid % 25)
+        for sid in range(1, count + 1)
+    }
+
+
+def parallel_dicts(count):
+    """
+    Former layout: one dict (or set) per piece of state, keyed by scooter id.
+    """
+    state = {
+        "scooter_to_route": {}, "trip_counter": {}, "next_waypoint_index": {}, "last_position": {},
+        "last_travel_direction": {}, "per_scooter_special_behavior": {}, "rentals": {},
+        "external_rentals": {}, "deactivated_scooters": set(), "admin_locked_scooters": set(),
+        "battery_locked_scooters": set(), "outofbounds_locked_scooters": set(),
+        "pending_battery_lock": set(), "last_db_charging_status": {}, "dormant_scooters": {},
+        "next_heartbeat": {},
+    }
+    for sid in range(1, count + 1):
+        state["scooter_to_route"][sid] = sid % 40
+        state["trip_counter"][sid] = 0
+        state["next_waypoint_index"][sid] = {"route_index": sid % 25}
+        state["last_position"][sid] = (55.6 + sid * 1e-6, 13.0 + sid * 1e-6)
+        state["last_travel_direction"][sid] = None
+        state["per_scooter_special_behavior"][sid] = None
+        state["rentals"][sid] = {
+            "active": False, "rental_id": None, "user_id": None, "user_name": None,
+            "start_zone": "free", "end_zone": "free",
+        }
+        state["external_rentals"][sid] = {"active": False, "rental_id": None, "user_id": None, "user_name": None}
+    return state
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Per-tick lookups (what the tick loop reads for every scooter)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def touch_slotted(states, ids):
+    moving = 0
+    for sid in ids:
+        state = states[sid]
+        if state.dormant is not None or state.external_active or state.locks & LOCK_DEACTIVATED:
+            continue
+        if state.special_behavior is None and state.rental.active is False and state.route_id is not None:
+            moving += state.route_index + state.trip_counter
+        state.last_lat, state.last_lng = state.last_lat, state.last_lng
+    return moving
+
+
+def touch_parallel(state, ids):
+    moving = 0
+    for sid in ids:
+        if sid in state["dormant_scooters"] or state["external_rentals"][sid]["active"]:
+            continue
+        if sid in state["deactivated_scooters"]:
+            continue
+        if (
+            state["per_scooter_special_behavior"].get(sid) is None
+            and state["rentals"][sid]["active"] is False
+            and sid in state["scooter_to_route"]
+        ):
+            moving += state["next_waypoint_index"][sid]["route_index"] + state["trip_counter"][sid]
+        state["last_position"][sid] = state["last_position"][sid]
+    return moving
+
+
+def allocated(build, count):
+    """
+    Bytes allocated by build(count), and what it built.
+    """
+    tracemalloc.start()
+    built = build(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, built
+
+
+def best_of(repeats, fn):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scooters", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scooters':>9} {'dicts B/sc':>11} {'slots B/sc':>11} {'saved':>7} {'dicts ms':>9} {'slots ms':>9}")
+
+    for count in args.scooters:
+        ids = list(range(1, count + 1))
+
+        dict_bytes, parallel = allocated(parallel_dicts, count)
+        slot_bytes, slotted = allocated(slotted_states, count)
+        assert touch_parallel(parallel, ids) == touch_slotted(slotted, ids)
+
+        dict_time = best_of(args.repeats, lambda: touch_parallel(parallel, ids))
+        slot_time = best_of(args.repeats, lambda: touch_slotted(slotted, ids))
+
+        print(
+            f"{count:>9} {dict_bytes / count:>11.0f} {slot_bytes / count:>11.0f} "
+            f"{1 - slot_bytes / dict_bytes:>6.0%} {dict_time * 1000:>9.1f} {slot_time * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
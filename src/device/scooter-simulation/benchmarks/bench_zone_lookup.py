@@ -0,0 +1,286 @@
+"""
+@module bench_zone_lookup
+
+Micro-benchmark of the City zone lookups (is_inside, classify_zone) against the former
+lookup: the same STRtree candidates, each tested with contains-or-touches on an
+un-prepared polygon.
+
+Datasets:
+- the real city zones of the DB seed data (spark_zone.csv), per city
+- a synthetic city (scenarios/synthetic_city.py) whose city zone is one large polygon
+  (--boundary-vertices), next to thousands of small ones
+
+Points: route waypoints and uniformly random points over the zones' bounds, plus every
+polygon vertex and edge midpoint - points on or right at polygon boundaries. Both lookups
+must give identical results for every point and zone type; any difference is reported.
+
+Batch: City.classify_many over --batch-points points (route waypoints and random points),
+against classify_zone per point; the zone codes must match exactly.
+
+Grid: the same, with the zone grid (zone_grid.py) of --grid-cell-m cells enabled - build
+time, memory and share of ambiguous cells, classify_zone and classify_many against the
+exact lookups.
+
+Run from the simulation root:
+
+    PYTHONPATH=. python benchmarks/bench_zone_lookup.py --points 4000 --boundary-vertices 20000 --batch-points 100000 --grid-cell-m 2
+"""
+
+import argparse
+import contextlib
+import csv
+import os
+import random
+import time
+
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point
+from shapely.wkt import loads as wkt_loads
+
+from city import City, ZONE_CODES
+from scenarios.synthetic_city import generate_city
+
+
+ZONE_TYPES = ("charging", "parking", "city", "slow")
+
+SEED_ZONES_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "..", "..", "backend", "mariadb", "dev-init", "spark_db", "data", "spark_zone.csv"
+)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# The former lookup
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class FormerLookup:
+    """
+    Zone lookup as City did it before prepared geometries: STRtree candidates, contains or
+    touches, on its own (un-prepared) copy of the polygons.
+    """
+    def __init__(self, zones_wkt):
+        self.zones = {zone_type: [] for zone_type in ZONE_TYPES}
+        for zone in zones_wkt:
+            zone_type = zone["zone_type"].lower()
+            if zone_type in self.zones:
+                poly = wkt_loads(zone["coordinates_wkt"])
+                if poly.is_valid and not poly.is_empty:
+                    self.zones[zone_type].append(poly)
+
+        self.polygons = [poly for polygons in self.zones.values() for poly in polygons]
+        self.zone_types = [zone_type for zone_type, polygons in self.zones.items() for _ in polygons]
+        self.index = STRtree(self.polygons)
+
+    def is_inside(self, lat, lon, zone_type):
+        point = Point(lon, lat)
+        for i in self.index.query(point):
+            if self.zone_types[i] != zone_type:
+                continue
+            poly = self.polygons[i]
+            if poly.contains(point) or poly.touches(point):
+                return True
+        return False
+
+    def classify_zone(self, lat, lon):
+        if self.is_inside(lat, lon, "charging"):
+            return "charging"
+        if self.is_inside(lat, lon, "parking"):
+            return "parking"
+        if self.is_inside(lat, lon, "city"):
+            return "free"
+        if self.is_inside(lat, lon, "slow"):
+            return "slow"
+        return "outofbounds"
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Datasets and points
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def seed_data_cities(path):
+    """
+    {city name: zones} from the backend's seed data, {} when the file is not there.
+    """
+    if not os.path.exists(path):
+        print(f"Seed data not found at {path}, skipping the real city zones")
+        return {}
+
+    cities = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            cities.setdefault(row["city"], []).append({
+                "zone_type": row["zone_type"],
+                "coordinates_wkt": row["coordinates"],
+                "speed_limit": None,
+            })
+    return cities
+
+
+def lookup_points(city, count, rng, routes=None):
+    """
+    (lat, lng) points: every polygon vertex and edge midpoint, then route waypoints (when
+    given) and random points over the zones' bounds, count points in all.
+    """
+    boundary = []
+    for polygons in city.zones.values():
+        for poly in polygons:
+            coords = list(poly.exterior.coords)
+            for (x0, y0), (x1, y1) in zip(coords, coords[1:]):
+                boundary.append((y0, x0))
+                boundary.append(((y0 + y1) / 2, (x0 + x1) / 2))
+
+    rng.shuffle(boundary)
+    points = boundary[:count // 2]
+
+    waypoints = [point for route in (routes or {}).values() for point in route]
+    min_x, min_y, max_x, max_y = shapely.total_bounds([poly for polygons in city.zones.values() for poly in polygons])
+    while len(points) < count:
+        if waypoints and rng.random() < 0.5:
+            points.append(rng.choice(waypoints))
+        else:
+            points.append((rng.uniform(min_y, max_y), rng.uniform(min_x, max_x)))
+
+    return points
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Measurement
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def per_lookup_us(fn, calls):
+    started = time.perf_counter()
+    results = [fn(*call) for call in calls]
+    return (time.perf_counter() - started) / len(calls) * 1e6, results
+
+
+def measure(label, zones, points):
+    city = City(label, zones, grid_cell_m=None)
+    former = FormerLookup(zones)
+
+    calls = [(lat, lng, zone_type) for lat, lng in points for zone_type in ZONE_TYPES]
+    former_inside_us, former_inside = per_lookup_us(former.is_inside, calls)
+    city_inside_us, city_inside = per_lookup_us(city.is_inside, calls)
+
+    former_classify_us, former_zones = per_lookup_us(former.classify_zone, points)
+    city_classify_us, city_zones = per_lookup_us(city.classify_zone, points)
+
+    differences = sum(a != b for a, b in zip(former_inside, city_inside)) + sum(a != b for a, b in zip(former_zones, city_zones))
+    zone_count = sum(len(polygons) for polygons in city.zones.values())
+
+    print(
+        f"{label:>12} {zone_count:>6} {len(points):>7} "
+        f"{former_inside_us:>10.1f} {city_inside_us:>9.1f} {former_inside_us / city_inside_us:>7.1f}x "
+        f"{former_classify_us:>10.1f} {city_classify_us:>9.1f} {former_classify_us / city_classify_us:>7.1f}x "
+        f"{'identical' if not differences else f'{differences} DIFFERENT':>12}"
+    )
+
+
+def measure_batch(label, city, points):
+    lats = [lat for lat, _ in points]
+    lngs = [lng for _, lng in points]
+
+    started = time.perf_counter()
+    codes = city.classify_many(lats, lngs)
+    many_us = (time.perf_counter() - started) / len(points) * 1e6
+
+    single_us, zones = per_lookup_us(city.classify_zone, points)
+    differences = sum(int(code) != ZONE_CODES[zone] for code, zone in zip(codes, zones))
+
+    print(
+        f"{label:>12} {len(points):>7} {single_us:>13.2f} {many_us:>13.2f} {single_us / many_us:>7.1f}x "
+        f"{'identical' if not differences else f'{differences} DIFFERENT':>12}"
+    )
+
+
+def measure_grid(label, zones, cell_m, points):
+    exact = City(label, zones, grid_cell_m=None)
+
+    # City reports the grid it built - the table below has the same figures
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gridded = City(label, zones, grid_cell_m=cell_m, grid_dir=None)
+    build_s = time.perf_counter() - started
+    grid = gridded.grid
+
+    exact_us, exact_zones = per_lookup_us(exact.classify_zone, points)
+    grid_us, grid_zones = per_lookup_us(gridded.classify_zone, points)
+
+    lats = [lat for lat, _ in points]
+    lngs = [lng for _, lng in points]
+    started = time.perf_counter()
+    exact_codes = exact.classify_many(lats, lngs)
+    exact_many_us = (time.perf_counter() - started) / len(points) * 1e6
+    started = time.perf_counter()
+    grid_codes = gridded.classify_many(lats, lngs)
+    grid_many_us = (time.perf_counter() - started) / len(points) * 1e6
+
+    differences = sum(a != b for a, b in zip(exact_zones, grid_zones)) + int((exact_codes != grid_codes).sum())
+
+    print(
+        f"{label:>12} {build_s:>7.2f} {grid.nbytes / 2**20:>7.1f} {grid.ambiguous_share():>6.1%} "
+        f"{exact_us:>8.2f} {grid_us:>8.2f} {exact_many_us:>8.2f} {grid_many_us:>8.2f} "
+        f"{'identical' if not differences else f'{differences} DIFFERENT':>12}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=4000)
+    parser.add_argument("--boundary-vertices", type=int, default=20_000, help="vertices of the synthetic city zone")
+    parser.add_argument("--batch-points", type=int, default=100_000, help="points per classify_many call")
+    parser.add_argument("--grid-cell-m", type=float, default=2.0, help="cell size of the zone grid (0: skip)")
+    parser.add_argument("--zones-csv", default=SEED_ZONES_CSV, help="zone seed data of the backend")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print("us per lookup - former: contains-or-touches, city: City (prepared covers)")
+    print()
+    print(
+        f"{'zones':>12} {'count':>6} {'points':>7} {'is_inside':>10} {'':>9} {'':>8} "
+        f"{'classify':>10} {'':>9} {'':>8} {'results':>12}"
+    )
+    print(
+        f"{'':>12} {'':>6} {'':>7} {'former':>10} {'city':>9} {'speedup':>8} "
+        f"{'former':>10} {'city':>9} {'speedup':>8}"
+    )
+
+    seed_data = seed_data_cities(args.zones_csv)
+    for name, zones in seed_data.items():
+        measure(name, zones, lookup_points(City(name, zones, grid_cell_m=None), args.points, rng))
+
+    synthetic = generate_city(seed=args.seed, boundary_vertices=args.boundary_vertices)
+    measure("Synthetic", synthetic.zones, lookup_points(synthetic.city(), args.points, rng, synthetic.routes))
+
+    print()
+    print("us per point - classify_zone per point, classify_many over all points at once")
+    print()
+    print(f"{'zones':>12} {'points':>7} {'classify_zone':>13} {'classify_many':>13} {'speedup':>8} {'results':>12}")
+
+    for name, zones in seed_data.items():
+        city = City(name, zones, grid_cell_m=None)
+        measure_batch(name, city, lookup_points(city, args.batch_points, rng))
+
+    city = synthetic.city()
+    measure_batch("Synthetic", city, lookup_points(city, args.batch_points, rng, synthetic.routes))
+
+    if not args.grid_cell_m:
+        return
+
+    print()
+    print(f"us per point - exact lookup vs zone grid of {args.grid_cell_m:g} m cells")
+    print()
+    print(
+        f"{'zones':>12} {'build s':>7} {'MB':>7} {'ambig':>6} "
+        f"{'classify_zone':>17} {'classify_many':>17} {'results':>12}"
+    )
+    print(f"{'':>12} {'':>7} {'':>7} {'':>6} {'exact':>8} {'grid':>8} {'exact':>8} {'grid':>8}")
+
+    for name, zones in seed_data.items():
+        measure_grid(name, zones, args.grid_cell_m, lookup_points(City(name, zones, grid_cell_m=None), args.batch_points, rng))
+
+    city = synthetic.city()
+    measure_grid("Synthetic", synthetic.zones, args.grid_cell_m, lookup_points(city, args.batch_points, rng, synthetic.routes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+@module fakes
+
+In-process stand-ins for Redis and the backend API (system:3000), for benchmarks that run
+the real simulator setup and tick path with no network at all.
+
+- FakeRedis: the subset of redis.Redis the broadcasters use (strings, lists, publish,
+  non-transactional pipelines), with a configurable latency per round trip
+- FakeBackend: a requests transport adapter answering the backend endpoints the simulator
+  calls, with a configurable latency per request. Mounted on api.SESSION it serves the
+  unchanged api.py / City.from_api code paths; any other URL is refused.
+- stand_in_zones: a zone set (city, slow, parking, charging) around a set of routes
+
+Both fakes count what they served, so benchmarks can report Redis and HTTP ops per tick.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import BaseAdapter
+from shapely.geometry import MultiPoint, Point
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Redis
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+COMMANDS = ("set", "get", "publish", "rpush", "lpush", "lrange", "delete", "rename")
+
+
+class FakeRedis:
+    """
+    In-memory Redis with latency seconds added to every round trip (one per plain command,
+    one per pipeline execute).
+
+    Counts commands (by name), round trips, and messages published.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.strings = {}
+        self.lists = {}
+        self.commands = Counter()
+        self.round_trips = 0
+        self.published = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def apply(self, name, args):
+        """
+        Run one command against the keyspace (no round trip).
+        """
+        self.commands[name] += 1
+        return getattr(self, "_" + name)(*args)
+
+    def __getattr__(self, name):
+        if name not in COMMANDS:
+            raise AttributeError(name)
+
+        def command(*args):
+            self.round_trip()
+            return self.apply(name, args)
+        return command
+
+    # Command implementations
+
+    def _set(self, key, value):
+        self.strings[key] = value
+        return True
+
+    def _get(self, key):
+        return self.strings.get(key)
+
+    def _publish(self, channel, message):
+        self.published += 1
+        return 0
+
+    def _rpush(self, key, *values):
+        entries = self.lists.setdefault(key, [])
+        entries.extend(values)
+        return len(entries)
+
+    def _lpush(self, key, *values):
+        entries = self.lists.setdefault(key, [])
+        entries[:0] = reversed(values)
+        return len(entries)
+
+    def _lrange(self, key, start, end):
+        entries = self.lists.get(key, [])
+        return entries[start:] if end == -1 else entries[start:end + 1]
+
+    def _delete(self, *keys):
+        return sum((self.strings.pop(key, None) is not None) + (self.lists.pop(key, None) is not None) for key in keys)
+
+    def _rename(self, key, new_key):
+        if key in self.lists:
+            self.lists[new_key] = self.lists.pop(key)
+        elif key in self.strings:
+            self.strings[new_key] = self.strings.pop(key)
+        else:
+            raise KeyError(f"no such key: {key}")
+        return True
+
+
+class FakePipeline:
+    """
+    Buffers commands, and applies them in one round trip on execute().
+    """
+    def __init__(self, redis):
+        self._redis = redis
+        self._queued = []
+
+    def __getattr__(self, name):
+        if name not in COMMANDS:
+            raise AttributeError(name)
+
+        def command(*args):
+            self._queued.append((name, args))
+            return self
+        return command
+
+    def execute(self):
+        queued, self._queued = self._queued, []
+        if not queued:
+            return []
+
+        self._redis.round_trip()
+        return [self._redis.apply(name, args) for name, args in queued]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Backend API
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# (method, path below the API base URL) -> endpoint label, as in api.HTTP_STATS
+ENDPOINTS = (
+    ("GET", re.compile(r"/customers"), "GET /customers"),
+    ("GET", re.compile(r"/rentals"), "GET /rentals"),
+    ("GET", re.compile(r"/cities/(?P<city>[^/]+)/zones"), "GET /cities/{name}/zones"),
+    ("POST", re.compile(r"/rentals/sim"), "POST /rentals/sim"),
+    ("PUT", re.compile(r"/rentals/sim/[^/]+"), "PUT /rentals/sim/{id}"),
+    ("PUT", re.compile(r"/bikes/[^/]+/status/sim"), "PUT /bikes/{id}/status/sim"),
+    ("PUT", re.compile(r"/bikes/[^/]+/status"), "PUT /bikes/{id}/status"),
+)
+
+
+class FakeBackend(BaseAdapter):
+    """
+    The backend endpoints the simulator uses, answered in-process with latency seconds added
+    to every request:
+
+        backend = FakeBackend(API_BASE_URL, zones={"Malmö": stand_in_zones(routes)})
+        backend.install(api.SESSION)
+
+    Counts requests by endpoint label. Rental ids are handed out in sequence.
+    """
+    def __init__(self, base_url, zones=None, customers=2000, latency=0.0):
+        super().__init__()
+        self.base_path = requests.utils.urlparse(base_url).path.rstrip("/")
+        self.base_url = base_url.rstrip("/")
+        self.zones = zones or {}
+        self.customers = [{"customer_id": uid, "name": f"JohnDoe{uid}"} for uid in range(1, customers + 1)]
+        self.latency = latency
+        self.requests = Counter()
+        self._next_rental_id = 1
+        self._lock = threading.Lock()
+
+    def install(self, session):
+        """
+        Mount on session for the API base URL, and refuse every other http(s) URL.
+        """
+        session.mount("http://", RefusingAdapter())
+        session.mount("https://", RefusingAdapter())
+        session.mount(self.base_url, self)
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = requests.utils.urlparse(request.url).path
+        path = requests.utils.unquote(path)[len(self.base_path):]
+
+        for method, pattern, label in ENDPOINTS:
+            match = pattern.fullmatch(path)
+            if method == request.method and match:
+                with self._lock:
+                    self.requests[label] += 1
+                status, body = self._answer(label, match, request)
+                return _response(request, status, body)
+
+        with self._lock:
+            self.requests[f"{request.method} (unknown)"] += 1
+        return _response(request, 404, {"error": f"no stand-in for {request.method} {path}"})
+
+    def _answer(self, label, match, request):
+        if label == "GET /customers":
+            return 200, self.customers
+        if label == "GET /rentals":
+            return 200, []
+        if label == "GET /cities/{name}/zones":
+            zones = self.zones.get(match.group("city"))
+            return (200, zones) if zones is not None else (404, {"error": "city not found"})
+        if label == "POST /rentals/sim":
+            with self._lock:
+                rental_id, self._next_rental_id = self._next_rental_id, self._next_rental_id + 1
+            payload = json.loads(request.body)
+            return 201, {"rental_id": rental_id, **payload}
+        return 200, {"ok": True}
+
+    def close(self):
+        pass
+
+
+class RefusingAdapter(BaseAdapter):
+    """
+    Fails every request as unreachable, so a benchmark never reaches the network.
+    """
+    def send(self, request, **kwargs):
+        raise requests.ConnectionError(f"Network disabled in benchmark: {request.url}")
+
+    def close(self):
+        pass
+
+
+def _response(request, status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Stand-in zones
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def stand_in_zones(routes):
+    """
+    Zones as the backend returns them: a city zone around all routes, and one
+    slow/parking/charging zone (in turn) at the middle of every route.
+    """
+    points = [(lng, lat) for waypoints in routes.values() for lat, lng in waypoints]
+    zones = [{
+        "zone_type": "city",
+        "coordinates_wkt": MultiPoint(points).convex_hull.buffer(0.002).wkt,
+        "speed_limit": None,
+    }]
+
+    for position, waypoints in enumerate(routes.values()):
+        lat, lng = waypoints[len(waypoints) // 2]
+        zone_type, radius, limit = [("slow", 0.0008, 5), ("parking", 0.0004, 10), ("charging", 0.0003, 8)][position % 3]
+        zones.append({
+            "zone_type": zone_type,
+            "coordinates_wkt": Point(lng, lat).buffer(radius).wkt,
+            "speed_limit": limit,
+        })
+
+    return zones
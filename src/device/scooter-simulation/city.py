@@ -6,15 +6,48 @@ Holds the City class and related helpers for working with real geographic zones
 Loads zone polygons directly from the backend database (via API), builds Shapely geometries,
 and provides fast, reliable point-in-polygon checks and zone classification.
 
+All zone polygons are held in one STRtree, so a lookup only tests the polygons whose
+bounding box holds the point, instead of every polygon of the zone type. The polygons are
+prepared once (when the zones are set), and each candidate takes a single covers test -
+inside or on the boundary, as contains-or-touches did. classify_zone resolves the zone
+priority from one query for every zone type at once, and classify_many does the same for
+whole coordinate arrays in a handful of vectorized calls.
+
+Optionally (grid_cell_m, config ZONE_GRID_CELL_M), the classification is also precomputed on
+a grid of small cells (zone_grid.ZoneGrid): classify_zone and classify_many read the zone
+from the grid, and only positions in cells a zone boundary passes through take the exact
+test above.
+
 Used by the simulator (injected into it) to determine:
 - Where a bike currently is (free, slow, parking, charging, outofbounds)
 - Whether it's inside the city boundary
 - Correct speed limit per zone type
 """
 
+import os
+import time
+import numpy as np
 import requests
+import api
+import shapely
+from shapely import STRtree
 from shapely.geometry import Point
 from shapely.wkt import loads as wkt_loads
+from config import API_BASE_URL, ZONE_GRID_CELL_M, ZONE_GRID_DIR
+from zone_grid import ZoneGrid, AMBIGUOUS, zones_fingerprint
+
+
+# Zone classifications as small integer codes, for array-based callers
+ZONE_NAMES = ("free", "slow", "parking", "charging", "outofbounds")
+ZONE_CODES = {name: code for code, name in enumerate(ZONE_NAMES)}
+
+# Zone type -> classification, highest priority first (no zone type: outofbounds)
+ZONE_PRIORITY = (
+    ('charging', 'charging'),
+    ('parking', 'parking'),
+    ('city', 'free'),
+    ('slow', 'slow'),
+)
 
 
 class City:
@@ -28,8 +61,25 @@ class City:
     parking/charging areas.
     """
 
-    def __init__(self, name, zones_wkt):
+    def __init__(self, name, zones_wkt, grid_cell_m=ZONE_GRID_CELL_M, grid_dir=ZONE_GRID_DIR):
         self.name = name
+        self.grid_cell_m = grid_cell_m
+        self.grid_dir = grid_dir
+
+        # Bumped on every set_zones, so data derived from the zones can tell when it is stale
+        self.zones_version = 0
+        self.set_zones(zones_wkt)
+
+    def set_zones(self, zones_wkt):
+        """
+        Load the zones (backend format: zone_type, coordinates_wkt, speed_limit), replacing any
+        previous ones, and rebuild the spatial index and prepared polygons (and the zone grid,
+        when enabled).
+        """
+        name = self.name
+
+        # Source zone definitions, kept so the same City can be rebuilt elsewhere (e.g. per shard)
+        self.zones_wkt = list(zones_wkt)
         self.zones = {
             'city': [],
             'slow': [],
@@ -38,7 +88,7 @@ class City:
         }
         self.speed_limits = {}
 
-        for zone in zones_wkt:
+        for zone in self.zones_wkt:
             zone_type = zone['zone_type'].lower()
             wkt = zone['coordinates_wkt']
 
@@ -57,6 +107,67 @@ class City:
             if 'speed_limit' in zone and zone['speed_limit'] is not None:
                 self.speed_limits[zone_type] = zone['speed_limit']
 
+        self._build_index()
+        self._build_grid()
+        self.zones_version += 1
+
+    def _build_index(self):
+        """
+        Build the spatial index over the polygons of every zone type: one STRtree, and the
+        zone type of each indexed polygon (by tree index). Prepares every polygon, in place.
+        """
+        polygons = []
+        zone_types = []
+        for zone_type, zone_polygons in self.zones.items():
+            polygons.extend(zone_polygons)
+            zone_types.extend([zone_type] * len(zone_polygons))
+
+        shapely.prepare(polygons)
+
+        self._index_polygons = np.array(polygons, dtype=object)
+        self._index_zone_types = zone_types
+        self._index = STRtree(polygons)
+
+        # Priority rank of each indexed polygon (0: highest, see ZONE_PRIORITY), and the zone
+        # code of each rank - one more rank past the last for outofbounds
+        ranks = {zone_type: rank for rank, (zone_type, _) in enumerate(ZONE_PRIORITY)}
+        self._index_ranks = np.array([ranks[zone_type] for zone_type in zone_types], dtype=np.int8)
+        self._rank_codes = np.array(
+            [ZONE_CODES[zone] for _, zone in ZONE_PRIORITY] + [ZONE_CODES['outofbounds']],
+            dtype=np.int8
+        )
+
+    def _build_grid(self):
+        """
+        Build the zone grid, or load it from grid_dir when it was built for the same zones
+        before. No grid (None) unless grid_cell_m is set.
+        """
+        self.grid = None
+        if not self.grid_cell_m:
+            return
+
+        started = time.perf_counter()
+        fingerprint = zones_fingerprint(self.zones_wkt, self.grid_cell_m)
+        path = os.path.join(self.grid_dir, f"zone_grid_{fingerprint}.npz") if self.grid_dir else None
+
+        grid = ZoneGrid.load(path, fingerprint) if path else None
+        source = f"loaded from {path}"
+        if grid is None:
+            layers = [(ZONE_CODES[zone], self.zones[zone_type]) for zone_type, zone in reversed(ZONE_PRIORITY)]
+            grid = ZoneGrid.build(layers, self.grid_cell_m, ZONE_CODES['outofbounds'], fingerprint)
+            source = "built"
+            if path:
+                os.makedirs(self.grid_dir, exist_ok=True)
+                grid.save(path)
+                source = f"built, saved to {path}"
+
+        self.grid = grid
+        print(
+            f"[GEO] Zone grid for '{self.name}': {grid.rows}x{grid.cols} cells of {grid.cell_m:g} m, "
+            f"{grid.nbytes / 2**20:.1f} MB, {grid.ambiguous_share():.1%} ambiguous "
+            f"({source} in {time.perf_counter() - started:.2f}s)"
+        )
+
     def is_inside(self, lat, lon, zone_type):
         """
         Return True if the point (lat, lon) is inside any polygon of the given zone_type.
@@ -66,27 +177,83 @@ class City:
             return False
         
         point = Point(lon, lat)
-        
-        for poly in self.zones[zone_type]:
-            if poly.contains(point) or poly.touches(point):
+
+        # Candidates: polygons whose bounding box holds the point
+        for i in self._index.query(point):
+            if self._index_zone_types[i] != zone_type:
+                continue
+            if self._index_polygons[i].covers(point):
                 return True
         return False
 
+    def zone_types_at(self, lat, lon):
+        """
+        Return the set of zone types with a polygon holding the point (lat, lon), from a
+        single index query.
+        """
+        point = Point(lon, lat)
+        polygons = self._index_polygons
+        zone_types = self._index_zone_types
+
+        found = set()
+        for i in self._index.query(point):
+            zone_type = zone_types[i]
+            if zone_type not in found and polygons[i].covers(point):
+                found.add(zone_type)
+        return found
+
     def classify_zone(self, lat, lon):
         """ 
         Classify the current position into the correct zone type
         (priority: charging > parking > city > slow --->outofbounds).
         """
-        if self.is_inside(lat, lon, 'charging'):
-            return 'charging'
-        if self.is_inside(lat, lon, 'parking'):
-            return 'parking'
-        if self.is_inside(lat, lon, 'city'):
-            return 'free'
-        if self.is_inside(lat, lon, 'slow'):
-            return 'slow'
+        if self.grid is not None:
+            code = self.grid.lookup(lat, lon)
+            if code != AMBIGUOUS:
+                return ZONE_NAMES[code]
+
+        found = self.zone_types_at(lat, lon)
+        if found:
+            for zone_type, zone in ZONE_PRIORITY:
+                if zone_type in found:
+                    return zone
         return 'outofbounds'
 
+    def classify_many(self, lats, lngs):
+        """
+        Classify many positions at once: zone code (ZONE_CODES) per (lat, lng), as an int8
+        array - the same zone as classify_zone for every point.
+
+        With the zone grid, only the points in ambiguous cells take the exact test.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        if self.grid is None:
+            return self._classify_many_exact(lats, lngs)
+
+        codes = self.grid.lookup_many(lats, lngs)
+        ambiguous = np.flatnonzero(codes == AMBIGUOUS)
+        if ambiguous.size:
+            codes[ambiguous] = self._classify_many_exact(lats[ambiguous], lngs[ambiguous])
+        return codes
+
+    def _classify_many_exact(self, lats, lngs):
+        """
+        classify_many with the exact test: one bounding-box query of the index for all
+        points, then a single vectorized covers over the (prepared polygon, point) candidate
+        pairs; the highest priority zone type per point wins.
+        """
+        points = shapely.points(lngs, lats)
+        point_rows, polygon_rows = self._index.query(points)
+
+        covered = shapely.covers(self._index_polygons[polygon_rows], points[point_rows])
+        point_rows = point_rows[covered]
+
+        best = np.full(len(points), len(ZONE_PRIORITY), dtype=np.int8)
+        np.minimum.at(best, point_rows, self._index_ranks[polygon_rows[covered]])
+        return self._rank_codes[best]
+
     def is_in_city_boundary(self, lat, lon):
         """ 
         Simple check if the point is inside the overall city boundary. 
@@ -100,14 +267,14 @@ class City:
         return self.speed_limits.get(zone_type.lower())
 
     @classmethod
-    def from_api(cls, city_name, api_base_url="http://system:3000/api/v1/cities"):
+    def from_api(cls, city_name, api_base_url=f"{API_BASE_URL}/cities"):
         """
         Load all zones for a city directly from the backend API and instantiate a City object.
         Raises ValueError if city not found, RuntimeError on other API issues.
         """
         url = f"{api_base_url}/{city_name}/zones"
         try:
-            response = requests.get(url, timeout=10)
+            response = api.SESSION.get(url, timeout=10)
         except requests.RequestException as e:
             raise RuntimeError(f"Failed to reach API for city zones ({city_name}): {e}")
 
@@ -0,0 +1,92 @@
+"""
+@module clock
+
+Simulation clocks.
+
+The simulator and the tick scheduler read time through a clock object instead of the
+time module, so a simulation can run on wall time (default), faster than wall time,
+or on a purely virtual timeline for headless runs.
+
+Every clock offers:
+- time(): simulated epoch seconds (timestamps, behavior timers)
+- monotonic(): simulated seconds for scheduling
+- sleep(seconds): wait for that many simulated seconds
+- asleep(seconds): the same, awaitable on an event loop
+"""
+
+import asyncio
+import time
+
+
+class WallClock:
+    """
+    Plain wall-clock time. The default everywhere.
+    """
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    async def asleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class ScaledClock:
+    """
+    Simulated time running `speedup` times faster than wall time.
+
+    Sleeping N simulated seconds waits N / speedup real seconds, and the time a tick takes
+    in real life counts speedup-fold in simulated time, so overruns stay visible.
+    """
+    def __init__(self, speedup, start_time=None):
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+
+        self.speedup = speedup
+        self._start_time = time.time() if start_time is None else start_time
+        self._real_start = time.monotonic()
+
+    def monotonic(self):
+        return (time.monotonic() - self._real_start) * self.speedup
+
+    def time(self):
+        return self._start_time + self.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speedup)
+
+    async def asleep(self, seconds):
+        await asyncio.sleep(seconds / self.speedup)
+
+
+class VirtualClock:
+    """
+    Simulated time that only moves when slept on (or advanced).
+
+    Ticks run back-to-back as fast as the CPU allows, and each one still covers exactly
+    one tick interval of simulated time.
+    """
+    def __init__(self, start_time=None):
+        self._start_time = time.time() if start_time is None else start_time
+        self._elapsed = 0.0
+
+    def monotonic(self):
+        return self._elapsed
+
+    def time(self):
+        return self._start_time + self._elapsed
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    async def asleep(self, seconds):
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self._elapsed += seconds
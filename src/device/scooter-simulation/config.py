@@ -7,12 +7,40 @@ and charging.
 These values are crucial for managing the simulations and the scooter behavior.
 """
 
+import os
+
+# Backend the simulation talks to (override to point at a local stand-in backend)
+API_BASE_URL = os.getenv("SIM_API_URL", "http://system:3000/api/v1").rstrip("/")
+
 UPDATE_INTERVAL = 5.0
 RENTAL_PAUSE = 10
+
+# Where SIGUSR1 dumps the per-phase tick profiles as JSON (printed when unset, see profiler.py)
+PROFILE_DUMP_PATH = os.getenv("SIM_PROFILE_DUMP") or None
+
+# Prometheus metrics endpoint of the simulation process (see metrics.py), off when the port is 0.
+# Local only by default - set SIM_METRICS_HOST=0.0.0.0 to have it scraped from elsewhere
+METRICS_HOST = os.getenv("SIM_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("SIM_METRICS_PORT", "9108")) or None
+
+# Precomputed zone grid (see zone_grid.py): cell size in meters, off when 0, and where built
+# grids are cached on disk (not cached when unset)
+ZONE_GRID_CELL_M = float(os.getenv("SIM_ZONE_GRID_CELL_M", "0")) or None
+ZONE_GRID_DIR = os.getenv("SIM_ZONE_GRID_DIR") or None
+
+# Backend writes and Redis operations of one tick in flight at once (async simulator)
+ASYNC_MAX_CONCURRENCY = int(os.getenv("SIM_ASYNC_MAX_CONCURRENCY", "32"))
+
+# Dormant (stationary, unattended) scooters skip the full tick - full tick and publish this often
+DORMANT_HEARTBEAT_INTERVAL = 30.0
 NOMINAL_MAX_SPEED_MPS = 5.42 # ~19.5 km/h
 
 MAX_SLOW_MPS = 1.39  # ~5 km/h
 
+# Zones with a speed cap, and the cap (km/h) when the DB sets none
+SPEED_LIMITED_ZONES = ("slow", "parking", "charging")
+DEFAULT_ZONE_SPEED_LIMIT = 5.0
+
 MIN_BATTERY = 5
 LOW_BATTERY_THRESHOLD = 20
 BATTERY_FULL = 100
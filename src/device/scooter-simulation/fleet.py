@@ -0,0 +1,285 @@
+"""
+@module fleet
+
+Struct-of-arrays storage for a whole scooter fleet.
+
+Keeps the physical state of every scooter (position, battery, speed, status and route
+progress) in contiguous NumPy arrays, one row per scooter, so the fleet engine can
+advance all scooters with vectorized operations.
+
+FleetScooter instances are thin views onto one row each, so everything that works on a
+Scooter (behaviors, admin/rental handling, publishing) keeps working unchanged.
+"""
+
+import numpy as np
+
+from scooter import Scooter
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Status codes - small integers standing in for the status strings
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+STATUS_NAMES = [
+    "idle",
+    "available",
+    "active",
+    "reduced",
+    "charging",
+    "chargingLow",
+    "needCharging",
+    "needService",
+    "onService",
+    "deactivated",
+]
+
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+def status_code(name):
+    """
+    Return the code for a status name, registering names not seen before.
+    """
+    code = STATUS_CODES.get(name)
+    if code is None:
+        code = len(STATUS_NAMES)
+        STATUS_NAMES.append(name)
+        STATUS_CODES[name] = code
+    return code
+
+
+def status_mask(names):
+    """
+    Boolean lookup table over all known status codes, True for the given names.
+    Index it with a status-code array to test membership for the whole fleet.
+    """
+    table = np.zeros(len(STATUS_NAMES), dtype=bool)
+    for name in names:
+        code = STATUS_CODES.get(name)
+        if code is not None:
+            table[code] = True
+    return table
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Fleet arrays
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class FleetArrays:
+    """
+    Contiguous per-scooter state, one row per scooter.
+
+    Arrays grow by doubling as scooters are added; only the first `size` rows are in use.
+    A route_slot of -1 means the scooter has no route.
+    The zone fields cache the zone code of the position last classified (-1 = never).
+    """
+
+    # field -> (dtype, value of unused rows)
+    FIELDS = {
+        "lat": (np.float64, 0.0),
+        "lng": (np.float64, 0.0),
+        "battery": (np.float64, 0.0),
+        "speed": (np.float64, 0.0),
+        "status": (np.int16, 0),
+        "route_slot": (np.int32, -1),
+        "route_index": (np.int32, 0),
+        "zone": (np.int8, -1),
+        "zone_lat": (np.float64, np.nan),
+        "zone_lng": (np.float64, np.nan),
+    }
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.capacity = max(1, capacity)
+
+        # Row bookkeeping
+        self.ids = []
+        self.views = []
+        self.row_of = {}
+
+        for field, (dtype, default) in self.FIELDS.items():
+            setattr(self, field, np.full(self.capacity, default, dtype=dtype))
+
+    def _grow(self):
+        """
+        Double the capacity of every array, keeping the rows in use.
+        """
+        new_capacity = self.capacity * 2
+        for field, (dtype, default) in self.FIELDS.items():
+            old = getattr(self, field)
+            new = np.full(new_capacity, default, dtype=dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, field, new)
+
+        self.capacity = new_capacity
+
+    def add(self, sid, rbroadcast=None, lat=0.0, lng=0.0, battery=100):
+        """
+        Allocate a row for a new scooter and return its FleetScooter view.
+        """
+        if sid in self.row_of:
+            raise ValueError(f"Scooter {sid} already has a row in the fleet")
+
+        if self.size == self.capacity:
+            self._grow()
+
+        row = self.size
+        self.size += 1
+
+        scooter = FleetScooter(self, row, sid, lat, lng, battery, rbroadcast)
+
+        self.ids.append(sid)
+        self.views.append(scooter)
+        self.row_of[sid] = row
+        return scooter
+
+    def adopt(self, scooter):
+        """
+        Copy the state of a plain Scooter into a new row and return the view replacing it.
+        """
+        view = self.add(
+            scooter.id,
+            rbroadcast=scooter.rbroadcast,
+            lat=scooter.lat,
+            lng=scooter.lng,
+            battery=scooter.battery
+        )
+        view.speed_kmh = scooter.speed_kmh
+        view.status = scooter.status
+        return view
+
+    def rows(self, scooter_ids):
+        """
+        Row numbers for the given scooter ids (unknown ids are skipped).
+        """
+        row_of = self.row_of
+        return np.fromiter(
+            (row_of[sid] for sid in scooter_ids if sid in row_of),
+            dtype=np.intp
+        )
+
+    def mask(self, scooter_ids):
+        """
+        Boolean row mask, True for the given scooter ids.
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        if scooter_ids:
+            mask[self.rows(scooter_ids)] = True
+        return mask
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Thin scooter view onto one fleet row
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class FleetScooter(Scooter):
+    """
+    A Scooter whose physical state lives in a FleetArrays row.
+
+    Reads and writes of lat/lng/battery/speed_kmh/status go straight to the arrays,
+    so the scalar Scooter logic and the vectorized fleet engine share one source of truth.
+    """
+    def __init__(self, fleet, row, sid, lat, lng, battery=100, rbroadcast=None):
+        self._fleet = fleet
+        self._row = row
+        super().__init__(sid, lat, lng, battery=battery, rbroadcast=rbroadcast)
+
+    @property
+    def lat(self):
+        return float(self._fleet.lat[self._row])
+
+    @lat.setter
+    def lat(self, value):
+        self._fleet.lat[self._row] = value
+
+    @property
+    def lng(self):
+        return float(self._fleet.lng[self._row])
+
+    @lng.setter
+    def lng(self, value):
+        self._fleet.lng[self._row] = value
+
+    @property
+    def battery(self):
+        return float(self._fleet.battery[self._row])
+
+    @battery.setter
+    def battery(self, value):
+        self._fleet.battery[self._row] = value
+
+    @property
+    def speed_kmh(self):
+        return float(self._fleet.speed[self._row])
+
+    @speed_kmh.setter
+    def speed_kmh(self, value):
+        self._fleet.speed[self._row] = value
+
+    @property
+    def status(self):
+        return STATUS_NAMES[self._fleet.status[self._row]]
+
+    @status.setter
+    def status(self, value):
+        self._fleet.status[self._row] = status_code(value)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Packed routes - all route waypoints in one flat array
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class PackedRoutes:
+    """
+    All compiled routes of a simulator (route_table.RouteTable by route id) flattened into
+    two coordinate arrays, addressed by (slot, waypoint index), so target waypoints for the
+    whole fleet are one gather. Reversed trips index the same arrays backwards.
+
+    segment_lengths[k] is the distance in meters from flat waypoint k to k + 1 within the
+    same route (0 after the last waypoint of a route), and turn_slowdown[k] the speed factor
+    for taking the turn at flat waypoint k (the same in both directions), both taken from
+    the route tables.
+    """
+    def __init__(self, route_tables):
+        self.slot_of = {}
+        offsets = []
+        lengths = []
+        coords = []
+        segment_lengths = []
+        turn_slowdown = []
+
+        for route_id, table in route_tables.items():
+            forward = table.forward
+            self.slot_of[route_id] = len(offsets)
+            offsets.append(len(coords))
+            lengths.append(len(forward.waypoints))
+            coords.extend(forward.waypoints)
+            segment_lengths.extend(forward.segment_lengths)
+            segment_lengths.append(0.0)
+            turn_slowdown.extend(forward.turn_slowdown)
+
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.lat = np.ascontiguousarray(coords[:, 0])
+        self.lng = np.ascontiguousarray(coords[:, 1])
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.segment_lengths = np.asarray(segment_lengths, dtype=np.float64)
+        self.turn_slowdown = np.asarray(turn_slowdown, dtype=np.float64)
+
+    def slot(self, route_id):
+        """
+        Slot for a route id, -1 when the route is unknown or empty.
+        """
+        return self.slot_of.get(route_id, -1)
+
+    def waypoint_positions(self, slots, indices, reverse):
+        """
+        Flat array positions of waypoint `indices` on routes `slots`, read backwards where
+        `reverse` is set.
+        """
+        lengths = self.lengths[slots]
+        directed = np.where(reverse, lengths - 1 - indices, indices)
+        return self.offsets[slots] + directed
+
+    def segment_positions(self, from_positions, to_positions):
+        """
+        Index into segment_lengths of the segment joining two adjacent flat waypoint
+        positions, travelled in either direction.
+        """
+        return np.minimum(from_positions, to_positions)
@@ -0,0 +1,504 @@
+"""
+@module fleet_simulator
+
+The fleet engine - an alternative, array-backed Simulator for very large fleets.
+
+Stores the physical state of every scooter in FleetArrays (struct-of-arrays), and advances
+the whole fleet per tick with vectorized NumPy operations: route-following movement, zone
+speed limits, status resolution and battery accounting. Per-scooter Python work is limited
+to scooters that actually need it this tick (rental start/end, locks, behaviors, external
+rentals, zone re-classification after a move), reusing the Simulator's own helpers for those
+so both engines share one set of rules.
+
+Dormant scooters (see Simulator._tick_dormant) are rows left out of the full tick: their
+battery is drained or charged for the whole dormant mask at once, and they are neither
+classified, synced nor published until their heartbeat or a change wakes them.
+
+Scooters handed out by this engine are FleetScooter views, so behaviors, listeners and the
+simulation helpers work with it exactly as with the classic Simulator.
+"""
+
+import time
+
+import numpy as np
+
+from simulator import Simulator
+from fleet import FleetArrays, PackedRoutes, STATUS_CODES, STATUS_NAMES, status_code, status_mask
+from city import ZONE_CODES
+from scooter_state import LOCK_DEACTIVATED, CHARGING_NONE
+from kinematics import route_kinematics
+from config import UPDATE_INTERVAL, LOW_BATTERY_THRESHOLD, NON_RENTABLE_STATUSES
+from config import MIN_BATTERY, BATTERY_DRAIN_IDLE, BATTERY_DRAIN_ACTIVE, CHARGE_RATE_PER_MIN
+
+
+IDLE = STATUS_CODES["idle"]
+ACTIVE = STATUS_CODES["active"]
+REDUCED = STATUS_CODES["reduced"]
+CHARGING = STATUS_CODES["charging"]
+NEED_CHARGING = STATUS_CODES["needCharging"]
+
+ZONE_SLOW = ZONE_CODES["slow"]
+ZONE_CHARGING = ZONE_CODES["charging"]
+ZONE_OUTOFBOUNDS = ZONE_CODES["outofbounds"]
+
+
+class FleetSimulator(Simulator):
+    """
+    Simulator engine that keeps lat/lng/battery/speed/status/route-index as
+    contiguous NumPy arrays and ticks the whole fleet with vectorized operations.
+
+    Behaves like the classic Simulator tick by tick; pick it with
+    setup_city_simulation(..., engine="fleet").
+    """
+
+    def __init__(self, scooters, routes, city, rbroadcast=None, custom_scooter_scenarios=None, **kwargs):
+        self.fleet = FleetArrays()
+
+        # Scooters handed in up front are moved into the fleet arrays (list updated in place)
+        for position, scooter in enumerate(scooters):
+            scooters[position] = self.fleet.adopt(scooter)
+
+        super().__init__(scooters, routes, city, rbroadcast, custom_scooter_scenarios, **kwargs)
+
+        # The compiled routes, flattened for whole-fleet gathers
+        self.packed_routes = PackedRoutes(self.route_tables)
+
+        # Route progress lives in the fleet arrays
+        for scooter in scooters:
+            self._move_route_state_to_fleet(scooter, self.states[scooter.id].route_index)
+
+        # Phase slot and ScooterState per fleet row (extended as rows are added)
+        self._row_phase_slot = np.zeros(0, dtype=np.int64)
+        self._row_states = []
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Scooter creation and registration
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def create_scooter(self, sid, lat, lng, battery=100, rbroadcast=None):
+        """
+        Allocate a fleet row and return the FleetScooter view onto it.
+        """
+        return self.fleet.add(sid, rbroadcast=rbroadcast, lat=lat, lng=lng, battery=battery)
+
+    def register_scooter(
+        self,
+        scooter,
+        route_id=None,
+        waypoint_index=0,
+        trip_counter_value=0,
+        special_behavior=None,
+        rental_id=None
+    ):
+        super().register_scooter(
+            scooter,
+            route_id=route_id,
+            waypoint_index=waypoint_index,
+            trip_counter_value=trip_counter_value,
+            special_behavior=special_behavior,
+            rental_id=rental_id
+        )
+        self._move_route_state_to_fleet(scooter, waypoint_index)
+
+        # Re-registration replaces the scooter's state object
+        row = self.fleet.row_of[scooter.id]
+        if row < len(self._row_states):
+            self._row_states[row] = self.states[scooter.id]
+
+    def unregister_scooter(self, scooter_id):
+        """
+        Not supported by this engine: fleet rows are never removed (the arrays only grow).
+        """
+        raise RuntimeError("The fleet engine cannot remove scooters - use the classic Simulator")
+
+    def _move_route_state_to_fleet(self, scooter, waypoint_index):
+        """
+        Seed the fleet row with route progress. From here on the fleet arrays are the source
+        of truth for it (the route_index and last position in ScooterState go unused).
+        """
+        row = self.fleet.row_of[scooter.id]
+        self.fleet.route_slot[row] = self.packed_routes.slot(self.states[scooter.id].route_id)
+        self.fleet.route_index[row] = waypoint_index
+
+    def _states_by_row(self, n):
+        """
+        ScooterState of every fleet row, in row order.
+        """
+        known = len(self._row_states)
+        if known < n:
+            self._row_states.extend(self.states[sid] for sid in self.fleet.ids[known:n])
+        return self._row_states
+
+    def _locked_rows(self, states, n):
+        """
+        Mask of the rows whose movement is frozen by a lock.
+        """
+        return np.fromiter((state.locks & LOCK_DEACTIVATED for state in states), dtype=bool, count=n)
+
+    def _rental_active_rows(self, states, n):
+        """
+        Mask of the rows with an active sim-owned rental.
+        """
+        return np.fromiter((state.rental.active for state in states), dtype=bool, count=n)
+
+    def status_counts(self):
+        """
+        Number of scooters per status, counted on the status codes.
+        """
+        counts = np.bincount(self.fleet.status[:self.fleet.size], minlength=len(STATUS_NAMES))
+        return {STATUS_NAMES[code]: int(count) for code, count in enumerate(counts.tolist()) if count}
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Main simulation ticker - whole fleet per step
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def tick(self, slot=None):
+        """
+        Advance the rows of one phase slot (the whole fleet when slot is None) by tick_interval.
+        """
+        current_time = self.clock.time()
+
+        profiler = self.profiler
+        profiler.begin_tick()
+
+        # Apply queued inputs deterministically at the start of the tick
+        profiler.timed("admin_apply", self._apply_queued_admin_status_updates, current_time)
+        profiler.timed("rental_events", self._apply_external_rental_events, current_time)
+        self._check_zone_caches()
+
+        # All Redis writes of this tick go out in one pipeline
+        if self.fleet.size:
+            with self.rbroadcast.batched():
+                self._tick_fleet(current_time, slot)
+
+        profiler.end_tick()
+
+    def _tick_fleet(self, current_time, slot=None):
+        profiler = self.profiler
+        fleet = self.fleet
+        n = fleet.size
+        views = fleet.views
+        states = self._states_by_row(n)
+
+        lat = fleet.lat[:n]
+        lng = fleet.lng[:n]
+        battery = fleet.battery[:n]
+        status = fleet.status[:n]
+
+        prev_lat = lat.copy()
+        prev_lng = lng.copy()
+        status_before = status.copy()
+
+        # Rows ticked this time (one phase slot, or all)
+        in_slot = self._phase_slot_rows(n, slot)
+
+        # Dormant rows: battery accounting only, until woken or due for a heartbeat
+        dormant = self._tick_dormant_rows(states, in_slot, current_time)
+        self.quiet_scooters = {fleet.ids[row] for row in np.flatnonzero(dormant).tolist()}
+        full_rows = in_slot & ~dormant
+
+        # Battery logic for locking at sub-20%
+        locked = self._locked_rows(states, n)
+        for row in np.flatnonzero(full_rows & (battery < LOW_BATTERY_THRESHOLD) & ~locked):
+            self._enforce_low_battery_lock(views[row])
+
+        # External rental mode: handled one by one, excluded from everything below
+        external_rows = [
+            row
+            for row, state in enumerate(states[:n])
+            if state.external_active and state.external.rental_id and full_rows[row]
+        ]
+        for row in external_rows:
+            self._tick_external_rental(views[row], states[row].external.rental_id)
+
+        sim_rows = full_rows.copy()
+        sim_rows[external_rows] = False
+
+        # ~~~~~MOVEMENT~~~~~
+        # Intended speed and activity for every row, standing still by default
+        intended_speed = np.zeros(n)
+        activity = np.full(n, IDLE, dtype=np.int16)
+        route_finished = np.zeros(n, dtype=bool)
+
+        # Special behaviors win over route-following
+        movement_started = time.perf_counter()
+        rental_active = self._rental_active_rows(states, n)
+        behavior_rows = np.zeros(n, dtype=bool)
+        for row in np.flatnonzero(sim_rows):
+            behavior = states[row].special_behavior
+            if behavior is None:
+                continue
+
+            result = behavior(views[row], self.tick_interval)
+            if result is None:
+                continue
+
+            behavior_rows[row] = True
+            lat[row] = result.get("lat", lat[row])
+            lng[row] = result.get("lng", lng[row])
+            intended_speed[row] = result.get("speed_kmh", 0.0)
+            route_finished[row] = result.get("route_finished", False)
+            activity[row] = status_code(result.get("activity", "idle"))
+
+        # Only route-move when a sim-owned rental is active
+        movers = np.flatnonzero(sim_rows & rental_active & ~behavior_rows & (fleet.route_slot[:n] >= 0))
+        if movers.size:
+            self._advance_route_followers(movers, intended_speed, activity, route_finished)
+        profiler.add("movement", time.perf_counter() - movement_started)
+
+        # ~~~~~ZONES~~~~~
+        # Classify zones, re-using the cached zone for scooters that did not move
+        zone = profiler.timed("classify_zone", self._classify_fleet_zones, n)
+
+        # OUT OF BOUNDS: Permanent deactivation - lock position permanently
+        for row in np.flatnonzero(sim_rows & (zone == ZONE_OUTOFBOUNDS)):
+            self._enforce_out_of_bounds(views[row], current_time)
+
+        # Apply movement override for deactivated scooters
+        locked = self._locked_rows(states, n)
+        for row in np.flatnonzero(sim_rows & locked):
+            result = states[row].special_behavior(views[row], self.tick_interval)
+            intended_speed[row] = result["speed_kmh"]
+            activity[row] = status_code(result.get("activity", "idle"))
+            route_finished[row] = result.get("route_finished", False)
+
+        # Speed limits for slow/parking/charging zones (DB-driven)
+        final_speed = np.minimum(intended_speed, self._zone_speed_limits()[zone])
+
+        # Slow zone: "reduced" status and activity for scooters (symbolized with red marker in map view)
+        in_slow = sim_rows & (zone == ZONE_SLOW)
+        status[in_slow] = REDUCED
+        activity[in_slow] = REDUCED
+
+        # ~~~~~CHARGING~~~~~
+        in_charging = (zone == ZONE_CHARGING) & (status != ACTIVE)
+
+        charging_candidates = set(np.flatnonzero(sim_rows & in_charging).tolist())
+        charging_candidates.update(
+            row for row, state in enumerate(states[:n]) if state.charging_written != CHARGING_NONE
+        )
+        for row in sorted(charging_candidates):
+            if sim_rows[row]:
+                profiler.timed("charging_sync", self._sync_charging_status_db_first, views[row], bool(in_charging[row]))
+
+        # ~~~~~PHYSICAL STATE (Scooter.tick for the whole fleet)~~~~~
+        self._tick_physical_state(sim_rows, final_speed, activity, in_charging)
+
+        # ~~~~~RENTALS~~~~~
+        rental_active = self._rental_active_rows(states, n)
+        non_rentable = status_mask(NON_RENTABLE_STATUSES | {"needsCharging", "needsService"})[status]
+        may_start = (
+            ~rental_active
+            & (fleet.route_slot[:n] >= 0)
+            & (battery >= LOW_BATTERY_THRESHOLD)
+            & ~non_rentable
+        )
+        for row in np.flatnonzero(sim_rows & (rental_active | may_start)):
+            self._handle_rental_tick(
+                scooter=views[row],
+                prev_lat=float(prev_lat[row]),
+                prev_lng=float(prev_lng[row]),
+                route_finished=bool(route_finished[row]),
+                current_time=current_time
+            )
+
+        # ~~~~~CUSTOM SCENARIOS~~~~~
+        for sid, scenario in list(self.custom_scooter_scenarios.items()):
+            row = fleet.row_of.get(sid)
+            if scenario and row is not None and sim_rows[row]:
+                profiler.timed("custom_scenarios", scenario, views[row], simulator=self)
+
+        # ~~~~~PUBLISH~~~~~
+        profiler.timed("redis", self._publish_fleet_state, np.flatnonzero(sim_rows), in_charging)
+
+        # Nothing changed and nothing going on - move to the dormant path until woken
+        if self.heartbeat_interval is not None:
+            unchanged = sim_rows & (lat == prev_lat) & (lng == prev_lng) & (status == status_before)
+            for row in np.flatnonzero(unchanged):
+                self._try_make_dormant(views[row], states[row], current_time)
+
+    def _phase_slot_rows(self, n, slot):
+        """
+        Mask of the rows in the given phase slot (all rows for None, or with one slot).
+        """
+        if slot is None or self.phase_slots == 1:
+            return np.ones(n, dtype=bool)
+
+        known = self._row_phase_slot.size
+        if known < n:
+            added = [self.phase_slot_of(sid) for sid in self.fleet.ids[known:n]]
+            self._row_phase_slot = np.concatenate([self._row_phase_slot, np.array(added, dtype=np.int64)])
+
+        return self._row_phase_slot[:n] == slot
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Vectorized route-following (same rules as Simulator.compute_update)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _advance_route_followers(self, rows, intended_speed, activity, route_finished):
+        """
+        Move all route-following rows one tick along their routes.
+        """
+        fleet = self.fleet
+        states = self._row_states
+
+        trips = np.fromiter((states[row].trip_counter for row in rows), dtype=np.int64, count=rows.size)
+
+        step = route_kinematics(
+            lat=fleet.lat[rows],
+            lng=fleet.lng[rows],
+            route_slot=fleet.route_slot[rows],
+            route_index=fleet.route_index[rows],
+            reverse=trips % 2 == 1,
+            routes=self.packed_routes,
+            elapsed_time=self.tick_interval
+        )
+
+        fleet.lat[rows] = step["lat"]
+        fleet.lng[rows] = step["lng"]
+        fleet.route_index[rows] = step["route_index"]
+
+        intended_speed[rows] = step["speed_kmh"]
+        activity[rows] = np.where(step["speed_kmh"] > 0, ACTIVE, IDLE)
+        route_finished[rows] = step["route_finished"]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Zone helpers
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _classify_fleet_zones(self, n):
+        """
+        Zone code per row. Only rows whose position changed since their last classification
+        (or all rows, after the city's zones were reloaded - see _check_zone_caches) are sent
+        through City.classify_many, in one call.
+        """
+        fleet = self.fleet
+        lat = fleet.lat[:n]
+        lng = fleet.lng[:n]
+
+        stale = np.flatnonzero((lat != fleet.zone_lat[:n]) | (lng != fleet.zone_lng[:n]))
+        if stale.size:
+            fleet.zone[stale] = self.city.classify_many(lat[stale], lng[stale])
+
+        fleet.zone_lat[stale] = lat[stale]
+        fleet.zone_lng[stale] = lng[stale]
+        return fleet.zone[:n]
+
+    def _invalidate_zone_caches(self):
+        """
+        Also forget the zone cached per fleet row - every row is classified again.
+        """
+        super()._invalidate_zone_caches()
+        self.fleet.zone_lat[:] = np.nan
+        self.fleet.zone_lng[:] = np.nan
+
+    def _zone_speed_limits(self):
+        """
+        Speed cap (km/h) per zone code (see Simulator.zone_speed_caps), unlimited elsewhere.
+        """
+        limits = np.full(len(ZONE_CODES), np.inf)
+        for zone_type, cap in self.zone_speed_caps().items():
+            limits[ZONE_CODES[zone_type]] = cap
+        return limits
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Dormant rows (see Simulator._tick_dormant)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _dormant_rows(self, states, n):
+        """
+        Mask of the rows on the dormant path (ScooterState.dormant set).
+        """
+        return np.fromiter((state.dormant is not None for state in states), dtype=bool, count=n)
+
+    def _tick_dormant_rows(self, states, rows, current_time):
+        """
+        Dormant tick for the dormant rows in the `rows` mask: battery accounting only, under
+        the same rules as Simulator._tick_dormant. Rows that need the full tick instead are
+        woken (and take it this tick). Returns the mask of the rows that stayed dormant.
+        """
+        n = self.fleet.size
+        if self.heartbeat_interval is None:
+            return np.zeros(n, dtype=bool)
+
+        views = self.fleet.views
+        dormant = rows & self._dormant_rows(states, n)
+        for row in np.flatnonzero(dormant):
+            if not self._stays_dormant(views[row], states[row], current_time):
+                states[row].dormant = None
+                dormant[row] = False
+
+        # Rows whose battery would cross LOW_BATTERY_THRESHOLD keep it and take the full tick
+        battery = self.fleet.battery[:n]
+        battery_before = battery.copy()
+        self._update_battery_rows(dormant, self.fleet.status[:n])
+
+        crossed = dormant & ((battery_before < LOW_BATTERY_THRESHOLD) != (battery < LOW_BATTERY_THRESHOLD))
+        battery[crossed] = battery_before[crossed]
+        for row in np.flatnonzero(crossed):
+            states[row].dormant = None
+
+        return dormant & ~crossed
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Vectorized Scooter.tick (status resolution + battery)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _tick_physical_state(self, rows, speed_kmh, activity, in_charging_zone):
+        """
+        Same rules as Scooter.tick/_update_battery, applied to every row in the `rows` mask.
+        """
+        n = self.fleet.size
+        battery = self.fleet.battery[:n]
+
+        # Charging has absolute highest priority, then the low battery warning, then activity
+        new_status = np.where(
+            in_charging_zone & (activity != ACTIVE),
+            CHARGING,
+            np.where(battery < LOW_BATTERY_THRESHOLD, NEED_CHARGING, activity)
+        )
+
+        self._update_battery_rows(rows, new_status)
+
+        self.fleet.speed[:n][rows] = speed_kmh[rows]
+        self.fleet.status[:n][rows] = new_status[rows]
+
+    def _update_battery_rows(self, rows, status):
+        """
+        Same rules as Scooter._update_battery, for every row in the `rows` mask with the
+        given status codes.
+        """
+        battery = self.fleet.battery[:self.fleet.size]
+
+        charging = rows & (status == CHARGING)
+        idle = rows & ((status == IDLE) | (status == NEED_CHARGING))
+        active = rows & (status == ACTIVE)
+
+        charge_per_sec = CHARGE_RATE_PER_MIN / 60
+        intervals = self.tick_interval / UPDATE_INTERVAL
+        battery[charging] = np.minimum(100, battery[charging] + charge_per_sec * self.tick_interval)
+        battery[idle] = np.maximum(MIN_BATTERY, battery[idle] - BATTERY_DRAIN_IDLE * intervals)
+        battery[active] = np.maximum(MIN_BATTERY, battery[active] - BATTERY_DRAIN_ACTIVE * intervals)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Publish the fleet state
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _publish_fleet_state(self, rows, in_charging):
+        """
+        Publish with inChargingZone flag for immediate frontend visual feedback.
+        """
+        fleet = self.fleet
+        ids = fleet.ids
+        views = fleet.views
+
+        lats = np.round(fleet.lat[rows], 7).tolist()
+        lngs = np.round(fleet.lng[rows], 7).tolist()
+        batteries = np.round(fleet.battery[rows], 1).tolist()
+        speeds = fleet.speed[rows].tolist()
+        statuses = fleet.status[rows].tolist()
+        charging = in_charging[rows].tolist()
+
+        for i, row in enumerate(rows.tolist()):
+            views[row].rbroadcast.broadcast_state({
+                "id": ids[row],
+                "lat": lats[i],
+                "lng": lngs[i],
+                "bat": batteries[i],
+                "st": STATUS_NAMES[statuses[i]],
+                "spd": speeds[i],
+                "inChargingZone": charging[i]
+            })
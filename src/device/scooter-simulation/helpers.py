@@ -4,8 +4,9 @@
 Holds the helper functions used in the container.
 """
 import time
-import requests
 import os
+from config import API_BASE_URL
+import api
 
 JWT_TOKEN = os.getenv("JWT_TOKEN")
 HEADERS = {"Authorization": f"Bearer {JWT_TOKEN}", "Content-Type": "application/json"}
@@ -17,7 +18,7 @@ def wait_for_backend_response(timeout=30, interval=2):
     start_time = time.time()
     while True:
         try:
-            resp = requests.get("http://system:3000/api/v1/customers", timeout=1, headers=HEADERS)
+            resp = api.SESSION.get(f"{API_BASE_URL}/customers", timeout=1, headers=HEADERS)
             if resp.status_code == 200:
                 print("Backend ready!", flush=True)
                 return
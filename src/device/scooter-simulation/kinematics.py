@@ -0,0 +1,98 @@
+"""
+@module kinematics
+
+Batched route-following kinematics.
+
+One NumPy pass that moves any number of route-following scooters one tick along their
+routes, with the exact rules of Simulator.compute_update: the tick's full distance budget
+at constant max-speed, carried across as many waypoints as it reaches, route end
+detection and realistic slowdown in turns (gathered from the packed routes' precomputed
+turn factors).
+"""
+
+import numpy as np
+
+from utils import calculate_distances_in_m
+from config import UPDATE_INTERVAL, NOMINAL_MAX_SPEED_MPS
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Route kinematics kernel
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def route_kinematics(
+    lat,
+    lng,
+    route_slot,
+    route_index,
+    reverse,
+    routes,
+    elapsed_time=UPDATE_INTERVAL
+):
+    """
+    Advance route-following scooters by one tick.
+
+    All arguments but routes are equally shaped arrays, one element per scooter: current
+    position, route slot and index of the targeted waypoint in a fleet.PackedRoutes,
+    and whether the trip runs the route backwards.
+
+    Returns a dict of arrays, mirroring compute_update:
+    lat, lng, speed_kmh, route_index (already advanced, 0 after a finished route)
+    and route_finished.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    slots = np.asarray(route_slot, dtype=np.int64)
+    index = np.array(route_index, dtype=np.int64)
+    reverse = np.asarray(reverse, dtype=bool)
+
+    route_length = routes.lengths[slots]
+
+    new_lat = lat.copy()
+    new_lng = lng.copy()
+    distance_budget = np.full(lat.shape, NOMINAL_MAX_SPEED_MPS * elapsed_time)
+    distance_traveled_meters = np.zeros(lat.shape)
+    route_finished = np.zeros(lat.shape, dtype=bool)
+    slowdown = np.ones(lat.shape)
+
+    position = routes.waypoint_positions(slots, index, reverse)
+    distance_to_target = calculate_distances_in_m(lat, lng, routes.lat[position], routes.lng[position])
+
+    # Hop over every waypoint within reach this tick, all scooters in step
+    hopping = np.flatnonzero(distance_to_target <= distance_budget)
+    while hopping.size:
+        reached = position[hopping]
+        distance_budget[hopping] -= distance_to_target[hopping]
+        distance_traveled_meters[hopping] += distance_to_target[hopping]
+        new_lat[hopping] = routes.lat[reached]
+        new_lng[hopping] = routes.lng[reached]
+        slowdown[hopping] = np.minimum(slowdown[hopping], routes.turn_slowdown[reached])
+        index[hopping] += 1
+
+        # End of the route ends the trip (and the rental) - the rest of the budget is not used
+        ended = index[hopping] >= route_length[hopping]
+        route_finished[hopping[ended]] = True
+        index[hopping[ended]] = 0
+
+        hopping = hopping[~ended]
+        reached = reached[~ended]
+        position[hopping] = routes.waypoint_positions(slots[hopping], index[hopping], reverse[hopping])
+        distance_to_target[hopping] = routes.segment_lengths[routes.segment_positions(reached, position[hopping])]
+        hopping = hopping[distance_to_target[hopping] <= distance_budget[hopping]]
+
+    # Then cover what is left of the budget towards the next waypoint
+    partial = ~route_finished & (distance_budget > 0)
+    fraction = distance_budget / np.where(partial, distance_to_target, 1.0)
+    new_lat = np.where(partial, new_lat + (routes.lat[position] - new_lat) * fraction, new_lat)
+    new_lng = np.where(partial, new_lng + (routes.lng[position] - new_lng) * fraction, new_lng)
+    distance_traveled_meters = np.where(partial, distance_traveled_meters + distance_budget, distance_traveled_meters)
+
+    # Realistic slowdown in turns: the sharpest turn taken this tick
+    raw_speed_kmh = distance_traveled_meters / elapsed_time * 3.6 * slowdown
+
+    return {
+        "lat": new_lat,
+        "lng": new_lng,
+        "speed_kmh": np.round(raw_speed_kmh, 2),
+        "route_index": index,
+        "route_finished": route_finished,
+    }
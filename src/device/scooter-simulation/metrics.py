@@ -0,0 +1,273 @@
+"""
+@module metrics
+
+Prometheus metrics endpoint of the simulation process.
+
+MetricsServer serves the current figures of every city simulator in the process on a small
+HTTP endpoint (standard library only, in a daemon thread), in the Prometheus text format:
+
+    GET /metrics   Prometheus text format
+    GET /profile   the per-phase tick profiles as JSON (see profiler.py)
+
+Exposed, per city where it applies:
+- tick duration percentiles and per-phase tick profiles (profiler.TickProfiler)
+- tick lag, overruns and skipped ticks of the run loop (scheduler.TickScheduler)
+- scooters by status, and active rentals (sim-owned and external)
+- admin/rental event queue depth, and age of the oldest queued entry
+- backend HTTP calls, failures and latency histogram per endpoint (api.HTTP_STATS)
+- Redis commands and payload bytes: totals, and over the latest tick interval (all phase slots)
+
+Everything is read at scrape time - nothing is recorded for the metrics in the tick path.
+A sharded simulator (sharding.ShardedSimulator) answers with the sums of the figures its
+shard workers reported with their latest tick; their HTTP calls are added to this process's.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api import HTTP_LATENCY_BUCKETS, http_stats_snapshot, merge_http_stats
+from config import METRICS_HOST, METRICS_PORT
+from profiler import profiles_json
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+QUANTILES = (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms"), ("1", "max_ms"))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Text format
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class MetricFamilies:
+    """
+    Collects samples per metric name and renders them as Prometheus text, one HELP/TYPE
+    header per metric.
+    """
+    def __init__(self):
+        self._families = {}
+
+    def add(self, name, metric_type, help_text, value, suffix="", **labels):
+        """
+        One sample of metric name (suffix: "_bucket", "_sum", "_count" for histograms).
+        """
+        family = self._families.setdefault(name, (metric_type, help_text, []))
+        family[2].append((name + suffix, labels, value))
+
+    def render(self):
+        lines = []
+        for name, (metric_type, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_labels(labels)} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _value(value):
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Collection
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def render_metrics(simulators, scheduler=None):
+    """
+    Prometheus text for the given simulators and, when given, the run loop's scheduler.
+    """
+    families = MetricFamilies()
+
+    if scheduler is not None:
+        _collect_scheduler(families, scheduler)
+
+    for simulator in simulators:
+        _collect_simulator(families, simulator)
+
+    _collect_http(families, simulators)
+    return families.render()
+
+
+def _collect_scheduler(families, scheduler):
+    stats = scheduler.stats
+    families.add("sim_ticks_total", "counter", "Ticks (or phase-slot runs) run by the scheduler.", stats.ticks)
+    families.add("sim_tick_overruns_total", "counter", "Ticks that finished past the next deadline.", stats.overruns)
+    families.add("sim_ticks_skipped_total", "counter", "Ticks dropped by the overrun policy.", stats.skipped_ticks)
+    families.add("sim_tick_lag_seconds", "gauge", "How late the latest tick started.", stats.last_lag)
+    families.add("sim_tick_lag_max_seconds", "gauge", "Largest tick start lag so far.", stats.max_lag)
+    families.add("sim_tick_last_duration_seconds", "gauge", "Duration of the latest tick.", stats.last_duration)
+
+
+def _collect_simulator(families, simulator):
+    city = getattr(simulator.city, "name", "")
+
+    profiler = getattr(simulator, "profiler", None)
+    if profiler is not None:
+        phases = profiler.snapshot()["phases"]
+        for quantile, key in QUANTILES:
+            value = phases["tick"][key]
+            families.add(
+                "sim_tick_duration_seconds", "gauge",
+                "Tick duration over the profiler's rolling window, by quantile (1: max).",
+                None if value is None else value / 1000, city=city, quantile=quantile
+            )
+        for phase, figures in phases.items():
+            if phase == "tick":
+                continue
+            for quantile, key in QUANTILES:
+                value = figures[key]
+                families.add(
+                    "sim_tick_phase_seconds", "gauge",
+                    "Seconds per tick spent in a phase over the profiler's rolling window, by quantile (1: max).",
+                    None if value is None else value / 1000, city=city, phase=phase, quantile=quantile
+                )
+
+    statuses = simulator.status_counts()
+    for status, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+        families.add("sim_scooters", "gauge", "Scooters by status.", count, city=city, status=status)
+
+    rentals = simulator.active_rental_counts()
+    if rentals is not None:
+        for kind, count in rentals.items():
+            families.add("sim_active_rentals", "gauge", "Active rentals, sim-owned and external.", count, city=city, kind=kind)
+
+    for queue, figures in simulator.queue_stats().items():
+        families.add("sim_queue_depth", "gauge", "Events waiting for the next tick.", figures["depth"], city=city, queue=queue)
+        families.add(
+            "sim_queue_oldest_age_seconds", "gauge", "Age of the oldest event waiting (simulated seconds).",
+            figures["oldest_age_s"], city=city, queue=queue
+        )
+
+    redis_totals = simulator.redis_totals()
+    if redis_totals is not None:
+        redis_ops, redis_bytes = redis_totals
+        families.add("sim_redis_ops_total", "counter", "Redis commands issued.", redis_ops, city=city)
+        families.add("sim_redis_bytes_total", "counter", "Redis payload bytes sent and received.", redis_bytes, city=city)
+
+    # Over the latest tick interval: the latest run of every phase slot
+    phase_load = simulator.phase_load
+    families.add(
+        "sim_redis_ops_per_tick", "gauge", "Redis commands over the latest tick interval.",
+        sum(load["redis_ops"] for load in phase_load), city=city
+    )
+    families.add(
+        "sim_redis_bytes_per_tick", "gauge", "Redis payload bytes over the latest tick interval.",
+        sum(load["redis_bytes"] for load in phase_load), city=city
+    )
+
+
+def _collect_http(families, simulators):
+    """
+    Backend calls of this process, plus those made in the worker processes of sharded simulators.
+    """
+    http_stats = http_stats_snapshot()
+    for simulator in simulators:
+        if hasattr(simulator, "http_stats"):
+            merge_http_stats(http_stats, simulator.http_stats())
+
+    for endpoint, stats in sorted(http_stats.items()):
+        families.add("sim_http_requests_total", "counter", "Backend API calls by endpoint.", stats["calls"], endpoint=endpoint)
+        families.add("sim_http_failures_total", "counter", "Failed backend API calls by endpoint.", stats["failures"], endpoint=endpoint)
+
+        help_text = "Backend API call latency by endpoint."
+        cumulative = 0
+        for bound, count in zip(HTTP_LATENCY_BUCKETS, stats["buckets"]):
+            cumulative += count
+            families.add("sim_http_request_duration_seconds", "histogram", help_text, cumulative, suffix="_bucket", endpoint=endpoint, le=bound)
+        families.add("sim_http_request_duration_seconds", "histogram", help_text, stats["calls"], suffix="_bucket", endpoint=endpoint, le="+Inf")
+        families.add("sim_http_request_duration_seconds", "histogram", help_text, stats["seconds"], suffix="_sum", endpoint=endpoint)
+        families.add("sim_http_request_duration_seconds", "histogram", help_text, stats["calls"], suffix="_count", endpoint=endpoint)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# HTTP server
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class MetricsServer:
+    """
+    Serves /metrics and /profile for the given simulators from a daemon thread.
+    Pass the run loop's scheduler (or set .scheduler later) to include tick lag and overruns.
+    """
+    def __init__(self, simulators, scheduler=None, host=METRICS_HOST, port=METRICS_PORT):
+        self.simulators = simulators
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        """
+        Start serving. Returns False (with a warning) when the port cannot be bound.
+        """
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    if self.path == "/metrics":
+                        body = render_metrics(metrics_server.simulators, metrics_server.scheduler).encode()
+                        content_type = CONTENT_TYPE
+                    elif self.path == "/profile":
+                        body = profiles_json(indent=2).encode()
+                        content_type = "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    print(f"[Metrics] WARNING: Failed to render {self.path}: {e}")
+                    self.send_error(500)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes are not worth a line of output each
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"[Metrics] WARNING: Could not serve metrics on {self.host}:{self.port}: {e}")
+            return False
+
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"[Metrics] Serving Prometheus metrics on http://{self.host}:{self.server_port}/metrics")
+        return True
+
+    @property
+    def server_port(self):
+        return self._server.server_address[1] if self._server is not None else self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def start_metrics_server(simulators, scheduler=None):
+    """
+    MetricsServer for the run loops, on METRICS_HOST:METRICS_PORT (None when disabled or the
+    port is taken).
+    """
+    if METRICS_PORT is None:
+        return None
+
+    server = MetricsServer(simulators, scheduler)
+    return server if server.start() else None
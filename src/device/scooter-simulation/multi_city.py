@@ -0,0 +1,141 @@
+"""
+@module multi_city
+
+Several city simulations in one process.
+
+Instead of one process per city (each with its own Redis connections, HTTP usage,
+listener threads and tick loop), MultiCityHost runs all cities' simulators on one
+shared scheduler:
+
+- Redis and HTTP connections come from the process-wide pools
+  (redisbroadcast.shared_connection_pool, api.SESSION)
+- one AdminStatusListener/RentalEventListener pair serves every city, through a
+  CityRouter that forwards each message to the simulator owning the scooter
+- the cities tick in turn, spread evenly over the tick interval, so their work and
+  publishing are interleaved instead of all bursting on the same second (cities with
+  phase slots get one turn per slot)
+"""
+
+from scheduler import TickScheduler
+from profiler import install_dump_signal
+from metrics import start_metrics_server
+from config import PROFILE_DUMP_PATH
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Event routing by scooter id
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class CityRouter:
+    """
+    Stands in for a Simulator towards the listeners, forwarding every admin status update
+    and rental event to the simulator of the city the scooter belongs to.
+    """
+    def __init__(self, simulators):
+        self.simulators = simulators
+
+    @property
+    def scooters(self):
+        """
+        All scooters of all cities.
+        """
+        return [scooter for simulator in self.simulators for scooter in simulator.scooters]
+
+    def simulator_for(self, scooter_id):
+        """
+        The simulator running the scooter, or None when no city has it.
+        One O(1) index lookup per city, so scooters added after start-up are found too.
+        """
+        for simulator in self.simulators:
+            if simulator.find_scooter(scooter_id) is not None:
+                return simulator
+        return None
+
+    def find_scooter(self, scooter_id):
+        """
+        The scooter with the given id, whichever city runs it (None if unknown).
+        """
+        simulator = self.simulator_for(scooter_id)
+        return simulator.find_scooter(scooter_id) if simulator is not None else None
+
+    def enqueue_admin_status_update(self, scooter_id, new_status):
+        simulator = self.simulator_for(scooter_id)
+        if simulator is None:
+            print(f"[CityRouter] No city runs scooter {scooter_id}, dropping admin update '{new_status}'")
+            return
+        simulator.enqueue_admin_status_update(scooter_id, new_status)
+
+    def enqueue_rental_event(self, payload):
+        scooter_id = payload.get("scooter_id") if isinstance(payload, dict) else None
+        simulator = self.simulator_for(scooter_id)
+        if simulator is None:
+            print(f"[CityRouter] No city runs scooter {scooter_id}, dropping rental event: {payload}")
+            return
+        simulator.enqueue_rental_event(payload)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Host
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class MultiCityHost:
+    """
+    Runs several city simulators on one scheduler, one (city, phase slot) turn per sub-tick.
+
+    With T turns in total (one per phase slot of every city) the scheduler ticks every
+    tick_interval / T seconds and each sub-tick advances (and publishes) the next turn,
+    so every scooter still ticks once per tick_interval, offset from the others.
+    """
+    def __init__(self, simulators):
+        if not simulators:
+            raise ValueError("MultiCityHost needs at least one simulator")
+
+        intervals = {simulator.tick_interval for simulator in simulators}
+        if len(intervals) != 1:
+            raise ValueError(f"All cities must share one tick interval, got {sorted(intervals)}")
+
+        self.simulators = simulators
+        self.tick_interval = intervals.pop()
+        self.router = CityRouter(simulators)
+
+        # Turns in the order they run: slots at the same point of the interval, cities interleaved
+        self.turns = sorted(
+            ((simulator, slot) for simulator in simulators for slot in range(simulator.phase_slots)),
+            key=lambda turn: (turn[1] / turn[0].phase_slots, simulators.index(turn[0]))
+        )
+        self._next_turn = 0
+
+    @property
+    def clock(self):
+        return self.simulators[0].clock
+
+    def tick(self):
+        """
+        Advance and publish the next turn (a city, or one phase slot of it).
+        """
+        simulator, slot = self.turns[self._next_turn]
+        self._next_turn = (self._next_turn + 1) % len(self.turns)
+
+        simulator.advance_phase(slot)
+
+    def run(self, scheduler=None, max_ticks=None):
+        """
+        Run all cities until interrupted (or for max_ticks sub-ticks).
+        """
+        if scheduler is None:
+            scheduler = TickScheduler(
+                interval=self.tick_interval / len(self.turns),
+                clock=self.clock.monotonic,
+                sleep=self.clock.sleep
+            )
+
+        # kill -USR1 <pid> dumps the tick profiles of every city, /metrics serves them all
+        install_dump_signal(PROFILE_DUMP_PATH)
+        metrics_server = start_metrics_server(self.simulators, scheduler)
+
+        try:
+            scheduler.run(self.tick, max_ticks=max_ticks)
+        except KeyboardInterrupt:
+            print("Stopped.")
+        finally:
+            if metrics_server is not None:
+                metrics_server.stop()
+            print(f"[Scheduler] {scheduler.stats.snapshot()}")
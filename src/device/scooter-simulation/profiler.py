@@ -0,0 +1,196 @@
+"""
+@module profiler
+
+Per-phase tick profiling, cheap enough to leave on in production.
+
+During a tick the simulator adds the seconds it spends in each phase (see PHASES) to its
+TickProfiler. When the tick ends, every phase total becomes one sample, next to the
+duration of the whole tick ("tick") and the time not attributed to any phase ("other").
+The latest samples are kept in a rolling window per phase, and the percentiles
+(p50/p95/p99/max) are only computed when asked for - while the simulation runs,
+recording a tick costs a handful of additions and deque appends.
+
+Phase times are exclusive: backend HTTP and Redis time spent inside e.g. the admin apply or
+the charging sync counts as backend_http / redis, not twice.
+
+Every simulator registers its profiler under its city name, and profiles_json() dumps all of
+them (per city, per phase) as JSON - on demand through install_dump_signal (SIGUSR1).
+"""
+
+import json
+import signal
+import threading
+import time
+from collections import deque
+
+
+PHASES = (
+    "admin_apply",          # Queued admin status updates
+    "rental_events",        # Queued external rental events
+    "movement",             # Movement resolution (route-following, special behaviors)
+    "classify_zone",        # City.classify_zone
+    "charging_sync",        # Charging status sync
+    "backend_http",         # Backend API calls (api.py)
+    "redis",                # Redis state broadcasts and reads, pipeline round trips
+    "custom_scenarios",     # Registered per-scooter custom scenarios
+)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Profiler per simulator
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class TickProfiler:
+    """
+    Rolling per-phase tick timings for one simulator (city).
+
+    begin_tick()/end_tick() pairs may nest (advance_phase around tick): only the outermost
+    pair opens and closes a sample, so one sample covers everything done for that tick.
+    """
+    def __init__(self, city="", window=720):
+        self.city = city
+        self.ticks = 0
+
+        # Rolling window of per-tick samples (seconds) per phase
+        self.samples = {name: deque(maxlen=window) for name in PHASES + ("other", "tick")}
+
+        # Seconds per phase in the open tick, and all seconds attributed to a phase so far
+        self._totals = dict.fromkeys(PHASES, 0.0)
+        self.attributed = 0.0
+
+        self._depth = 0
+        self._started = 0.0
+
+    def add(self, phase, seconds):
+        """
+        Attribute seconds to a phase of the open tick.
+        """
+        self._totals[phase] += seconds
+        self.attributed += seconds
+
+    def timed(self, phase, fn, *args, **kwargs):
+        """
+        Call fn, attributing its duration (less what it attributed to other phases) to phase.
+        """
+        attributed = self.attributed
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(phase, time.perf_counter() - started - (self.attributed - attributed))
+        return result
+
+    def begin_tick(self):
+        self._depth += 1
+        if self._depth == 1:
+            self._started = time.perf_counter()
+
+    def end_tick(self):
+        self._depth -= 1
+        if self._depth > 0:
+            return
+
+        duration = time.perf_counter() - self._started
+        totals = self._totals
+        for name in PHASES:
+            self.samples[name].append(totals[name])
+            totals[name] = 0.0
+
+        self.samples["other"].append(max(0.0, duration - self.attributed))
+        self.samples["tick"].append(duration)
+        self.attributed = 0.0
+        self.ticks += 1
+
+    def latest(self):
+        """
+        Seconds per phase (and "other", "tick") of the latest finished tick, empty before the first.
+        """
+        return {name: samples[-1] for name, samples in self.samples.items() if samples}
+
+    def record_tick(self, seconds_by_phase):
+        """
+        Add one finished tick that was measured elsewhere (e.g. by shard workers), as
+        seconds per phase - phases it does not name count 0.
+        """
+        for name, samples in self.samples.items():
+            samples.append(seconds_by_phase.get(name, 0.0))
+        self.ticks += 1
+
+    def snapshot(self):
+        """
+        p50/p95/p99/max (milliseconds) per phase over the rolling window, as a plain dict.
+        """
+        return {
+            "city": self.city,
+            "ticks": self.ticks,
+            "phases": {name: percentiles(samples) for name, samples in self.samples.items()},
+        }
+
+
+def percentiles(samples):
+    """
+    Sample count and p50/p95/p99/max in milliseconds, of samples in seconds.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"samples": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        "samples": len(ordered),
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Registry of the process (one profiler per city) and JSON dump
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+_profilers = {}
+
+
+def profiler_for(city):
+    """
+    The process-wide TickProfiler of a city (a new one replaces the city's previous one).
+    """
+    profiler = TickProfiler(city)
+    _profilers[city] = profiler
+    return profiler
+
+
+def profiles():
+    """
+    Snapshots of every registered profiler, by city.
+    """
+    return {city: profiler.snapshot() for city, profiler in list(_profilers.items())}
+
+
+def profiles_json(indent=None):
+    return json.dumps(profiles(), indent=indent)
+
+
+def install_dump_signal(path=None, signum=signal.SIGUSR1):
+    """
+    Dump profiles_json() whenever the process receives signum - to the file at path,
+    or printed when no path is given:
+
+        kill -USR1 <pid>
+
+    Signal handlers can only be installed from the main thread - elsewhere this does nothing
+    and returns False.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+
+    def dump(signum, frame):
+        if path is None:
+            print(f"[Profiler] {profiles_json()}")
+            return
+
+        with open(path, "w") as handle:
+            handle.write(profiles_json(indent=2))
+        print(f"[Profiler] Tick profiles written to {path}")
+
+    signal.signal(signum, dump)
+    return True
@@ -9,10 +9,44 @@ the rental path recording + rental completion events - emulating a real scooter'
 transmitter sending data to the cloud.
 
 Uses Redis Pub/Sub (TCP-socket) for very fast and decoupled transmissions.
+
+AsyncScooterBroadcaster is the same transmitter on redis.asyncio, for the async simulator.
 """
 
 import redis
+import redis.asyncio as aioredis
 import json
+from contextlib import contextmanager
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Shared connection pools - one per Redis server and process
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+_connection_pools = {}
+
+
+def shared_connection_pool(host="redis", port=6379):
+    """
+    The process-wide Redis connection pool for host:port, so that every broadcaster and
+    listener in the process (all cities included) draws from the same connections.
+    """
+    pool = _connection_pools.get((host, port))
+    if pool is None:
+        pool = redis.ConnectionPool(host=host, port=port, decode_responses=True)
+        _connection_pools[(host, port)] = pool
+    return pool
+
+
+def shared_async_connection_pool(host="redis", port=6379):
+    """
+    The process-wide redis.asyncio connection pool for host:port (see shared_connection_pool).
+    Its connections belong to the event loop they were opened in.
+    """
+    pool = _connection_pools.get(("async", host, port))
+    if pool is None:
+        pool = aioredis.ConnectionPool(host=host, port=port, decode_responses=True)
+        _connection_pools[("async", host, port)] = pool
+    return pool
 
 
 class ScooterBroadcaster:
@@ -22,8 +56,52 @@ class ScooterBroadcaster:
     mimicking a physical e-scooter's transmitter.
     """
     def __init__(self, host="redis", port=6379):
-        self.r = redis.Redis(host=host, port=port, decode_responses=True)
-        
+        self.r = redis.Redis(connection_pool=shared_connection_pool(host, port))
+
+        # Open pipeline while inside batched(), None otherwise
+        self._pipe = None
+
+        # Number of state broadcasts sent so far (for load accounting)
+        self.states_published = 0
+
+        # Redis commands issued and payload bytes sent/received so far (see metrics.py)
+        self.redis_ops = 0
+        self.redis_bytes = 0
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Batched writes - one round trip per tick instead of one per command
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @contextmanager
+    def batched(self):
+        """
+        Buffer all writes made inside the block into one non-transactional pipeline,
+        sent to Redis when the block exits. Nested calls join the outer batch.
+        """
+        if self._pipe is not None:
+            yield self
+            return
+
+        self._pipe = self.r.pipeline(transaction=False)
+        try:
+            yield self
+        finally:
+            pipe, self._pipe = self._pipe, None
+            pipe.execute()
+
+    @property
+    def _writer(self):
+        """
+        The pipeline while batching, otherwise the plain client.
+        """
+        return self._pipe if self._pipe is not None else self.r
+
+    def _flush(self):
+        """
+        Send buffered writes now, so that a following read sees them.
+        """
+        if self._pipe is not None:
+            self._pipe.execute()
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Scooter state-broadcast on every simulation tick
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -35,10 +113,13 @@ class ScooterBroadcaster:
         encoded = json.dumps(payload)
 
         # Keep latest known state (for late-joining clients)
-        self.r.set(f"scooter:{scooter_id}", encoded)
+        self._writer.set(f"scooter:{scooter_id}", encoded)
 
         # Real-time push for the live map updates
-        self.r.publish("scooter:state:tick", encoded)
+        self._writer.publish("scooter:state:tick", encoded)
+        self.states_published += 1
+        self.redis_ops += 2
+        self.redis_bytes += 2 * len(encoded)
 
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -54,7 +135,9 @@ class ScooterBroadcaster:
         used to draw the full route on the map for a user overlooking their rental history.
         """
         coord = json.dumps({"lat": lat, "lng": lng, "spd": spd})
-        self.r.rpush(f"rental:{rental_id}:coords", coord)
+        self._writer.rpush(f"rental:{rental_id}:coords", coord)
+        self.redis_ops += 1
+        self.redis_bytes += len(coord)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Clear out stale and superfluous coords of db-persisted rental from cache
@@ -66,7 +149,8 @@ class ScooterBroadcaster:
         Coordinate lists for a given rental-id, once persisted to db, is never reused, so clearing
         them prevents unused data from hogging Redis memory.
         """
-        self.r.delete(f"rental:{rental_id}:coords")
+        self._writer.delete(f"rental:{rental_id}:coords")
+        self.redis_ops += 1
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Load coordinates to complete rental object
@@ -84,7 +168,10 @@ class ScooterBroadcaster:
         The returned list of coordinates is thus included in the completed rental payload, making it possible
         to later visualize the route on a map for a user overlooking their rental history.
         """
+        self._flush()
         raw = self.r.lrange(f"rental:{rental_id}:coords", 0, -1)
+        self.redis_ops += 1
+        self.redis_bytes += sum(map(len, raw))
         return [json.loads(c) for c in raw]
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -99,5 +186,70 @@ class ScooterBroadcaster:
         in relation to the completion of the rental lifecycle.
         """
         data = json.dumps(rental)
-        self.r.lpush("completed_rentals", data)
-        self.r.publish("rental:completed", data)
\ No newline at end of file
+        self._writer.lpush("completed_rentals", data)
+        self._writer.publish("rental:completed", data)
+        self.redis_ops += 2
+        self.redis_bytes += 2 * len(data)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Async transmitter (redis.asyncio)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class AsyncScooterBroadcaster(ScooterBroadcaster):
+    """
+    The onboard broadcaster on redis.asyncio, for the async simulator.
+
+    A pipeline is always open: the write methods are inherited unchanged and only buffer,
+    and flush() sends everything buffered in one round trip without blocking the event loop.
+    Reads are coroutines.
+    """
+    def __init__(self, host="redis", port=6379):
+        self.r = aioredis.Redis(connection_pool=shared_async_connection_pool(host, port))
+        self._pipe = self.r.pipeline(transaction=False)
+
+        # Number of state broadcasts sent so far (for load accounting)
+        self.states_published = 0
+
+        # Redis commands issued and payload bytes sent/received so far (see metrics.py)
+        self.redis_ops = 0
+        self.redis_bytes = 0
+
+    @contextmanager
+    def batched(self):
+        """
+        Writes are always batched here - they are sent by the next flush().
+        """
+        yield self
+
+    async def flush(self):
+        """
+        Send all writes buffered so far in one pipeline.
+        """
+        pipe, self._pipe = self._pipe, self.r.pipeline(transaction=False)
+        if len(pipe):
+            await pipe.execute()
+
+    async def load_coords(self, rental_id):
+        """
+        Retrieves the full sequence of coordinates + speed recorded during a rental
+        (see ScooterBroadcaster.load_coords).
+        """
+        await self.flush()
+        raw = await self.r.lrange(f"rental:{rental_id}:coords", 0, -1)
+        self.redis_ops += 1
+        self.redis_bytes += sum(map(len, raw))
+        return [json.loads(c) for c in raw]
+
+    async def aclose(self):
+        """
+        Close the connections of the shared pool (they belong to the event loop that is ending).
+        """
+        await self.r.connection_pool.disconnect()
+
+    def rename_coords(self, rental_id, new_rental_id):
+        """
+        Move the coordinates recorded under a rental ID to another one - for a rental that
+        started under its generated ID and got its real ID from the backend afterwards.
+        """
+        self._writer.rename(f"rental:{rental_id}:coords", f"rental:{new_rental_id}:coords")
+        self.redis_ops += 1
@@ -14,6 +14,7 @@ Backend API still handles the actual definitive creation/completion of user rent
 import redis
 import json
 import threading
+from redisbroadcast import shared_connection_pool
 
 
 class RentalEventListener:
@@ -28,7 +29,7 @@ class RentalEventListener:
     """
     def __init__(self, simulator, redis_host='redis', redis_port=6379, channel='rental:lifecycle'):
         self.simulator = simulator
-        self.r = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+        self.r = redis.Redis(connection_pool=shared_connection_pool(redis_host, redis_port))
         self.pubsub = self.r.pubsub()
         self.pubsub.subscribe(channel)
 
@@ -0,0 +1,124 @@
+"""
+@module route_table
+
+Routes compiled once at start-up, so movement only indexes into precomputed data.
+
+A RouteTable holds both travel directions of a route (forward on even trips, reversed on
+odd ones), each as a RouteDirection with its waypoints, segment lengths, cumulative
+distances, segment bearings and the turn angle at every waypoint. Nothing in it changes
+while the simulation runs - no reversed copies or distance calculations per tick.
+
+(Same idea as scenarios/routes/v1/cache/route_waypoint_cache.py, computed in memory for
+every route the simulator runs.)
+
+Turn slowdown is part of the compiled route too: the speed factor for taking the turn at
+each waypoint depends only on the angle between its two segments.
+"""
+
+import math
+
+from utils import calculate_segment_lengths_in_m
+
+
+# Sharpest slowdown in a turn (a U-turn still keeps 60% of the speed)
+MAX_TURN_SLOWDOWN = 0.4
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# One travel direction
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class RouteDirection:
+    """
+    A route in one travel direction.
+
+    - waypoints: (lat, lng) tuples in travel order
+    - segment_lengths: meters from waypoint i to waypoint i + 1 (one less than waypoints)
+    - cumulative_m: meters travelled from the start when reaching waypoint i (0.0 first)
+    - bearings: travel direction of segment i, as math.atan2(d_lng, d_lat) (radians,
+      0 heading north, pi/2 east)
+    - turn_angles: change of direction (radians, 0..pi) at waypoint i, 0.0 at both ends
+    - turn_slowdown: speed factor for a tick that takes the turn at waypoint i (1.0: no turn)
+
+    turn_angles can be handed in (the reversed direction reuses the forward ones, read
+    backwards), and are computed from the bearings otherwise.
+    """
+    __slots__ = ("waypoints", "segment_lengths", "cumulative_m", "bearings", "turn_angles", "turn_slowdown")
+
+    def __init__(self, waypoints, segment_lengths, turn_angles=None):
+        self.waypoints = waypoints
+        self.segment_lengths = segment_lengths
+
+        cumulative = [0.0]
+        total = 0.0
+        for length in segment_lengths:
+            total += length
+            cumulative.append(total)
+        self.cumulative_m = tuple(cumulative)
+
+        self.bearings = tuple(
+            math.atan2(end[1] - start[1], end[0] - start[0])
+            for start, end in zip(waypoints, waypoints[1:])
+        )
+
+        if turn_angles is None:
+            turns = [0.0] * len(waypoints)
+            for index in range(1, len(waypoints) - 1):
+                turns[index] = turn_angle(self.bearings[index - 1], self.bearings[index])
+            turn_angles = tuple(turns)
+        self.turn_angles = turn_angles
+
+        self.turn_slowdown = tuple(1 - min(angle / math.pi, MAX_TURN_SLOWDOWN) for angle in turn_angles)
+
+    @property
+    def total_m(self):
+        return self.cumulative_m[-1]
+
+
+def turn_angle(previous_bearing, bearing):
+    """
+    Absolute change of direction between two bearings, wrapped to 0..pi.
+    """
+    change = abs(bearing - previous_bearing)
+    return min(change, abs(math.pi * 2 - change))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Compiled route
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class RouteTable:
+    """
+    Both travel directions of one route, compiled once.
+    The reversed direction reuses the forward segment lengths and turn angles (read
+    backwards), so a segment measures and a turn slows down exactly the same whichever
+    way it is travelled.
+    """
+    __slots__ = ("route_id", "forward", "reverse")
+
+    def __init__(self, route_id, waypoints):
+        self.route_id = route_id
+
+        waypoints = tuple(tuple(point) for point in waypoints)
+        segment_lengths = tuple(calculate_segment_lengths_in_m(waypoints))
+
+        self.forward = RouteDirection(waypoints, segment_lengths)
+        self.reverse = RouteDirection(waypoints[::-1], segment_lengths[::-1], self.forward.turn_angles[::-1])
+
+    def for_trip(self, trip_counter):
+        """
+        The direction travelled on a trip: forward on even trips, reversed on odd.
+        """
+        return self.forward if trip_counter % 2 == 0 else self.reverse
+
+    def __len__(self):
+        return len(self.forward.waypoints)
+
+
+def compile_routes(routes):
+    """
+    RouteTable per route id (empty routes are left out - scooters on them stand still).
+    """
+    return {
+        route_id: RouteTable(route_id, waypoints)
+        for route_id, waypoints in routes.items()
+        if waypoints
+    }
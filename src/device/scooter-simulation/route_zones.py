@@ -0,0 +1,227 @@
+"""
+@module route_zones
+
+Zone intervals along the compiled routes, so a route-following scooter's zone is a binary
+search instead of polygon tests.
+
+Route-following scooters move in a straight line (in lat/lng) between two waypoints of
+their route. For every route segment, the fractions of the segment where it crosses a zone
+boundary are computed once, and the zone of every stretch in between (free, slow, parking,
+charging, outofbounds) is classified once, at its midpoint - the zone cannot change within
+a stretch, as no boundary crosses it. A scooter on the segment then takes the zone of the
+stretch its position falls in (bisect on the fraction, i.e. on the distance along the
+segment), and the speed limit follows from the zone as before.
+
+Anything that is not clearly inside one stretch falls back to the live classification
+(City.classify_zone):
+- scooters off their route segment (special behaviors, external rentals, the leg to the
+  first waypoint)
+- positions at a waypoint or within BREAK_MARGIN_DEG of a boundary crossing, where the
+  boundary itself (which counts as inside) decides
+- stretches that run along a zone boundary (e.g. a street on the city zone's edge), where
+  rounding alone puts a position on either side - their zone is None
+
+The intervals belong to one City's zones: RouteZones.is_current() tells when they were
+computed for other zones (City.set_zones) and have to be recomputed.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from city import ZONE_NAMES
+
+
+# A position counts as on its segment within this distance (degrees) of the segment line -
+# rounding of the interpolated positions stays far below it
+ON_ROUTE_TOLERANCE_DEG = 1e-12
+
+# Positions this close (degrees along the segment) to a crossing or waypoint take the live test
+BREAK_MARGIN_DEG = 1e-11
+
+# Stretches with their midpoint this close (degrees) to a zone boundary run along it
+ALONG_BOUNDARY_DEG = 1e-9
+
+# Segments intersected with the zone boundaries at once (bounds the Shapely temporaries)
+CHUNK_SEGMENTS = 4096
+
+# Breaks of a segment without crossings
+WHOLE_SEGMENT = (0.0, 1.0)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# One travel direction
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class DirectionZones:
+    """
+    Zone intervals of a route in one travel direction (route_table.RouteDirection).
+
+    - breaks[i]: fractions (0.0 .. 1.0, ascending, both ends included) of forward segment i,
+      from waypoint i to waypoint i + 1, where the zone may change
+    - zones[i]: zone of each stretch between two breaks (one less than breaks[i]), None for
+      stretches along a zone boundary
+
+    Both directions share the forward breaks and zones - the reversed direction (reverse=True)
+    reads them backwards.
+    """
+    __slots__ = ("waypoints", "breaks", "zones", "reverse")
+
+    def __init__(self, waypoints, breaks, zones, reverse=False):
+        self.waypoints = waypoints
+        self.breaks = breaks
+        self.zones = zones
+        self.reverse = reverse
+
+    def reversed(self):
+        """
+        The same intervals, for the route travelled backwards.
+        """
+        return DirectionZones(self.waypoints[::-1], self.breaks, self.zones, not self.reverse)
+
+    def zone_at(self, route_index, lat, lng):
+        """
+        Zone of a scooter at (lat, lng) heading for waypoint route_index, None when that
+        takes the live classification (off the segment, at a waypoint or crossing).
+        """
+        if route_index < 1 or route_index >= len(self.waypoints):
+            return None
+
+        (lat0, lng0), (lat1, lng1) = self.waypoints[route_index - 1], self.waypoints[route_index]
+        d_lat, d_lng = lat1 - lat0, lng1 - lng0
+
+        # Fraction along the segment from its longer axis, distance from the line on the other
+        if abs(d_lng) >= abs(d_lat):
+            span = abs(d_lng)
+            if span == 0.0:
+                return None
+            fraction = (lng - lng0) / d_lng
+            off_route = lat - (lat0 + fraction * d_lat)
+        else:
+            span = abs(d_lat)
+            fraction = (lat - lat0) / d_lat
+            off_route = lng - (lng0 + fraction * d_lng)
+
+        if not 0.0 < fraction < 1.0 or abs(off_route) > ON_ROUTE_TOLERANCE_DEG:
+            return None
+
+        segment = route_index - 1
+        if self.reverse:
+            segment = len(self.breaks) - 1 - segment
+            fraction = 1.0 - fraction
+
+        breaks = self.breaks[segment]
+        stretch = bisect_right(breaks, fraction) - 1
+        if (fraction - breaks[stretch]) * span < BREAK_MARGIN_DEG or (breaks[stretch + 1] - fraction) * span < BREAK_MARGIN_DEG:
+            return None
+
+        return self.zones[segment][stretch]
+
+
+def segment_fractions(starts, ends, points):
+    """
+    Fraction along each segment (starts[k] -> ends[k], (lng, lat) rows) of a point on it,
+    measured on the segment's longer axis - the same way DirectionZones.zone_at does.
+    NaN for zero-length segments.
+    """
+    delta = ends - starts
+    axis = (np.abs(delta[:, 1]) > np.abs(delta[:, 0])).astype(np.intp)
+    rows = np.arange(len(starts))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (points[rows, axis] - starts[rows, axis]) / delta[rows, axis]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# All routes of a simulator
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class RouteZones:
+    """
+    DirectionZones of both travel directions of every compiled route, for one City.
+
+    Computed for many segments at once (CHUNK_SEGMENTS at a time): an STRtree query of the
+    segments against the zone boundaries and a vectorized intersection, then one
+    City.classify_many over the midpoints of every stretch, and a query for the midpoints on
+    a boundary. The reversed direction reads the forward intervals backwards.
+    """
+    def __init__(self, city, route_tables):
+        self.city = city
+        self.zones_version = city.zones_version
+        self.directions = {}
+
+        tables = [table for table in route_tables.values() if len(table) > 1]
+        if not tables:
+            return
+
+        # Every forward segment as (lng, lat) start and end rows
+        starts = np.array([(lng, lat) for table in tables for lat, lng in table.forward.waypoints[:-1]])
+        ends = np.array([(lng, lat) for table in tables for lat, lng in table.forward.waypoints[1:]])
+
+        # Fractions where a segment crosses (or runs along) a zone boundary
+        boundaries = shapely.boundary([poly for polygons in city.zones.values() for poly in polygons])
+        tree = STRtree(boundaries)
+
+        crossed = {}
+        for first in range(0, len(starts), CHUNK_SEGMENTS):
+            chunk = slice(first, first + CHUNK_SEGMENTS)
+            segments = shapely.linestrings(np.stack([starts[chunk], ends[chunk]], axis=1))
+            segment_rows, boundary_rows = tree.query(segments)
+            crossings = shapely.intersection(segments[segment_rows], boundaries[boundary_rows])
+            points, point_rows = shapely.get_coordinates(crossings, return_index=True)
+
+            point_segments = segment_rows[point_rows] + first
+            fractions = segment_fractions(starts[point_segments], ends[point_segments], points)
+            inner = (fractions > 0.0) & (fractions < 1.0)
+            for segment, fraction in zip(point_segments[inner].tolist(), fractions[inner].tolist()):
+                crossed.setdefault(segment, {0.0, 1.0}).add(fraction)
+
+        breaks = [WHOLE_SEGMENT] * len(starts)
+        for segment, fractions in crossed.items():
+            breaks[segment] = tuple(sorted(fractions))
+
+        # Zone of every stretch, classified at its midpoint - none for stretches along a boundary
+        stretch_segments = np.repeat(np.arange(len(breaks)), [len(fractions) - 1 for fractions in breaks])
+        middles = np.array([(a + b) / 2 for fractions in breaks for a, b in zip(fractions, fractions[1:])])
+        positions = starts[stretch_segments] + (ends - starts)[stretch_segments] * middles[:, None]
+        names = [ZONE_NAMES[code] for code in city.classify_many(positions[:, 1], positions[:, 0])]
+
+        for first in range(0, len(positions), CHUNK_SEGMENTS):
+            middle_points = shapely.points(positions[first:first + CHUNK_SEGMENTS])
+            along, _ = tree.query(middle_points, predicate="dwithin", distance=ALONG_BOUNDARY_DEG)
+            for stretch in along.tolist():
+                names[first + stretch] = None
+
+        # One shared tuple per zone sequence (most segments lie in a single zone)
+        shared = {}
+        segment = stretch = 0
+        for table in tables:
+            segment_breaks, segment_zones = [], []
+            for _ in range(len(table) - 1):
+                count = len(breaks[segment]) - 1
+                zones = tuple(names[stretch:stretch + count])
+                segment_breaks.append(breaks[segment])
+                segment_zones.append(shared.setdefault(zones, zones))
+                segment += 1
+                stretch += count
+
+            forward = DirectionZones(table.forward.waypoints, segment_breaks, segment_zones)
+            self.directions[table.route_id] = (forward, forward.reversed())
+
+    def is_current(self, city):
+        """
+        Whether these intervals were computed for the given city's current zones.
+        """
+        return city is self.city and city.zones_version == self.zones_version
+
+    def for_trip(self, route_id, trip_counter):
+        """
+        DirectionZones of the direction travelled on a trip (see RouteTable.for_trip),
+        None for routes without segments.
+        """
+        directions = self.directions.get(route_id)
+        if directions is None:
+            return None
+        return directions[trip_counter % 2]
+
+    def stretch_count(self):
+        return sum(len(zones) for forward, _ in self.directions.values() for zones in forward.zones)
@@ -15,7 +15,6 @@ based special scenarios in the simulation.
 """
 from api import update_bike_status
 from shapely.geometry import Point
-import time
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Original: Scooter #3 parks forever in the first charging zone after 2 trips
@@ -24,7 +23,7 @@ def special_behavior_one(scooter, simulator):
     """
     After 2 trips, scooter #3 parks permanently at the true center of the first charging zone.
     """
-    trip_count = simulator.trip_counter[scooter.id]
+    trip_count = simulator.state_of(scooter.id).trip_counter
     if scooter.id != 3 or trip_count < 2:
         return False
 
@@ -53,7 +52,7 @@ def special_behavior_one(scooter, simulator):
             "speed_kmh": 0.0
         }
 
-    simulator.per_scooter_special_behavior[scooter.id] = park_and_charge
+    simulator.state_of(scooter.id).special_behavior = park_and_charge
 
     print(f"Scooter 3 parked in FIRST charging zone at ({center_lat:.8f}, {center_lng:.8f})")
 
@@ -69,7 +68,7 @@ def park_in_nearest_charging_zone(required_trips=2):
     after completing `required_trips`.
     """
     def behavior(scooter, simulator):
-        trip_count = simulator.trip_counter[scooter.id]
+        trip_count = simulator.state_of(scooter.id).trip_counter
         if trip_count < required_trips:
             return False
 
@@ -104,7 +103,7 @@ def park_in_nearest_charging_zone(required_trips=2):
                 "speed_kmh": 0.0
             }
 
-        simulator.per_scooter_special_behavior[scooter.id] = permanent_parking
+        simulator.state_of(scooter.id).special_behavior = permanent_parking
 
         print(f"Scooter {scooter.id} parked in nearest charging zone "
               f"at ({park_lat:.8f}, {park_lng:.8f})")
@@ -122,7 +121,7 @@ def park_in_nearest_parking_zone(required_trips=2):
     Parks a scooter in the nearest parking zone after completing `required_trips`.
     """
     def behavior(scooter, simulator):
-        trip_count = simulator.trip_counter[scooter.id]
+        trip_count = simulator.state_of(scooter.id).trip_counter
         if trip_count < required_trips:
             return False
 
@@ -157,7 +156,7 @@ def park_in_nearest_parking_zone(required_trips=2):
                 "speed_kmh": 0.0
             }
 
-        simulator.per_scooter_special_behavior[scooter.id] = permanent_parking
+        simulator.state_of(scooter.id).special_behavior = permanent_parking
 
         print(f"Scooter {scooter.id} parked in NEAREST parking zone "
               f"at ({park_lat:.8f}, {park_lng:.8f})")
@@ -173,12 +172,16 @@ def park_in_nearest_parking_zone(required_trips=2):
 def breakdown_after_seconds(seconds=300):
     """
     Scooter breaks down ("needService") after approximately `seconds` of
-    simulation time.
+    simulation time, counted on the simulator's clock from the first tick it is consulted.
     """
-    start_time = time.time()
+    start_time = None
 
     def behavior(scooter, simulator):
-        elapsed = time.time() - start_time
+        nonlocal start_time
+        if start_time is None:
+            start_time = simulator.clock.time()
+
+        elapsed = simulator.clock.time() - start_time
 
         if elapsed >= seconds:
             if scooter.status != "needService":
@@ -197,7 +200,7 @@ def breakdown_after_seconds(seconds=300):
                     "activity": "idle"
                 }
 
-            simulator.per_scooter_special_behavior[scooter.id] = broken_down
+            simulator.state_of(scooter.id).special_behavior = broken_down
 
             print(
                 f"Scooter {scooter.id} broke down after ~{int(elapsed)}s"
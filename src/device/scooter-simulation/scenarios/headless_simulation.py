@@ -0,0 +1,131 @@
+"""
+@module headless_simulation
+
+Headless (accelerated) city simulation, for capacity tests and long scenario runs.
+
+Runs one city scenario on a virtual clock: ticks run back-to-back as fast as the CPU allows,
+or at a fixed multiple of real time with --speedup, while every tick still covers
+the normal tick interval of simulated time.
+
+Point SIM_API_URL at a local stand-in backend to keep the load away from the real system.
+
+Example - a simulated day of Malmö traffic, as fast as possible:
+    python scenarios/headless_simulation.py --city malmoe --batches 4 --duration 86400
+"""
+
+import argparse
+from scenarios.routes.v1.routes import MALMOE_ROUTES, KARLSKRONA_ROUTES, UMEA_ROUTES
+from scenarios.routes.v1.cache.route_waypoint_cache import ROUTE_WAYPOINT_CACHE_BY_CITY
+from config import UPDATE_INTERVAL
+from helpers import wait_for_backend_response
+from simulation_helper import (
+    setup_city_simulation,
+    load_route_assigned_scooters_in_batches,
+    add_stationary_scooters,
+    run_simulation_headless,
+    setup_simulator_listeners
+)
+
+# Same per-city id ranges as the scenario scripts
+CITIES = {
+    "malmoe": {
+        "city_name": "Malmö",
+        "routes": MALMOE_ROUTES,
+        "start_sid": 1,
+        "max_sid": 1000,
+        "user_id_min": 1,
+        "user_id_max": 2000,
+        "special_battery_level": 21.8,
+    },
+    "umea": {
+        "city_name": "Umeå",
+        "routes": UMEA_ROUTES,
+        "start_sid": 1001,
+        "max_sid": 1500,
+        "user_id_min": 2001,
+        "user_id_max": 3000,
+        "special_battery_level": 21.8,
+    },
+    "karlskrona": {
+        "city_name": "Karlskrona",
+        "routes": KARLSKRONA_ROUTES,
+        "start_sid": 1501,
+        "max_sid": 2000,
+        "user_id_min": 3001,
+        "user_id_max": 4000,
+        "special_battery_level": 20.8,
+    },
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a city simulation headless on a virtual clock.")
+    parser.add_argument("--city", choices=sorted(CITIES), default="malmoe")
+    parser.add_argument("--engine", choices=("classic", "fleet"), default="classic")
+    parser.add_argument("--shards", type=int, default=None, help="split the fleet over N worker processes")
+    parser.add_argument("--batches", type=int, default=1, help="route batches to load")
+    parser.add_argument("--max-sid", type=int, default=None, help="override the city's last scooter id")
+    parser.add_argument("--per-zone", type=int, default=5, help="stationary scooters per parking/charging zone")
+    parser.add_argument("--duration", type=float, default=None, help="simulated seconds to run")
+    parser.add_argument("--ticks", type=int, default=None, help="number of ticks to run")
+    parser.add_argument("--speedup", type=float, default=None, help="N x real time (default: as fast as possible)")
+    parser.add_argument("--tick-interval", type=float, default=UPDATE_INTERVAL, help="simulated seconds per tick")
+    parser.add_argument("--phase-slots", type=int, default=1, help="stagger the fleet over N slots of the tick interval")
+    return parser.parse_args()
+
+
+def run():
+    args = parse_args()
+    city = CITIES[args.city]
+    max_sid = args.max_sid or city["max_sid"]
+
+    print(f"Headless simulation starting ({city['city_name']})…", flush=True)
+
+    wait_for_backend_response()
+
+    simulator, scooters, ordered_routes, next_sid = setup_city_simulation(
+        city_name=city["city_name"],
+        routes=city["routes"],
+        start_sid=city["start_sid"],
+        user_id_min=city["user_id_min"],
+        user_id_max=city["user_id_max"],
+        user_pool_max=None,
+        engine=args.engine,
+        tick_interval=args.tick_interval,
+        shards=args.shards,
+        phase_slots=args.phase_slots
+    )
+
+    admin_listener, rental_listener = setup_simulator_listeners(simulator)
+
+    next_sid, _ = load_route_assigned_scooters_in_batches(
+        simulator=simulator,
+        scooters=scooters,
+        ordered_routes=ordered_routes,
+        next_sid=next_sid,
+        num_batches=args.batches,
+        special_battery_level=city["special_battery_level"],
+        max_sid=max_sid,
+        route_waypoint_cache=ROUTE_WAYPOINT_CACHE_BY_CITY.get(city["city_name"])
+    )
+
+    next_sid, added = add_stationary_scooters(
+        scooters=scooters,
+        simulator=simulator,
+        current_sid=next_sid,
+        max_sid=max_sid,
+        scooters_per_zone=args.per_zone
+    )
+    print(f"{len(scooters)} scooters active in {city['city_name']} ({added} stationary)")
+
+    run_simulation_headless(
+        simulator=simulator,
+        scooters=scooters,
+        duration=args.duration,
+        max_ticks=args.ticks,
+        speedup=args.speedup
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,433 @@
+"""
+@module load_generator
+
+Rate-controlled load generator for the backend, with the exact message shapes of the simulator.
+
+Runs a fleet of scooters (default 20000) on a city's routes and holds a target rate per
+second for each kind of traffic the simulator sends, whatever the fleet size:
+
+- rental_create     POST /rentals/sim (api.create_rental), a status update to "active",
+                    and the first breadcrumbs of the trip in Redis
+- rental_complete   the trip's breadcrumbs from Redis, PUT /rentals/sim/{id}
+                    (api.complete_rental), and the rental:completed summary
+- status_update     PUT /bikes/{id}/status/sim (api.update_bike_status_and_position)
+                    with the scooter's current status and position
+- state_frame       scooter:state:tick frames (ScooterBroadcaster), one pipeline per step
+
+Every step (default 50 ms) each stream issues the events due by then. Backend calls run on a
+pool of worker threads. When every worker is busy, a due event is dropped and counted rather
+than queued, so a backend that cannot keep up shows as achieved < target instead of a
+growing backlog. A completion takes the oldest open rental, a creation a free scooter;
+without one, the event is dropped too. Redis is only written from the main thread.
+
+Achieved vs target rates are printed every few seconds, latency percentiles per stream at the end.
+
+Example - 20k scooters in Malmö, 10 rentals/s started and completed, 50 status updates/s,
+and the state frames of the whole fleet every UPDATE_INTERVAL, for five minutes:
+    python scenarios/load_generator.py --scooters 20000 --rentals 10 --completions 10 --status 50 --duration 300
+"""
+
+import argparse
+import json
+import queue
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import api
+from config import UPDATE_INTERVAL
+from scheduler import TickScheduler
+from profiler import percentiles
+from scooter import Scooter
+from redisbroadcast import ScooterBroadcaster
+from scenarios.routes.v1.routes import MALMOE_ROUTES, KARLSKRONA_ROUTES, UMEA_ROUTES
+
+
+STREAMS = ("rental_create", "rental_complete", "status_update", "state_frame")
+
+ROUTES = {"malmoe": MALMOE_ROUTES, "karlskrona": KARLSKRONA_ROUTES, "umea": UMEA_ROUTES}
+
+# Breadcrumbs logged per rental (the completed rental's route)
+TRAIL_WAYPOINTS = 8
+
+
+class RateStream:
+    """
+    Target rate and outcome of one kind of traffic.
+    """
+    def __init__(self, name, rate, latency_window=100_000):
+        self.name = name
+        self.rate = rate
+        self.scheduled = 0      # Events due so far (sent or dropped)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    def take_due(self, elapsed):
+        """
+        Number of events that became due since the last call, elapsed seconds into the run.
+        """
+        count = int(self.rate * elapsed) - self.scheduled
+        if count <= 0:
+            return 0
+        self.scheduled += count
+        return count
+
+    def record(self, seconds, ok):
+        self.sent += 1
+        self.latencies.append(seconds)
+        if not ok:
+            self.failed += 1
+
+    def summary(self, duration):
+        return {
+            "target_per_s": self.rate,
+            "achieved_per_s": round(self.sent / duration, 2) if duration else 0.0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "latency": percentiles(self.latencies),
+        }
+
+
+class LoadGenerator:
+    """
+    Issues rate-controlled backend and Redis traffic for a fleet of scooters.
+    rates: stream name -> events per second (see STREAMS).
+    """
+    def __init__(self, routes, scooters, rates, users, rbroadcast, first_sid=1, concurrency=32, step=0.05, seed=42):
+        self.rng = random.Random(seed)
+        self.rbroadcast = rbroadcast
+        self.users = list(users) or [{"user_id": 1, "user_name": "Simulated User"}]
+        self.step = step
+        self.streams = {name: RateStream(name, rates.get(name, 0.0)) for name in STREAMS}
+
+        # Every scooter starts at a random waypoint of a random route, and moves along it per trip
+        route_list = [waypoints for waypoints in routes.values() if waypoints]
+        self.fleet = []
+        self.position = {}
+        for sid in range(first_sid, first_sid + scooters):
+            waypoints = self.rng.choice(route_list)
+            index = self.rng.randrange(len(waypoints))
+            scooter = Scooter(sid=sid, lat=waypoints[index][0], lng=waypoints[index][1], rbroadcast=rbroadcast)
+            scooter.status = "available"
+            self.fleet.append(scooter)
+            self.position[sid] = (waypoints, index)
+
+        self.free = list(self.fleet)
+        self.open_rentals = deque()     # (scooter, rental summary), oldest first
+        self._next_frame = 0
+
+        # Backend calls in flight on the workers, and their outcomes for the main thread
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load")
+        self._outcomes = queue.SimpleQueue()
+
+        self.scheduler = TickScheduler(interval=step)
+        self._started = None
+        self._finished = None
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Run loop
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def run(self, duration, report_every=5.0):
+        """
+        Generate load for duration seconds, printing achieved vs target rates every
+        report_every seconds. Returns the summary (see summary()).
+        """
+        self._started = time.monotonic()
+        last_report = (self._started, {name: 0 for name in STREAMS})
+
+        def step():
+            nonlocal last_report
+            self.tick()
+            now = time.monotonic()
+            if now - last_report[0] >= report_every:
+                self._print_rates(now - last_report[0], last_report[1])
+                last_report = (now, {name: stream.sent for name, stream in self.streams.items()})
+
+        try:
+            self.scheduler.run(step, max_ticks=max(1, round(duration / self.step)))
+        except KeyboardInterrupt:
+            print("Stopped.")
+        finally:
+            # Rates are over the issuing window; calls still in flight finish and count
+            self._finished = time.monotonic()
+            self._executor.shutdown(wait=True)
+            self._handle_outcomes()
+
+        return self.summary()
+
+    def tick(self):
+        """
+        One step: handle finished backend calls, then issue every event due by now.
+        """
+        self._handle_outcomes()
+        elapsed = time.monotonic() - self._started
+        streams = self.streams
+
+        for _ in range(streams["rental_complete"].take_due(elapsed)):
+            self._complete_rental()
+        for _ in range(streams["rental_create"].take_due(elapsed)):
+            self._create_rental()
+        for _ in range(streams["status_update"].take_due(elapsed)):
+            self._update_status()
+
+        frames = streams["state_frame"].take_due(elapsed)
+        if frames:
+            self._publish_frames(frames)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Traffic
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _create_rental(self):
+        stream = self.streams["rental_create"]
+        if not self.free:
+            stream.dropped += 1
+            return
+
+        index = self.rng.randrange(len(self.free))
+        scooter = self.free[index]
+        self.free[index] = self.free[-1]
+        self.free.pop()
+
+        user = self.rng.choice(self.users)
+
+        def call():
+            data = api.create_rental(
+                customer_id=user["user_id"],
+                bike_id=scooter.id,
+                start_point={"lat": float(scooter.lat), "lng": float(scooter.lng)},
+                start_zone="free",
+            )
+            if isinstance(data, dict) and data.get("rental_id"):
+                api.update_bike_status_and_position(scooter.id, "active", scooter.lat, scooter.lng)
+            return data
+
+        if not self._submit(stream, call, lambda data: self._rental_started(scooter, user, data)):
+            self.free.append(scooter)
+
+    def _rental_started(self, scooter, user, data):
+        rental_id = data.get("rental_id") if isinstance(data, dict) else None
+        if not rental_id:
+            self.free.append(scooter)
+            return False
+
+        # The trip: a few waypoints further along the scooter's route
+        waypoints, index = self.position[scooter.id]
+        self.rbroadcast.clear_coords(rental_id)
+        for step in range(TRAIL_WAYPOINTS):
+            lat, lng = waypoints[(index + step) % len(waypoints)]
+            self.rbroadcast.log_coord(rental_id, lat, lng, 0.0 if step == 0 else round(self.rng.uniform(10, 20), 1))
+        index = (index + TRAIL_WAYPOINTS - 1) % len(waypoints)
+        self.position[scooter.id] = (waypoints, index)
+
+        scooter.status = "active"
+        self.open_rentals.append((scooter, {
+            "rental_id": rental_id,
+            "user_id": user["user_id"],
+            "user_name": user["user_name"],
+            "end_point": {"lat": float(waypoints[index][0]), "lng": float(waypoints[index][1])},
+        }))
+        return True
+
+    def _complete_rental(self):
+        stream = self.streams["rental_complete"]
+        if not self.open_rentals or self.in_flight >= self.concurrency:
+            stream.dropped += 1
+            return
+
+        scooter, rental = self.open_rentals.popleft()
+        route = self.rbroadcast.load_coords(rental["rental_id"])
+        if route:
+            route[-1]["spd"] = 0.0
+
+        def call():
+            return api.complete_rental(
+                rental_id=rental["rental_id"],
+                end_point=rental["end_point"],
+                end_zone="free",
+                route=route,
+            )
+
+        self._submit(stream, call, lambda completed: self._rental_completed(scooter, rental, route, completed))
+
+    def _rental_completed(self, scooter, rental, route, completed):
+        scooter.lat, scooter.lng = rental["end_point"]["lat"], rental["end_point"]["lng"]
+        scooter.status = "available"
+        self.free.append(scooter)
+
+        self.rbroadcast.publish_completed({
+            "type": "completed_rental",
+            "rental_id": rental["rental_id"],
+            "scooter_id": scooter.id,
+            "coords": route,
+            "user_id": rental["user_id"],
+            "user_name": rental["user_name"],
+            "start_zone": "free",
+            "end_zone": "free",
+        })
+        self.rbroadcast.clear_coords(rental["rental_id"])
+        return bool(completed)
+
+    def _update_status(self):
+        scooter = self.fleet[self.rng.randrange(len(self.fleet))]
+        status, lat, lng = scooter.status, scooter.lat, scooter.lng
+        self._submit(
+            self.streams["status_update"],
+            lambda: api.update_bike_status_and_position(scooter.id, status, lat, lng),
+            bool
+        )
+
+    def _publish_frames(self, count):
+        """
+        count state frames, round robin over the fleet, in one pipeline.
+        """
+        stream = self.streams["state_frame"]
+        fleet = self.fleet
+
+        started = time.perf_counter()
+        with self.rbroadcast.batched():
+            for _ in range(count):
+                fleet[self._next_frame].publish()
+                self._next_frame = (self._next_frame + 1) % len(fleet)
+        seconds = time.perf_counter() - started
+
+        stream.sent += count
+        stream.latencies.append(seconds)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Worker calls
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _submit(self, stream, call, on_done):
+        """
+        Run call on a worker; on_done(result) -> ok runs on the main thread afterwards.
+        Returns False (and counts a drop) when every worker is busy.
+        """
+        if self.in_flight >= self.concurrency:
+            stream.dropped += 1
+            return False
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                result = call()
+            except Exception as e:
+                print(f"[Load] WARNING: {stream.name} call threw: {e}")
+                result = None
+            self._outcomes.put((stream, on_done, result, time.perf_counter() - started))
+
+        self.in_flight += 1
+        self._executor.submit(timed)
+        return True
+
+    def _handle_outcomes(self):
+        while True:
+            try:
+                stream, on_done, result, seconds = self._outcomes.get_nowait()
+            except queue.Empty:
+                return
+            self.in_flight -= 1
+            stream.record(seconds, on_done(result))
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Reporting
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _print_rates(self, seconds, sent_before):
+        rates = " | ".join(
+            f"{name} {(stream.sent - sent_before[name]) / seconds:.1f}/{stream.rate:g}"
+            for name, stream in self.streams.items() if stream.rate
+        )
+        print(f"[Load] achieved/target per s: {rates} | in flight {self.in_flight}, open rentals {len(self.open_rentals)}")
+
+    def summary(self):
+        if self._started is None:
+            duration = 0.0
+        else:
+            duration = (self._finished or time.monotonic()) - self._started
+        return {
+            "duration_s": round(duration, 1),
+            "scooters": len(self.fleet),
+            "streams": {name: stream.summary(duration) for name, stream in self.streams.items()},
+            "endpoints": {
+                endpoint: {
+                    "calls": stats["calls"],
+                    "failures": stats["failures"],
+                    "mean_ms": round(stats["seconds"] / stats["calls"] * 1000, 1) if stats["calls"] else None,
+                }
+                for endpoint, stats in sorted(api.HTTP_STATS.items())
+            },
+            "scheduler": self.scheduler.stats.snapshot(),
+        }
+
+
+def print_summary(summary):
+    print()
+    print(f"{summary['scooters']} scooters, {summary['duration_s']}s")
+    print(
+        f"{'stream':>16} {'target/s':>9} {'achieved/s':>11} {'sent':>8} {'failed':>7} {'dropped':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for name, stream in summary["streams"].items():
+        latency = {key: "-" if value is None else value for key, value in stream["latency"].items()}
+        print(
+            f"{name:>16} {stream['target_per_s']:>9g} {stream['achieved_per_s']:>11} {stream['sent']:>8} "
+            f"{stream['failed']:>7} {stream['dropped']:>8} {latency['p50_ms']:>8} {latency['p95_ms']:>8} "
+            f"{latency['p99_ms']:>8} {latency['max_ms']:>8}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--city", choices=sorted(ROUTES), default="malmoe")
+    parser.add_argument("--scooters", type=int, default=20_000)
+    parser.add_argument("--first-sid", type=int, default=1, help="id of the first scooter (bike) used")
+    parser.add_argument("--rentals", type=float, default=5.0, help="rental creations per second")
+    parser.add_argument("--completions", type=float, default=5.0, help="rental completions per second")
+    parser.add_argument("--status", type=float, default=20.0, help="status updates per second")
+    parser.add_argument("--frames", type=float, default=None, help="state frames per second (default: the fleet every UPDATE_INTERVAL)")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run")
+    parser.add_argument("--concurrency", type=int, default=32, help="backend calls in flight at most")
+    parser.add_argument("--step", type=float, default=0.05, help="seconds between issuing rounds")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the summary as JSON")
+    return parser.parse_args()
+
+
+def run():
+    args = parse_args()
+    rates = {
+        "rental_create": args.rentals,
+        "rental_complete": args.completions,
+        "status_update": args.status,
+        "state_frame": args.scooters / UPDATE_INTERVAL if args.frames is None else args.frames,
+    }
+
+    print(f"[Load] {args.scooters} scooters in {args.city}, targets per s: {rates}", flush=True)
+
+    generator = LoadGenerator(
+        routes=ROUTES[args.city],
+        scooters=args.scooters,
+        rates=rates,
+        users=api.fetch_users(),
+        rbroadcast=ScooterBroadcaster(),
+        first_sid=args.first_sid,
+        concurrency=args.concurrency,
+        step=args.step,
+        seed=args.seed
+    )
+    summary = generator.run(args.duration, report_every=args.report_every)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(summary, handle, indent=2)
+        print(f"[Load] Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,34 @@
+"""
+@module multi_city_simulation
+
+Runs the small Malmö, Umeå and Karlskrona scenarios in one host process.
+
+All three cities share the process' Redis connection pool and HTTP session, one pair of
+admin/rental listeners (routing by scooter id), and one scheduler that ticks the cities
+in turn, spread evenly over the tick interval.
+"""
+
+from helpers import wait_for_backend_response
+from multi_city import MultiCityHost
+from simulation_helper import setup_simulator_listeners
+from small_simulation_malmoe import build as build_malmoe
+from small_simulation_umea import build as build_umea
+from small_simulation_karlskrona import build as build_karlskrona
+
+
+def run():
+    print("Multi-city simulation starting…", flush=True)
+
+    wait_for_backend_response()
+
+    host = MultiCityHost([build_malmoe()[0], build_umea()[0], build_karlskrona()[0]])
+
+    admin_listener, rental_listener = setup_simulator_listeners(host.router)
+
+    print(f"Hosting {len(host.router.scooters)} scooters in {len(host.simulators)} cities")
+
+    host.run()
+
+
+if __name__ == "__main__":
+    run()
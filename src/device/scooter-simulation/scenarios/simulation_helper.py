@@ -7,14 +7,21 @@ Provides modular, DRY logic for:
 - Base simulator setup (city, routes, user pool)
 - Loading route-assigned scooters in deterministic spread batches
 - Adding stationary scooters in parking/charging zones
-- Running the simulation tick loop
+- Running the simulation tick loop (real time, or headless on a virtual/accelerated clock)
 """
 
+import math
 import time
+import asyncio
+import itertools
 import random
 import bisect
 from scooter import Scooter
-from config import UPDATE_INTERVAL
+from config import UPDATE_INTERVAL, PROFILE_DUMP_PATH
+from scheduler import TickScheduler
+from profiler import install_dump_signal
+from metrics import start_metrics_server
+from clock import ScaledClock, VirtualClock
 
 from api import update_bike_status_and_position, fetch_users
 from utils import calculate_distance_in_m
@@ -179,31 +186,14 @@ def _register_new_scooter_in_simulator(
     """
     Registers a newly introduced scooter into a simulator instance.
     """
-    # Route is optional - stationary-by-default scooters do not require a route.
-    if route_id is not None:
-        simulator.scooter_to_route[scooter.id] = route_id
-
-    simulator.trip_counter[scooter.id] = trip_counter_value
-    simulator.next_waypoint_index[scooter.id] = {"route_index": waypoint_index}
-    simulator.last_position[scooter.id] = (scooter.lat, scooter.lng)
-    simulator.last_travel_direction[scooter.id] = None
-    simulator.per_scooter_special_behavior[scooter.id] = special_behavior
-
-    simulator.rentals[scooter.id] = {
-        "active": False,
-        "rental_id": rental_id,
-        "user_id": None,
-        "user_name": None,
-        "start_zone": "free",
-        "end_zone": "free",
-    }
-    simulator.external_rentals[scooter.id] = {
-        "active": False,
-        "rental_id": None,
-        "user_id": None,
-        "user_name": None,
-    }
-
+    simulator.register_scooter(
+        scooter,
+        route_id=route_id,
+        waypoint_index=waypoint_index,
+        trip_counter_value=trip_counter_value,
+        special_behavior=special_behavior,
+        rental_id=rental_id
+    )
 
 
 def select_scooter_route_entry_point(route_waypoints, entry_position, city=None):
@@ -443,25 +433,27 @@ def load_route_assigned_scooters_in_batches(
             if route_waypoint_cache is not None:
                 cached = route_waypoint_cache.get(route_index)
 
+            # Cumulative distances from the cache, else from the simulator's compiled route
+            table = simulator.route_tables.get(route_index)
             if cached is not None and cached.get("num_waypoints") == len(route_coordinates):
                 cumulative_distances = cached.get("cumulative_distances_m")
                 total_distance_meters = cached.get("total_distance_m")
-
-                latitude, longitude, waypoint_index, trip_counter_value = select_scooter_route_entry_point_distance(
-                    route_coordinates,
-                    position,
-                    city=simulator.city,
-                    cumulative_distances=cumulative_distances,
-                    total_distance_meters=total_distance_meters
-                )
+            elif table is not None and len(table) == len(route_coordinates):
+                cumulative_distances = table.forward.cumulative_m
+                total_distance_meters = table.forward.total_m
             else:
-                latitude, longitude, waypoint_index, trip_counter_value = select_scooter_route_entry_point_distance(
-                    route_coordinates,
-                    position,
-                    city=simulator.city
-                )
+                cumulative_distances = None
+                total_distance_meters = None
+
+            latitude, longitude, waypoint_index, trip_counter_value = select_scooter_route_entry_point_distance(
+                route_coordinates,
+                position,
+                city=simulator.city,
+                cumulative_distances=cumulative_distances,
+                total_distance_meters=total_distance_meters
+            )
 
-            scooter = Scooter(
+            scooter = simulator.create_scooter(
                 sid=current_sid,
                 lat=latitude,
                 lng=longitude,
@@ -516,12 +508,28 @@ def setup_city_simulation(
     start_sid,
     user_id_min,
     user_id_max,
-    user_pool_max=None
+    user_pool_max=None,
+    engine="classic",
+    tick_interval=UPDATE_INTERVAL,
+    shards=None,
+    phase_slots=1,
+    asynchronous=False
 ):
     """
     Setup a city simulation in a low-level, readable way, whilst also making the process
     more dry.
 
+    The engine selects the Simulator implementation: "classic" (per-scooter loop) or
+    "fleet" (NumPy struct-of-arrays engine for very large fleets).
+    tick_interval is the simulated seconds each tick covers.
+    With shards set, the fleet is split over that many worker processes, each running
+    the selected engine (see sharding.ShardedSimulator).
+    phase_slots > 1 staggers the fleet over that many slots of the tick interval
+    (see Simulator.advance_phase).
+    asynchronous selects the async variant of the engine, which sends the backend writes and
+    Redis operations of a tick concurrently (see async_simulator.py) - run it with
+    run_simulation_by_tick / run_simulation_async as usual.
+
     Creates:
     - City from API
     - Broadcaster
@@ -535,9 +543,21 @@ def setup_city_simulation(
     """
     from city import City
     from simulator import Simulator
-    from redisbroadcast import ScooterBroadcaster
+    from fleet_simulator import FleetSimulator
+    from sharding import ShardedSimulator
+    from redisbroadcast import ScooterBroadcaster, AsyncScooterBroadcaster
+    from async_simulator import AsyncSimulator, AsyncFleetSimulator
+
+    if asynchronous and shards:
+        raise ValueError("The async simulator does not run sharded")
+
+    if asynchronous:
+        engines = {"classic": AsyncSimulator, "fleet": AsyncFleetSimulator}
+        rbroadcast = AsyncScooterBroadcaster()
+    else:
+        engines = {"classic": Simulator, "fleet": FleetSimulator}
+        rbroadcast = ScooterBroadcaster()
 
-    rbroadcast = ScooterBroadcaster()
     scooters = []
 
     city = City.from_api(city_name)
@@ -547,13 +567,27 @@ def setup_city_simulation(
 
     next_sid = start_sid
 
-    simulator = Simulator(
-        scooters=scooters,
-        routes=routes,
-        city=city,
-        rbroadcast=rbroadcast,
-        custom_scooter_scenarios={}
-    )
+    if shards:
+        simulator = ShardedSimulator(
+            scooters=scooters,
+            routes=routes,
+            city=city,
+            shards=shards,
+            rbroadcast=rbroadcast,
+            engine=engine,
+            tick_interval=tick_interval,
+            phase_slots=phase_slots
+        )
+    else:
+        simulator = engines[engine](
+            scooters=scooters,
+            routes=routes,
+            city=city,
+            rbroadcast=rbroadcast,
+            custom_scooter_scenarios={},
+            tick_interval=tick_interval,
+            phase_slots=phase_slots
+        )
 
     # Apply city-specific simulation pool
     apply_simulation_user_pool(
@@ -629,7 +663,7 @@ def add_stationary_scooters(scooters, simulator, current_sid, max_sid, scooters_
                 latitude = zone_centroid.y + random.uniform(-ZONE_SCOOTER_MARGIN, ZONE_SCOOTER_MARGIN)
                 longitude = zone_centroid.x + random.uniform(-ZONE_SCOOTER_MARGIN, ZONE_SCOOTER_MARGIN)
 
-                scooter = Scooter(
+                scooter = simulator.create_scooter(
                     sid=current_sid,
                     lat=latitude,
                     lng=longitude,
@@ -668,17 +702,148 @@ def add_stationary_scooters(scooters, simulator, current_sid, max_sid, scooters_
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def run_simulation_by_tick(
     simulator,
-    scooters
+    scooters,
+    scheduler=None,
+    max_ticks=None
 ):
     """
-    The final, actual runtime loop that advances the simulator tick() by tick() (UPDATE_INTERVAL).
+    The final, actual runtime loop that advances the simulator tick() by tick() (simulator.tick_interval).
+
+    Ticks run on a drift-free deadline grid (see scheduler.TickScheduler): the loop sleeps only
+    until the next tick boundary, so the tick's own duration does not add to the period.
+    Pass a scheduler to choose the overrun policy, or to keep a handle on its lag/overrun stats.
+    The default scheduler runs on the simulator's clock.
+
+    With simulator.phase_slots > 1 the scheduler runs phase_slots times per tick interval,
+    and every run advances and publishes the next slot of the fleet (max_ticks counts those).
+
+    An async simulator runs on an event loop instead (see run_simulation_async).
     """
+    if hasattr(simulator, "advance_phase_async"):
+        run_simulation_async(simulator, scooters, scheduler=scheduler, max_ticks=max_ticks)
+        return
+
+    if scheduler is None:
+        scheduler = TickScheduler(
+            interval=simulator.tick_interval / simulator.phase_slots,
+            clock=simulator.clock.monotonic,
+            sleep=simulator.clock.sleep
+        )
+
+    slots = itertools.cycle(range(simulator.phase_slots))
+
+    def tick():
+        simulator.advance_phase(next(slots))
+
+    # kill -USR1 <pid> dumps the per-phase tick profiles (see profiler.py)
+    install_dump_signal(PROFILE_DUMP_PATH)
+    metrics_server = start_metrics_server([simulator], scheduler)
+
     try:
-        while True:
-            simulator.tick()
-            for scooter in scooters:
-                scooter.publish()
+        scheduler.run(tick, max_ticks=max_ticks)
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        print(f"[Scheduler] {scheduler.stats.snapshot()}")
+        if simulator.phase_slots > 1:
+            print(f"[Phases] {simulator.phase_load}")
 
-            time.sleep(UPDATE_INTERVAL)
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Async runtime loop (async simulator)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def run_simulation_async(
+    simulator,
+    scooters,
+    scheduler=None,
+    max_ticks=None
+):
+    """
+    run_simulation_by_tick for an async simulator (async_simulator.py): the same deadline grid
+    and phase slots, on an asyncio event loop, awaiting each phase so that its backend writes
+    and Redis operations are sent concurrently.
+    """
+    import async_api
+
+    if scheduler is None:
+        scheduler = TickScheduler(
+            interval=simulator.tick_interval / simulator.phase_slots,
+            clock=simulator.clock.monotonic
+        )
+
+    slots = itertools.cycle(range(simulator.phase_slots))
+
+    async def tick():
+        await simulator.advance_phase_async(next(slots))
+
+    install_dump_signal(PROFILE_DUMP_PATH)
+    metrics_server = start_metrics_server([simulator], scheduler)
+
+    async def run():
+        try:
+            await scheduler.run_async(tick, sleep=simulator.clock.asleep, max_ticks=max_ticks)
+        finally:
+            await async_api.aclose()
+            await simulator.rbroadcast.aclose()
+
+    try:
+        asyncio.run(run())
     except KeyboardInterrupt:
         print("Stopped.")
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        print(f"[Scheduler] {scheduler.stats.snapshot()}")
+        if simulator.phase_slots > 1:
+            print(f"[Phases] {simulator.phase_load}")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Headless runtime loop (virtual or accelerated clock)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def run_simulation_headless(
+    simulator,
+    scooters,
+    duration=None,
+    max_ticks=None,
+    speedup=None
+):
+    """
+    Run the simulation without waiting on wall time.
+
+    With speedup=None ticks run back-to-back as fast as the CPU allows (virtual clock),
+    otherwise simulated time runs `speedup` times faster than wall time.
+    Each tick still covers simulator.tick_interval simulated seconds, so movement, battery
+    and time-based behaviors play out exactly as in a real-time run.
+
+    Stops after `duration` simulated seconds or `max_ticks` ticks (whichever comes first),
+    or runs until interrupted when neither is given.
+    """
+    clock = VirtualClock() if speedup is None else ScaledClock(speedup)
+    simulator.clock = clock
+
+    if duration is not None:
+        duration_ticks = math.ceil(duration / simulator.tick_interval)
+        max_ticks = duration_ticks if max_ticks is None else min(max_ticks, duration_ticks)
+
+    # With phase slots the scheduler runs once per slot
+    scheduler = TickScheduler(
+        interval=simulator.tick_interval / simulator.phase_slots,
+        clock=clock.monotonic,
+        sleep=clock.sleep
+    )
+    max_runs = None if max_ticks is None else max_ticks * simulator.phase_slots
+
+    started = time.monotonic()
+    run_simulation_by_tick(simulator, scooters, scheduler=scheduler, max_ticks=max_runs)
+    wall_seconds = time.monotonic() - started
+
+    ticks = scheduler.stats.ticks // simulator.phase_slots
+    simulated_seconds = scheduler.stats.ticks * scheduler.interval
+    print(
+        f"[Headless] {ticks} ticks, {simulated_seconds:.0f}s simulated "
+        f"in {wall_seconds:.1f}s wall time ({simulated_seconds / max(wall_seconds, 1e-9):.0f}x)"
+    )
+    return scheduler.stats
@@ -23,11 +23,11 @@ NUM_BATCHES = 1  # Malmö specific
 SCOOTERS_PER_SPECIAL_ZONE = 5
 
 
-def run():
-    print("Simulation starting…", flush=True)
-
-    wait_for_backend_response()
-
+def build():
+    """
+    Build the Umeå simulator and its fleet, without listeners or run loop.
+    Returns (simulator, scooters).
+    """
     simulator, scooters, ordered_routes, next_sid = setup_city_simulation(
         city_name="Umeå",
         routes=UMEA_ROUTES,
@@ -41,8 +41,6 @@ def run():
     #simulator.custom_scooter_scenarios[1501] = park_in_nearest_charging_zone(required_trips=1)
     #simulator.custom_scooter_scenarios[1504] = breakdown_after_seconds(seconds=25)
 
-    admin_listener, rental_listener = setup_simulator_listeners(simulator)
-
     # Route-assigned scooters (spread batches)
     next_sid, _ = load_route_assigned_scooters_in_batches(
         simulator=simulator,
@@ -67,6 +65,18 @@ def run():
     )
     print(f"Added {added} stationary scooters in zones: now {len(scooters)} total active in Umeå")
 
+    return simulator, scooters
+
+
+def run():
+    print("Simulation starting…", flush=True)
+
+    wait_for_backend_response()
+
+    simulator, scooters = build()
+
+    admin_listener, rental_listener = setup_simulator_listeners(simulator)
+
     # Start and run the completed simulation scenario now constructed
     run_simulation_by_tick(simulator=simulator, scooters=scooters)
 
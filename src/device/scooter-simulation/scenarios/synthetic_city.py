@@ -0,0 +1,294 @@
+"""
+@module synthetic_city
+
+Seeded synthetic cities for scale tests, far beyond the real zone and route data.
+
+generate_city() lays out a street network (a jittered, rotated grid with missing blocks)
+inside an irregular city boundary, and returns:
+
+- zones: city, slow, parking and charging zones in the backend's format
+  ({"zone_type", "coordinates_wkt", "speed_limit"}, as City(...) takes them) - slow zones
+  as irregular areas, parking and charging zones as small lots along the streets
+- routes: {route_id: [(lat, lng), ...]}, as Simulator(routes=...) takes them - walks along
+  the streets that mostly keep straight on, with waypoints every ~50 m like the real routes
+
+The same seed and parameters always give the same city.
+
+Example - write a city with 5000 routes and 8000 zones as JSON:
+    python scenarios/synthetic_city.py --routes 5000 --parking 5000 --charging 2500 --output city.json
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+
+
+# Speed limits per zone type, as seeded in the backend (zone_type.csv)
+ZONE_SPEED_LIMITS = {"city": 20, "slow": 10, "parking": 5, "charging": 5}
+
+METERS_PER_DEG_LAT = 111_320.0
+
+
+class SyntheticCity:
+    """
+    A generated city: name, zones (backend format) and routes (simulator format).
+    """
+    def __init__(self, name, zones, routes):
+        self.name = name
+        self.zones = zones
+        self.routes = routes
+
+    def city(self):
+        """
+        The zones as a City.
+        """
+        from city import City
+        return City(self.name, self.zones)
+
+    def zone_counts(self):
+        counts = {}
+        for zone in self.zones:
+            counts[zone["zone_type"]] = counts.get(zone["zone_type"], 0) + 1
+        return counts
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "zones": self.zones,
+            "routes": {str(route_id): [list(point) for point in waypoints] for route_id, waypoints in self.routes.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        routes = {int(route_id): [tuple(point) for point in waypoints] for route_id, waypoints in data["routes"].items()}
+        return cls(data["name"], data["zones"], routes)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Generator
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def generate_city(
+    name="Synthetic",
+    seed=42,
+    center=(55.6, 13.0),
+    radius_m=5000.0,
+    block_m=150.0,
+    routes=2000,
+    route_waypoints=(10, 60),
+    slow_zones=300,
+    parking_zones=3000,
+    charging_zones=1500,
+    boundary_vertices=96
+):
+    """
+    Generate a city of about radius_m around center (lat, lng), with streets every block_m,
+    `routes` routes of route_waypoints (min, max) waypoints, and the given number of zones.
+    The city zone's outline has boundary_vertices vertices.
+    """
+    rng = random.Random(seed)
+    projection = _Projection(*center)
+    boundary = _Boundary(rng, radius_m, boundary_vertices)
+
+    nodes, neighbours = _street_grid(rng, radius_m, block_m, boundary)
+    if not neighbours:
+        raise ValueError("radius_m too small for block_m - no streets to route on")
+    connected = sorted(neighbours)
+    edges = [(a, b) for a in connected for b in neighbours[a] if a < b]
+
+    zones = [_zone("city", projection, [boundary.point(angle) for angle in boundary.angles])]
+
+    for _ in range(slow_zones):
+        x, y = nodes[rng.choice(connected)]
+        zones.append(_zone("slow", projection, _blob(rng, x, y, rng.uniform(60, 250))))
+
+    for zone_type, count, length, width in (
+        ("parking", parking_zones, (10, 30), (4, 8)),
+        ("charging", charging_zones, (6, 15), (3, 6)),
+    ):
+        for _ in range(count):
+            a, b = rng.choice(edges)
+            zones.append(_zone(zone_type, projection, _lot(rng, nodes[a], nodes[b], length, width)))
+
+    route_table = {}
+    for route_id in range(1, routes + 1):
+        waypoints = _walk(rng, nodes, neighbours, rng.choice(connected), rng.randint(*route_waypoints))
+        route_table[route_id] = [projection.to_lat_lng(x, y) for x, y in waypoints]
+
+    return SyntheticCity(name, zones, route_table)
+
+
+class _Projection:
+    """
+    Local metres (x east, y north) around a centre <-> (lat, lng).
+    """
+    def __init__(self, lat, lng):
+        self.lat = lat
+        self.lng = lng
+        self.meters_per_deg_lng = METERS_PER_DEG_LAT * math.cos(math.radians(lat))
+
+    def to_lat_lng(self, x, y):
+        return (round(self.lat + y / METERS_PER_DEG_LAT, 7), round(self.lng + x / self.meters_per_deg_lng, 7))
+
+
+class _Boundary:
+    """
+    Irregular, star-shaped city outline: radius varying smoothly with the angle.
+    """
+    def __init__(self, rng, radius_m, vertices=96):
+        self.radius_m = radius_m
+        self.harmonics = [(k, rng.uniform(0.0, 0.06), rng.uniform(0, 2 * math.pi)) for k in range(2, 6)]
+        self.angles = [2 * math.pi * i / vertices for i in range(vertices)]
+
+    def radius(self, angle):
+        return self.radius_m * (1 + sum(a * math.sin(k * angle + phase) for k, a, phase in self.harmonics))
+
+    def point(self, angle):
+        radius = self.radius(angle)
+        return radius * math.cos(angle), radius * math.sin(angle)
+
+    def contains(self, x, y, margin=0.95):
+        return math.hypot(x, y) < self.radius(math.atan2(y, x)) * margin
+
+
+def _street_grid(rng, radius_m, block_m, boundary, missing=0.08):
+    """
+    Intersections of a rotated, jittered grid inside the boundary, and which ones a street
+    connects (4-neighbourhood, with a share of the streets missing).
+    Returns ({node: (x, y)}, {node: [neighbour nodes]}) with (i, j) grid nodes.
+    """
+    rotation = rng.uniform(0, math.pi / 2)
+    cos_r, sin_r = math.cos(rotation), math.sin(rotation)
+    steps = int(radius_m * 1.2 / block_m) + 1
+
+    nodes = {}
+    for i in range(-steps, steps + 1):
+        for j in range(-steps, steps + 1):
+            gx = i * block_m + rng.uniform(-0.15, 0.15) * block_m
+            gy = j * block_m + rng.uniform(-0.15, 0.15) * block_m
+            x, y = gx * cos_r - gy * sin_r, gx * sin_r + gy * cos_r
+            if boundary.contains(x, y):
+                nodes[(i, j)] = (x, y)
+
+    neighbours = {}
+    for (i, j) in nodes:
+        for other in ((i + 1, j), (i, j + 1)):
+            if other in nodes and rng.random() >= missing:
+                neighbours.setdefault((i, j), []).append(other)
+                neighbours.setdefault(other, []).append((i, j))
+
+    return nodes, neighbours
+
+
+def _walk(rng, nodes, neighbours, node, waypoint_count, spacing_m=50.0, straight=0.65):
+    """
+    Waypoints (x, y) of a walk along the streets: from intersection node, mostly keeping
+    straight on, never turning back unless at a dead end.
+    """
+    previous = None
+    waypoints = [nodes[node]]
+
+    while len(waypoints) < waypoint_count:
+        options = [n for n in neighbours[node] if n != previous] or neighbours[node]
+        ahead = (2 * node[0] - previous[0], 2 * node[1] - previous[1]) if previous else None
+        following = ahead if ahead in options and rng.random() < straight else rng.choice(options)
+
+        (x0, y0), (x1, y1) = nodes[node], nodes[following]
+        steps = max(1, round(math.hypot(x1 - x0, y1 - y0) / spacing_m))
+        for step in range(1, steps + 1):
+            t = step / steps
+            waypoints.append((
+                x0 + (x1 - x0) * t + rng.uniform(-2, 2),
+                y0 + (y1 - y0) * t + rng.uniform(-2, 2),
+            ))
+
+        previous, node = node, following
+
+    return waypoints[:waypoint_count]
+
+
+def _blob(rng, x, y, radius, vertices=12):
+    """
+    Irregular (star-shaped, so always valid) polygon around (x, y).
+    """
+    return [
+        (
+            x + radius * rng.uniform(0.75, 1.25) * math.cos(2 * math.pi * i / vertices),
+            y + radius * rng.uniform(0.75, 1.25) * math.sin(2 * math.pi * i / vertices),
+        )
+        for i in range(vertices)
+    ]
+
+
+def _lot(rng, a, b, length, width):
+    """
+    Rectangle of length x width metres on the street from a to b, aligned with it.
+    """
+    (x0, y0), (x1, y1) = a, b
+    t = rng.uniform(0.2, 0.8)
+    cx, cy = x0 + (x1 - x0) * t, y0 + (y1 - y0) * t
+    street = math.hypot(x1 - x0, y1 - y0) or 1.0
+    ux, uy = (x1 - x0) / street, (y1 - y0) / street
+
+    offset = rng.uniform(-3, 3)
+    cx, cy = cx - uy * offset, cy + ux * offset
+    half_length, half_width = rng.uniform(*length) / 2, rng.uniform(*width) / 2
+
+    return [
+        (cx + ux * dl - uy * dw, cy + uy * dl + ux * dw)
+        for dl, dw in ((-half_length, -half_width), (half_length, -half_width), (half_length, half_width), (-half_length, half_width))
+    ]
+
+
+def _zone(zone_type, projection, ring):
+    """
+    Zone in the backend's format, from a ring of local (x, y) metres.
+    """
+    points = [projection.to_lat_lng(x, y) for x, y in ring]
+    points.append(points[0])
+    wkt = "POLYGON((" + ",".join(f"{lng} {lat}" for lat, lng in points) + "))"
+    return {"zone_type": zone_type, "coordinates_wkt": wkt, "speed_limit": ZONE_SPEED_LIMITS[zone_type]}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Command line
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", default="Synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--radius-m", type=float, default=5000.0)
+    parser.add_argument("--block-m", type=float, default=150.0)
+    parser.add_argument("--routes", type=int, default=2000)
+    parser.add_argument("--slow", type=int, default=300)
+    parser.add_argument("--parking", type=int, default=3000)
+    parser.add_argument("--charging", type=int, default=1500)
+    parser.add_argument("--output", help="write the city as JSON ({name, zones, routes})")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    synthetic = generate_city(
+        name=args.name,
+        seed=args.seed,
+        radius_m=args.radius_m,
+        block_m=args.block_m,
+        routes=args.routes,
+        slow_zones=args.slow,
+        parking_zones=args.parking,
+        charging_zones=args.charging
+    )
+    waypoints = sum(len(route) for route in synthetic.routes.values())
+    print(
+        f"[Synthetic] {synthetic.name} (seed {args.seed}): zones {synthetic.zone_counts()}, "
+        f"{len(synthetic.routes)} routes ({waypoints} waypoints) in {time.perf_counter() - started:.2f}s"
+    )
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(synthetic.to_json(), handle)
+        print(f"[Synthetic] Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
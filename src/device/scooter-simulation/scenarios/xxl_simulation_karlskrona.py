@@ -34,7 +34,8 @@ def run():
         start_sid=1501,
         user_id_min=3001,
         user_id_max=4000,
-        user_pool_max=None
+        user_pool_max=None,
+        engine="fleet"
     )
 
     # Apply hardcoded custom scenarios
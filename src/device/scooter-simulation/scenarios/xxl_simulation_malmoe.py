@@ -34,7 +34,8 @@ def run():
         start_sid=1,
         user_id_min=1,
         user_id_max=2000,
-        user_pool_max=None
+        user_pool_max=None,
+        engine="fleet"
     )
 
     # Apply hardcoded custom scenarios
@@ -34,7 +34,8 @@ def run():
         start_sid=1001,
         user_id_min=2001,
         user_id_max=3000,
-        user_pool_max=None
+        user_pool_max=None,
+        engine="fleet"
     )
 
     # Apply hardcoded custom scenarios
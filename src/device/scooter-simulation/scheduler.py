@@ -0,0 +1,167 @@
+"""
+@module scheduler
+
+Drift-free tick scheduling for the simulation loop.
+
+Ticks are placed on a fixed grid of deadlines (start, start + interval, start + 2 * interval ...)
+measured on the monotonic clock, and the loop only sleeps until the next deadline.
+A slow tick therefore shortens the following sleep instead of pushing every later tick back,
+so simulated time keeps pace with wall time.
+
+When a tick overruns its slot, the overrun policy decides what happens with the deadlines
+that have already passed:
+- "catch_up": run the missed ticks back-to-back (at most max_catch_up of them), then drop the rest
+- "skip": drop the missed ticks and continue on the grid from the most recent deadline
+"""
+
+import time
+from collections import deque
+
+from config import UPDATE_INTERVAL
+
+
+OVERRUN_POLICIES = ("catch_up", "skip")
+
+
+class TickStats:
+    """
+    Counters and recent per-tick figures for a TickScheduler.
+    Lag is how late a tick started compared to its deadline, in seconds.
+    """
+    def __init__(self, history=720):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_duration = 0.0
+        self.lags = deque(maxlen=history)
+        self.durations = deque(maxlen=history)
+
+    def record(self, lag, duration):
+        self.ticks += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_duration = duration
+        self.lags.append(lag)
+        self.durations.append(duration)
+
+    def snapshot(self):
+        """
+        Plain dict of the current counters (safe to serialize).
+        """
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "last_lag_s": self.last_lag,
+            "max_lag_s": self.max_lag,
+            "last_duration_s": self.last_duration,
+        }
+
+
+class TickScheduler:
+    """
+    Runs a tick function on a fixed grid of monotonic-clock deadlines.
+
+    The clock and sleep functions are injectable, so the same scheduler can drive a
+    loop on a virtual clock.
+    """
+    def __init__(
+        self,
+        interval=UPDATE_INTERVAL,
+        overrun_policy="catch_up",
+        max_catch_up=3,
+        clock=time.monotonic,
+        sleep=time.sleep
+    ):
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{overrun_policy}' (expected one of {OVERRUN_POLICIES})")
+
+        self.interval = interval
+        self.overrun_policy = overrun_policy
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = TickStats()
+
+        self._running = False
+
+    def stop(self):
+        """
+        Stop after the current tick.
+        """
+        self._running = False
+
+    def run(self, tick, max_ticks=None):
+        """
+        Call tick() once per deadline until stop() is called or max_ticks ticks have run.
+        """
+        self._running = True
+        deadline = self.clock()
+
+        while self._keep_running(max_ticks):
+            started = self.clock()
+            tick()
+            deadline, remaining = self._after_tick(started, self.clock(), deadline)
+            if remaining > 0:
+                self.sleep(remaining)
+
+    async def run_async(self, tick, sleep, max_ticks=None):
+        """
+        run() for a coroutine tick function on an event loop: awaits tick(), and waits for
+        the next deadline with the awaitable sleep (e.g. a clock's asleep).
+        """
+        self._running = True
+        deadline = self.clock()
+
+        while self._keep_running(max_ticks):
+            started = self.clock()
+            await tick()
+            deadline, remaining = self._after_tick(started, self.clock(), deadline)
+            if remaining > 0:
+                await sleep(remaining)
+
+    def _keep_running(self, max_ticks):
+        return self._running and (max_ticks is None or self.stats.ticks < max_ticks)
+
+    def _after_tick(self, started, finished, deadline):
+        """
+        Bookkeeping shared by both loops after a tick that ran from started to finished for
+        deadline: record its stats, apply the overrun policy, and return the next deadline
+        and the seconds to sleep until it (0 when there is nothing to wait for, or stopped).
+        """
+        self.stats.record(lag=max(0.0, started - deadline), duration=finished - started)
+
+        deadline = self._next_deadline(deadline + self.interval, finished)
+
+        remaining = deadline - self.clock()
+        if remaining <= 0 or not self._running:
+            remaining = 0.0
+        return deadline, remaining
+
+    def _next_deadline(self, deadline, now):
+        """
+        Apply the overrun policy when the next deadline has already passed.
+        """
+        if now <= deadline:
+            return deadline
+
+        self.stats.overruns += 1
+
+        # Deadlines that have passed in full, beyond the one we are late for
+        behind = int((now - deadline) // self.interval)
+
+        if self.overrun_policy == "skip":
+            dropped = behind
+        else:
+            dropped = max(0, behind + 1 - self.max_catch_up)
+
+        if dropped:
+            self.stats.skipped_ticks += dropped
+            print(
+                f"[Scheduler] WARNING: tick finished {now - deadline:.3f}s past its next deadline, "
+                f"dropping {dropped} tick(s) ({self.overrun_policy})"
+            )
+
+        return deadline + dropped * self.interval
@@ -61,15 +61,18 @@ class Scooter:
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """
     Adjust battery level based on the current activity and the elapsed time.
+    Drain rates are given per UPDATE_INTERVAL, and scale with the actual elapsed time.
     """
     def _update_battery(self, elapsed_time: float):
+        intervals = elapsed_time / UPDATE_INTERVAL
+
         if self.status == "charging":
             charge_per_sec = CHARGE_RATE_PER_MIN / 60
             self.battery = min(100, self.battery + charge_per_sec * elapsed_time)
         elif self.status in ("idle", "needCharging"):
-            self.battery = max(MIN_BATTERY, self.battery - BATTERY_DRAIN_IDLE)
+            self.battery = max(MIN_BATTERY, self.battery - BATTERY_DRAIN_IDLE * intervals)
         elif self.status == "active":
-            self.battery = max(MIN_BATTERY, self.battery - BATTERY_DRAIN_ACTIVE)
+            self.battery = max(MIN_BATTERY, self.battery - BATTERY_DRAIN_ACTIVE * intervals)
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # End trip
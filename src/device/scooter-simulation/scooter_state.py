@@ -0,0 +1,125 @@
+"""
+@module scooter_state
+
+Compact per-scooter simulation state.
+
+Everything the Simulator tracks per scooter (route and progress, trip count, last position,
+movement override, locks, charging status written to the DB, sim-owned and
+external rental, dormancy) lives in one slotted ScooterState. The tick loop finds all of it
+with a single dict lookup, instead of one hit per parallel dict and lock set.
+
+Locks are bit flags in one small int, the charging status last written to the DB a small code.
+"""
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Lock flags (ScooterState.locks)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+LOCK_DEACTIVATED = 1        # Movement frozen by special_behavior (whatever the reason)
+LOCK_ADMIN = 2              # Reasons: admin status (deactivated, needService, onService)
+LOCK_BATTERY = 4            #          low battery
+LOCK_OUTOFBOUNDS = 8        #          out of bounds
+LOCK_PENDING_BATTERY = 16   # Battery lock to apply once the current ride is over
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Charging status last written to the DB (ScooterState.charging_written)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+CHARGING_NONE = 0
+CHARGING_STATUS_CODES = {"charging": 1, "chargingLow": 2}
+CHARGING_STATUS_NAMES = (None, "charging", "chargingLow")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Rental state
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class RentalState:
+    """
+    One rental of a scooter, sim-owned or external.
+    "active" is the canonical control-flag (rental_id is an identifier, not control flow).
+    """
+    __slots__ = ("active", "rental_id", "user_id", "user_name", "start_zone", "end_zone")
+
+    def __init__(self, rental_id=None, active=False, user_id=None, user_name=None):
+        self.active = active
+        self.rental_id = rental_id
+        self.user_id = user_id
+        self.user_name = user_name
+        self.start_zone = "free"
+        self.end_zone = "free"
+
+    def copy(self):
+        """
+        Detached snapshot, e.g. for work that completes after this state was reset.
+        """
+        snapshot = RentalState(self.rental_id, self.active, self.user_id, self.user_name)
+        snapshot.start_zone = self.start_zone
+        snapshot.end_zone = self.end_zone
+        return snapshot
+
+    def reset(self):
+        """
+        Clear per-rental state for next trip.
+        """
+        self.active = False
+        self.rental_id = None
+        self.user_id = None
+        self.user_name = None
+        self.start_zone = "free"
+        self.end_zone = "free"
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Per-scooter state
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class ScooterState:
+    """
+    The simulator's bookkeeping for one scooter (the physical state stays in Scooter).
+
+    - route_id: assigned route (None: stationary by default)
+    - trip_counter: completed trips (even: forward, odd: reversed route)
+    - route_index: index of the next waypoint on the current trip
+    - last_lat, last_lng: position at the end of the previous tick
+    - special_behavior: movement override (replaces route-following when set)
+    - locks: LOCK_* flags
+    - charging_written: CHARGING_STATUS_CODES code last written to the DB (CHARGING_NONE if none)
+    - rental: the sim-owned RentalState
+    - external: RentalState of a backend/app-initiated rental, None when there is none
+    - dormant: (lat, lng, status) the scooter fell asleep with, None while on the full tick path
+    - next_heartbeat: simulated time of the next full tick while dormant
+    - phase_slot: phase slot the scooter is ticked in
+    """
+    __slots__ = (
+        "route_id", "trip_counter", "route_index", "last_lat", "last_lng",
+        "special_behavior", "locks", "charging_written", "rental", "external",
+        "dormant", "next_heartbeat", "phase_slot",
+    )
+
+    def __init__(
+        self,
+        lat,
+        lng,
+        route_id=None,
+        route_index=0,
+        trip_counter=0,
+        special_behavior=None,
+        rental_id=None,
+        phase_slot=0
+    ):
+        self.route_id = route_id
+        self.trip_counter = trip_counter
+        self.route_index = route_index
+        self.last_lat = lat
+        self.last_lng = lng
+        self.special_behavior = special_behavior
+        self.locks = 0
+        self.charging_written = CHARGING_NONE
+        self.rental = RentalState(rental_id=rental_id)
+        self.external = None
+        self.dormant = None
+        self.next_heartbeat = None
+        self.phase_slot = phase_slot
+
+    @property
+    def external_active(self):
+        return self.external is not None and self.external.active
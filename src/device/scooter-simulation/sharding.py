@@ -0,0 +1,564 @@
+"""
+@module sharding
+
+Sharded multi-process simulation of one city.
+
+A single Simulator ticks every scooter on one thread, which caps a city's fleet at what
+one CPU core can do. ShardedSimulator splits the fleet over worker processes instead:
+
+- every scooter belongs to one shard, picked by a stable hash of its id
+- every worker owns a complete Simulator for its share of the fleet, with its own City
+  (rebuilt from the zone definitions), Redis broadcaster and HTTP connections
+- the simulation user pool is split over the shards as well, so a user is only ever
+  handed out by one worker
+- the coordinator starts each tick on all shards at once and waits for all of them,
+  so tick boundaries stay aligned across the city
+- admin status updates and rental events are routed to the owning shard and applied
+  at the start of the next tick, like on a single Simulator
+- every shard reports its live figures (statuses, rentals, queues, Redis and HTTP counts,
+  phase timings) with each tick, and the coordinator sums them up for the metrics endpoint
+
+ShardedSimulator stands in for a Simulator in the scenario helpers: the scooter loaders plan
+the fleet through create_scooter/register_scooter, the listeners enqueue into it, and
+run_simulation_by_tick / run_simulation_headless drive its tick().
+"""
+
+import threading
+import multiprocessing
+from collections import Counter
+
+from config import UPDATE_INTERVAL
+from clock import WallClock, VirtualClock
+from scooter import Scooter
+from utils import normalize_scooter_id, stable_bucket
+from route_table import compile_routes
+from profiler import profiler_for
+from api import merge_http_stats
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Shard assignment
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def shard_of(scooter_id, shards):
+    """
+    Stable shard number for a scooter id (same answer in every process and on every run).
+    Numeric ids given as strings (as they arrive from Redis) land on the same shard as ints.
+    """
+    return stable_bucket(scooter_id, shards, salt="shard")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Coordinator-side scooter plan
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class PlannedScooter(Scooter):
+    """
+    Coordinator-side stand-in for a scooter that is simulated by a shard worker.
+    Holds the initial state and registration handed to the worker; the live scooter
+    (and its publishing) lives in the worker process.
+    """
+    def __init__(self, sid, lat, lng, battery=100, rbroadcast=None):
+        super().__init__(sid, lat, lng, battery=battery, rbroadcast=rbroadcast)
+        self.registration = None
+
+    def publish(self, in_charging_zone=False):
+        """
+        No-op: the owning shard publishes this scooter's state.
+        """
+        return
+
+    def plan(self):
+        """
+        Picklable description of the scooter for the worker.
+        """
+        return {
+            "sid": self.id,
+            "lat": self.lat,
+            "lng": self.lng,
+            "battery": self.battery,
+            "status": self.status,
+            "registration": self.registration,
+        }
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Coordinator
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+class ShardedSimulator:
+    """
+    Runs one city's fleet as `shards` Simulator instances in worker processes.
+
+    Workers are started on the first tick() (or an explicit start()), once the fleet has
+    been planned. Everything handed to a worker must be picklable: per-scooter special
+    behaviors must be module-level functions, and closures (custom scenarios, behavior
+    factories) are installed through the `initializer(simulator, shard_id)` hook, which
+    runs in every worker after its fleet is registered.
+    """
+    def __init__(
+        self,
+        scooters,
+        routes,
+        city,
+        shards,
+        rbroadcast=None,
+        engine="classic",
+        tick_interval=UPDATE_INTERVAL,
+        clock=None,
+        initializer=None,
+        redis_host="redis",
+        redis_port=6379,
+        phase_slots=1
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        if phase_slots < 1:
+            raise ValueError("phase_slots must be at least 1")
+
+        self.scooters = scooters
+        self.routes = routes
+        self.route_tables = compile_routes(routes)
+        self.city = city
+        self.shards = shards
+        self.rbroadcast = rbroadcast
+        self.engine = engine
+        self.tick_interval = tick_interval
+        self.clock = clock or WallClock()
+        self.initializer = initializer
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+
+        # Set by apply_simulation_user_pool; split over the workers, one slice per shard
+        self.user_pool = None
+
+        # Per shard: planned scooters, then the queued events for the next tick
+        self._plans = [[] for _ in range(shards)]
+        self._planned_by_id = {}
+        self._event_lock = threading.Lock()
+        self._admin_updates = [[] for _ in range(shards)]
+        self._rental_events = [[] for _ in range(shards)]
+
+        # Simulated time the oldest event still waiting for the next tick was queued (None: none waiting)
+        self._oldest_event = {"admin": None, "rental": None}
+
+        self._workers = []
+        self._connections = []
+
+        # Latest tick duration (seconds) reported by each shard
+        self.last_shard_durations = [0.0] * shards
+
+        # Latest "done" report of every shard - the live figures behind the metrics accessors
+        self._shard_reports = []
+
+        # Per-phase tick timings over all shards: each tick takes the slowest shard's seconds per phase
+        self.profiler = profiler_for(getattr(city, "name", ""))
+
+        # Phase slots run by every shard (see Simulator.advance_phase), and their latest load
+        # over all shards: scooters ticked, states published, Redis commands and payload bytes,
+        # milliseconds of the slowest shard
+        self.phase_slots = phase_slots
+        self.phase_load = [
+            {"scooters": 0, "published": 0, "redis_ops": 0, "redis_bytes": 0, "ms": 0.0}
+            for _ in range(phase_slots)
+        ]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Fleet planning (same interface as Simulator)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def create_scooter(self, sid, lat, lng, battery=100, rbroadcast=None):
+        """
+        Create the coordinator-side plan for a scooter.
+        """
+        return PlannedScooter(sid=sid, lat=lat, lng=lng, battery=battery, rbroadcast=rbroadcast)
+
+    def register_scooter(
+        self,
+        scooter,
+        route_id=None,
+        waypoint_index=0,
+        trip_counter_value=0,
+        special_behavior=None,
+        rental_id=None
+    ):
+        """
+        Assign a planned scooter to its shard, with the registration the worker will apply.
+        """
+        if self._workers:
+            raise RuntimeError("Scooters can only be registered before the shards are started")
+
+        scooter.registration = {
+            "route_id": route_id,
+            "waypoint_index": waypoint_index,
+            "trip_counter_value": trip_counter_value,
+            "special_behavior": special_behavior,
+            "rental_id": rental_id,
+        }
+        self._plans[shard_of(scooter.id, self.shards)].append(scooter)
+        self._planned_by_id[normalize_scooter_id(scooter.id)] = scooter
+
+    def find_scooter(self, scooter_id):
+        """
+        The planned scooter with the given id, tolerating int/str mismatches (None if unknown).
+        Its live state is in the shard's worker.
+        """
+        return self._planned_by_id.get(normalize_scooter_id(scooter_id))
+
+    def shard_sizes(self):
+        """
+        Number of scooters planned on each shard.
+        """
+        return [len(plan) for plan in self._plans]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Event routing (thread-safe, same interface as Simulator)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def enqueue_admin_status_update(self, scooter_id, new_status):
+        """
+        Queue an admin status update for the shard owning the scooter.
+        """
+        with self._event_lock:
+            self._admin_updates[shard_of(scooter_id, self.shards)].append((scooter_id, new_status))
+            if self._oldest_event["admin"] is None:
+                self._oldest_event["admin"] = self.clock.time()
+
+    def enqueue_rental_event(self, payload):
+        """
+        Queue a rental lifecycle event for the shard owning the scooter.
+        """
+        scooter_id = payload.get("scooter_id") if isinstance(payload, dict) else None
+        if scooter_id is None:
+            print(f"[Sharding] Ignoring rental event without scooter_id: {payload}")
+            return
+
+        with self._event_lock:
+            self._rental_events[shard_of(scooter_id, self.shards)].append(payload)
+            if self._oldest_event["rental"] is None:
+                self._oldest_event["rental"] = self.clock.time()
+
+    def _take_events(self):
+        """
+        Swap out the queued events of every shard.
+        """
+        with self._event_lock:
+            admin_updates, self._admin_updates = self._admin_updates, [[] for _ in range(self.shards)]
+            rental_events, self._rental_events = self._rental_events, [[] for _ in range(self.shards)]
+            self._oldest_event = {"admin": None, "rental": None}
+        return admin_updates, rental_events
+
+    def _user_pool_of(self, shard_id):
+        """
+        The users handed to one shard worker: every user of the pool lives on exactly one
+        shard (by shard_of on the user id), so no user rents on two shards at once.
+        None (the worker's own pool) when no pool was applied.
+        """
+        if self.user_pool is None:
+            return None
+        return [user for user in self.user_pool if shard_of(user["user_id"], self.shards) == shard_id]
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Worker lifecycle
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def start(self):
+        """
+        Start one worker process per shard and wait until every shard has built its fleet.
+        """
+        if self._workers:
+            return
+
+        for shard_id in range(self.shards):
+            config = {
+                "shard_id": shard_id,
+                "engine": self.engine,
+                "city_name": self.city.name,
+                "zones_wkt": self.city.zones_wkt,
+                "routes": self.routes,
+                "user_pool": self._user_pool_of(shard_id),
+                "tick_interval": self.tick_interval,
+                "phase_slots": self.phase_slots,
+                "start_time": self.clock.time(),
+                "redis_host": self.redis_host,
+                "redis_port": self.redis_port,
+                "initializer": self.initializer,
+                "scooters": [scooter.plan() for scooter in self._plans[shard_id]],
+            }
+
+            parent_connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_run_shard,
+                args=(config, worker_connection),
+                name=f"sim-shard-{shard_id}",
+                daemon=True
+            )
+            worker.start()
+            worker_connection.close()
+
+            self._workers.append(worker)
+            self._connections.append(parent_connection)
+
+        for shard_id in range(self.shards):
+            self._receive(shard_id, "ready")
+
+        print(f"[Sharding] {self.shards} shard(s) running {self.shard_sizes()} scooters")
+
+    def close(self):
+        """
+        Stop all workers.
+        """
+        for connection in self._connections:
+            try:
+                connection.send(("stop", None))
+            except (BrokenPipeError, OSError):
+                pass
+
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+        self._workers = []
+        self._connections = []
+
+    def _receive(self, shard_id, expected):
+        """
+        Wait for a shard's reply, failing loudly when the worker died.
+        """
+        try:
+            kind, payload = self._connections[shard_id].recv()
+        except EOFError:
+            raise RuntimeError(f"Shard {shard_id} worker exited unexpectedly")
+
+        if kind == "error":
+            raise RuntimeError(f"Shard {shard_id} failed: {payload}")
+        if kind != expected:
+            raise RuntimeError(f"Shard {shard_id} sent '{kind}', expected '{expected}'")
+        return payload
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Tick barrier
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def tick(self, slot=None):
+        """
+        Tick every shard once (in parallel) and return when all of them are done.
+        Each shard ticks and publishes its scooters (of one phase slot, or all of them)
+        on the coordinator's simulated time.
+        """
+        if not self._workers:
+            self.start()
+
+        now = self.clock.time()
+        admin_updates, rental_events = self._take_events()
+
+        for shard_id, connection in enumerate(self._connections):
+            connection.send(("tick", (now, slot, admin_updates[shard_id], rental_events[shard_id])))
+
+        reports = [self._receive(shard_id, "done") for shard_id in range(self.shards)]
+        self.last_shard_durations = [report["seconds"] for report in reports]
+        self._shard_reports = reports
+
+        phases = {name for report in reports for name in report["phases"]}
+        self.profiler.record_tick({
+            name: max(report["phases"].get(name, 0.0) for report in reports) for name in phases
+        })
+        return reports
+
+    def advance_phase(self, slot=0):
+        """
+        Tick one phase slot on every shard, and record the slot's load over all shards.
+        """
+        reports = self.tick(slot if self.phase_slots > 1 else None)
+        self.phase_load[slot] = {
+            "scooters": sum(report["scooters"] for report in reports),
+            "published": sum(report["published"] for report in reports),
+            "redis_ops": sum(report["redis_ops"] for report in reports),
+            "redis_bytes": sum(report["redis_bytes"] for report in reports),
+            "ms": round(max(report["seconds"] for report in reports) * 1000, 1),
+        }
+
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Figures for the metrics endpoint (same interface as Simulator), summed over the shards
+    # as of their latest tick - empty / None before the first tick
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def status_counts(self):
+        """
+        Number of scooters per status, over all shards.
+        """
+        counts = Counter()
+        for report in self._shard_reports:
+            counts.update(report["status_counts"])
+        return dict(counts)
+
+    def active_rental_counts(self):
+        """
+        Active rentals ("sim", "external") over all shards.
+        """
+        reports = self._shard_reports
+        if not reports:
+            return None
+        return {
+            kind: sum(report["active_rentals"][kind] for report in reports)
+            for kind in ("sim", "external")
+        }
+
+    def redis_totals(self):
+        """
+        Redis commands and payload bytes of all shard workers so far.
+        """
+        reports = self._shard_reports
+        if not reports:
+            return None
+        return sum(report["redis_ops_total"] for report in reports), sum(report["redis_bytes_total"] for report in reports)
+
+    def queue_stats(self):
+        """
+        Events waiting for the next tick: queued on the coordinator, plus any a shard still
+        holds. The age is that of the oldest one (simulated seconds, 0.0 when none wait).
+        """
+        now = self.clock.time()
+        with self._event_lock:
+            waiting = {
+                "admin": (sum(map(len, self._admin_updates)), self._oldest_event["admin"]),
+                "rental": (sum(map(len, self._rental_events)), self._oldest_event["rental"]),
+            }
+
+        stats = {}
+        for queue, (depth, queued_at) in waiting.items():
+            shard_queues = [report["queues"][queue] for report in self._shard_reports]
+            stats[queue] = {
+                "depth": depth + sum(figures["depth"] for figures in shard_queues),
+                "oldest_age_s": max(
+                    [now - queued_at if queued_at is not None else 0.0]
+                    + [figures["oldest_age_s"] for figures in shard_queues]
+                ),
+            }
+        return stats
+
+    def http_stats(self):
+        """
+        Backend HTTP calls of all shard workers, per endpoint (api.HTTP_STATS format).
+        """
+        merged = {}
+        for report in self._shard_reports:
+            merge_http_stats(merged, report["http_stats"])
+        return merged
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Worker process
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def _build_shard_simulator(config):
+    """
+    Build the shard's own City, broadcaster and Simulator, and register its scooters.
+    """
+    import api
+    from city import City
+    from simulator import Simulator
+    from fleet_simulator import FleetSimulator
+    from redisbroadcast import ScooterBroadcaster
+
+    engines = {"classic": Simulator, "fleet": FleetSimulator}
+
+    # Own HTTP connections - never the sockets inherited from the coordinator - and own call counts
+    api.reset_session()
+    api.reset_http_stats()
+
+    city = City(config["city_name"], config["zones_wkt"])
+    rbroadcast = ScooterBroadcaster(host=config["redis_host"], port=config["redis_port"])
+    scooters = []
+
+    simulator = engines[config["engine"]](
+        scooters=scooters,
+        routes=config["routes"],
+        city=city,
+        rbroadcast=rbroadcast,
+        custom_scooter_scenarios={},
+        clock=VirtualClock(start_time=config["start_time"]),
+        tick_interval=config["tick_interval"],
+        phase_slots=config["phase_slots"]
+    )
+
+    if config["user_pool"] is not None:
+        simulator.user_pool = config["user_pool"]
+
+    for plan in config["scooters"]:
+        scooter = simulator.create_scooter(
+            sid=plan["sid"],
+            lat=plan["lat"],
+            lng=plan["lng"],
+            battery=plan["battery"],
+            rbroadcast=rbroadcast
+        )
+        scooter.status = plan["status"]
+        scooters.append(scooter)
+        simulator.register_scooter(scooter, **plan["registration"])
+
+    if config["initializer"] is not None:
+        config["initializer"](simulator, config["shard_id"])
+
+    return simulator, scooters
+
+
+def _run_shard(config, connection):
+    """
+    Worker main loop: build the shard, then tick on command until told to stop.
+    """
+    import time
+    import signal
+    import api
+
+    # Ctrl+C is handled by the coordinator, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        simulator, scooters = _build_shard_simulator(config)
+    except Exception as e:
+        connection.send(("error", repr(e)))
+        return
+
+    connection.send(("ready", len(scooters)))
+
+    while True:
+        try:
+            command, payload = connection.recv()
+        except EOFError:
+            return
+
+        if command == "stop":
+            return
+
+        now, slot, admin_updates, rental_events = payload
+
+        try:
+            # Follow the coordinator's simulated time
+            simulator.clock.advance(now - simulator.clock.time())
+
+            for scooter_id, new_status in admin_updates:
+                simulator.enqueue_admin_status_update(scooter_id, new_status)
+            for event in rental_events:
+                simulator.enqueue_rental_event(event)
+
+            started = time.perf_counter()
+            published_before = simulator.rbroadcast.states_published
+            ops_before, bytes_before = simulator.rbroadcast.redis_ops, simulator.rbroadcast.redis_bytes
+            with simulator.rbroadcast.batched():
+                simulator.tick(slot)
+                simulator.publish_states(simulator.scooters_in_slot(slot))
+
+            connection.send(("done", {
+                "scooters": len(simulator.scooters_in_slot(slot)),
+                "published": simulator.rbroadcast.states_published - published_before,
+                "redis_ops": simulator.rbroadcast.redis_ops - ops_before,
+                "redis_bytes": simulator.rbroadcast.redis_bytes - bytes_before,
+                "seconds": time.perf_counter() - started,
+
+                # Live figures of the shard for the coordinator's metrics accessors
+                "status_counts": simulator.status_counts(),
+                "active_rentals": simulator.active_rental_counts(),
+                "queues": simulator.queue_stats(),
+                "redis_ops_total": simulator.rbroadcast.redis_ops,
+                "redis_bytes_total": simulator.rbroadcast.redis_bytes,
+                "phases": simulator.profiler.latest(),
+                "http_stats": api.http_stats_snapshot(),
+            }))
+
+        except Exception as e:
+            connection.send(("error", repr(e)))
+            return
@@ -10,17 +10,30 @@ Keeps the physical Scooter class pure and unaware of routes or rentals,
 while allowing for decoupled, realistic and system critical scenarios to play out.
 """
 
-import time
 import secrets
 import string
 import random
-import math
 import threading
-from collections import deque
+import time
+from collections import Counter, deque
 from api import fetch_users, create_rental, complete_rental, update_bike_status_and_position
-from utils import calculate_distance_in_m
-from config import UPDATE_INTERVAL, NOMINAL_MAX_SPEED_MPS, LOW_BATTERY_THRESHOLD, NON_RENTABLE_STATUSES
+from utils import calculate_distance_in_m, stable_bucket, normalize_scooter_id
+from config import (
+    UPDATE_INTERVAL, NOMINAL_MAX_SPEED_MPS, LOW_BATTERY_THRESHOLD, NON_RENTABLE_STATUSES,
+    DORMANT_HEARTBEAT_INTERVAL, SPEED_LIMITED_ZONES, DEFAULT_ZONE_SPEED_LIMIT
+)
 from redisbroadcast import ScooterBroadcaster
+from scooter import Scooter
+from route_table import compile_routes
+from route_zones import RouteZones
+from scooter_state import (
+    ScooterState, RentalState,
+    LOCK_DEACTIVATED, LOCK_ADMIN, LOCK_BATTERY, LOCK_OUTOFBOUNDS, LOCK_PENDING_BATTERY,
+    CHARGING_NONE, CHARGING_STATUS_CODES, CHARGING_STATUS_NAMES
+)
+from clock import WallClock
+from profiler import profiler_for
+from city import ZONE_NAMES
 
 
 class Simulator:
@@ -41,6 +54,13 @@ class Simulator:
     • "reduced" status and 5 km/h limit in slow zones
     • "deactivated" status and full stop when out of bounds
 
+    Time is read from an injectable clock (wall time by default) and every tick advances the
+    simulation by tick_interval seconds, so a headless run on a virtual clock stays consistent
+    with a real-time run.
+
+    Dormant scooters (standing still with no rental, scenario or pending change) only get battery
+    accounting between heartbeats, and admin/rental events or status changes wake them again.
+
     Note: Scooter state updates are notably absent from this code, as that logic, and the associated
     state broadcasting functionality, is contained and injected into the scooter instances themselves,
     and will be sent (published) to the backend (and forwarded to the frontend) on every tick(),
@@ -48,90 +68,85 @@ class Simulator:
 
         try:
         while True:
-            simulator.tick()
-            for scooter in scooters:
-                scooter.publish()
+            simulator.advance_phase()
             time.sleep(UPDATE_INTERVAL)
 
         except KeyboardInterrupt:
             print("Stopped.")
     """
 
-    def __init__(self, scooters, routes, city, rbroadcast=None, custom_scooter_scenarios=None):
+    def __init__(
+        self,
+        scooters,
+        routes,
+        city,
+        rbroadcast=None,
+        custom_scooter_scenarios=None,
+        clock=None,
+        tick_interval=UPDATE_INTERVAL,
+        heartbeat_interval=DORMANT_HEARTBEAT_INTERVAL,
+        phase_slots=1
+    ):
+        if phase_slots < 1:
+            raise ValueError("phase_slots must be at least 1")
+
         self.scooters = scooters
         self.routes = routes
         self.city = city
         self.rbroadcast = rbroadcast
 
-         # Map route to scooter
-        self.scooter_to_route = {
-            scooter.id: route_id
-            for scooter, route_id in zip(scooters, routes.keys())
-        }
-
+        # Simulation time source, and the simulated seconds covered by each tick()
+        self.clock = clock or WallClock()
+        self.tick_interval = tick_interval
 
         # Registry for per-scooter custom scenarios (scooter_id -> callback)
         # Allows multiple scooters to have independent behaviors efficiently
         self.custom_scooter_scenarios = custom_scooter_scenarios or {}
 
-        # How many full trips has each scooter completed?
-        self.trip_counter = {scooter.id: 0 for scooter in scooters}
-
-        # Heading for this position in the route (index of the next waypoint)
-        self.next_waypoint_index = {scooter.id: {"route_index": 0} for scooter in scooters}
-
-        # Last known position (used for smoothing out transitions in speed)
-        self.last_position = {scooter.id: (scooter.lat, scooter.lng) for scooter in scooters}
-
-        # Last travel_direction (for realistic slowdown in turns)
-        self.last_travel_direction = {scooter.id: None for scooter in scooters}
-
-        # Scooter special behaviours:
-
-        # Custom movement override per scooter (replaces route-following when set)
-        self.per_scooter_special_behavior = {scooter.id: None for scooter in scooters}
-
-        # Special override status to set deactivated/in need of service scooters movement to zero
-        self.deactivated_scooters = set()
-
-        # Locking categories
-        self.admin_locked_scooters = set()
-        self.battery_locked_scooters = set()
-        self.outofbounds_locked_scooters = set()
-
-        # Battery locks that should be applied after the current rental ends
-        self.pending_battery_lock = set()
-
-        # Track which charging-related status (charging / chargingLow) this simulator last wrote to DB
-        self.last_db_charging_status = {}
-
-        # Current rental state per scooter
-        # "active" is the canonical control-flag (rental_id is an identifier, not control flow)
-        self.rentals = {
-            scooter.id: {
-                "active": False,
-                "rental_id": None,
-                "user_id": None,
-                "user_name": None,
-                "start_zone": "free",
-                "end_zone": "free",
-            }
-            for scooter in scooters
-        }
-
-        # External rentals (initiated by backend/user app).
+        # Every route compiled once: waypoints, segment lengths, bearings... in both directions
+        self.route_tables = compile_routes(routes)
+
+        # Zone intervals along every route, computed on the first tick (see _current_route_zones)
+        self.route_zones = None
+
+        # City zones_version the zones cached per scooter position belong to (see _check_zone_caches)
+        self._zone_caches_version = city.zones_version
+
+        # Staggered ticking: the fleet is spread over phase_slots slots by a stable hash of the
+        # scooter id, and each slot is ticked and published in its own share of the tick interval
+        # (see advance_phase). With 1 slot the whole fleet ticks at once.
+        self.phase_slots = phase_slots
+        self._phase_members = None
+
+        # Load of every slot on its latest run: scooters ticked, states published,
+        # Redis commands and payload bytes, milliseconds
+        self.phase_load = [
+            {"scooters": 0, "published": 0, "redis_ops": 0, "redis_bytes": 0, "ms": 0.0}
+            for _ in range(phase_slots)
+        ]
+
+        # Rolling per-phase tick timings of this city (see profiler.py)
+        self.profiler = profiler_for(getattr(city, "name", ""))
+
+        # All per-scooter simulation state (route progress, behavior, locks, rentals...),
+        # see scooter_state.ScooterState. Scooters handed in up front get the routes in order.
+        self.states = {}
+        route_ids = list(routes.keys())
+        for position, scooter in enumerate(scooters):
+            route_id = route_ids[position] if position < len(route_ids) else None
+            self.states[scooter.id] = self._new_state(scooter, route_id=route_id)
+
+        # Scooters by normalized id (utils.normalize_scooter_id), for O(1) lookups of the
+        # ids arriving with admin and rental events - kept in step by register_scooter and
+        # unregister_scooter
+        self._scooter_index = {}
+        for scooter in scooters:
+            self._index_scooter(scooter)
+
+        # External rentals (initiated by backend/user app) live in ScooterState.external.
         # When active, the simulator must not start/end rentals for that scooter,
         # and must not route-move it.
         # It should however keep publishing state and logging coords.
-        self.external_rentals = {
-            scooter.id: {
-                "active": False,
-                "rental_id": None,
-                "user_id": None,
-                "user_name": None,
-            }
-            for scooter in scooters
-        }
 
         # User pool - has now been supplanted by actual db-fetched users
         # (Generic JohnDoe-generated users are used as fallback if API fails)
@@ -147,6 +162,102 @@ class Simulator:
         self._rental_event_lock = threading.Lock()
         self._rental_events = deque()
 
+        # Dormant scooters (standing still with nothing going on) take a low-frequency path:
+        # battery accounting every tick, a full tick and publish once per heartbeat_interval.
+        # None keeps every scooter on the full path. (Per scooter: ScooterState.dormant/next_heartbeat)
+        self.heartbeat_interval = heartbeat_interval
+
+        # Scooters that were neither ticked in full nor published this tick (skipped by publish_states)
+        self.quiet_scooters = set()
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Scooter creation and registration
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def create_scooter(self, sid, lat, lng, battery=100, rbroadcast=None):
+        """
+        Create a scooter instance suited for this simulator engine.
+        """
+        return Scooter(sid=sid, lat=lat, lng=lng, battery=battery, rbroadcast=rbroadcast)
+
+    def register_scooter(
+        self,
+        scooter,
+        route_id=None,
+        waypoint_index=0,
+        trip_counter_value=0,
+        special_behavior=None,
+        rental_id=None
+    ):
+        """
+        Registers a newly introduced scooter with all per-scooter simulation state.
+        Route is optional - stationary-by-default scooters do not require a route.
+        """
+        self.states[scooter.id] = self._new_state(
+            scooter,
+            route_id=route_id,
+            route_index=waypoint_index,
+            trip_counter=trip_counter_value,
+            special_behavior=special_behavior,
+            rental_id=rental_id
+        )
+        self._index_scooter(scooter)
+
+    def unregister_scooter(self, scooter_id):
+        """
+        Take a scooter out of the simulation: drops it from self.scooters, its per-scooter
+        simulation state and the id index. Returns the scooter, None for unknown ids.
+        """
+        scooter = self._scooter_index.pop(normalize_scooter_id(scooter_id), None)
+        if scooter is None:
+            return None
+
+        self.states.pop(scooter.id, None)
+        if scooter in self.scooters:
+            self.scooters.remove(scooter)
+        self._phase_members = None
+        return scooter
+
+    def _index_scooter(self, scooter):
+        """
+        Index a scooter by its normalized id. A different scooter already under the same
+        normalized id (e.g. 1 and "1") is replaced, with a warning.
+        """
+        key = normalize_scooter_id(scooter.id)
+        indexed = self._scooter_index.get(key)
+        if indexed is not None and indexed is not scooter:
+            print(
+                f"[Simulator] WARNING: Scooter id {scooter.id!r} is already taken by scooter {indexed.id!r} "
+                f"- lookups of {key!r} now find the newly registered one"
+            )
+        self._scooter_index[key] = scooter
+
+    def _new_state(self, scooter, **registration):
+        """
+        Fresh ScooterState for a scooter at its current position.
+        """
+        return ScooterState(
+            scooter.lat,
+            scooter.lng,
+            phase_slot=stable_bucket(scooter.id, self.phase_slots, salt="phase") if self.phase_slots > 1 else 0,
+            **registration
+        )
+
+    def state_of(self, scooter_id):
+        """
+        The ScooterState of a registered scooter.
+        """
+        return self.states[scooter_id]
+
+    def find_scooter(self, scooter_id):
+        """
+        Locate a scooter in the simulator by its ID, tolerating int/str mismatches.
+        Returns None for unknown ids.
+
+        Only scooters handed in up front or added through register_scooter (and not
+        removed through unregister_scooter) are found.
+        """
+        return self._scooter_index.get(normalize_scooter_id(scooter_id))
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Admin status updates (thread-safe)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -155,7 +266,7 @@ class Simulator:
         Thread-safe enqueing of admin updates from AdminStatusListener.
         """
         with self._admin_lock:
-            self._admin_updates.append((scooter_id, new_status, time.time()))
+            self._admin_updates.append((scooter_id, new_status, self.clock.time()))
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Rental event (thread-safe)
@@ -169,7 +280,48 @@ class Simulator:
           - { "type": "rental_ended", "rental_id": "...", "scooter_id": 123 }
         """
         with self._rental_event_lock:
-            self._rental_events.append(payload)
+            self._rental_events.append((payload, self.clock.time()))
+
+    def queue_stats(self):
+        """
+        Depth of the admin and rental event queues, and the age (simulated seconds) of
+        the oldest entry waiting in each (0.0 when empty).
+        """
+        now = self.clock.time()
+        with self._admin_lock:
+            admin = (len(self._admin_updates), now - self._admin_updates[0][2] if self._admin_updates else 0.0)
+        with self._rental_event_lock:
+            rental = (len(self._rental_events), now - self._rental_events[0][1] if self._rental_events else 0.0)
+
+        return {
+            "admin": {"depth": admin[0], "oldest_age_s": admin[1]},
+            "rental": {"depth": rental[0], "oldest_age_s": rental[1]},
+        }
+
+    def status_counts(self):
+        """
+        Number of scooters per status.
+        """
+        return dict(Counter(scooter.status for scooter in list(self.scooters)))
+
+    def active_rental_counts(self):
+        """
+        Active rentals: sim-owned ("sim") and backend/app-initiated ("external").
+        """
+        states = list(self.states.values())
+        return {
+            "sim": sum(state.rental.active for state in states),
+            "external": sum(state.external_active for state in states),
+        }
+
+    def redis_totals(self):
+        """
+        Redis commands and payload bytes of this simulator so far, None without a counting broadcaster.
+        """
+        rbroadcast = self.rbroadcast
+        if rbroadcast is None or not hasattr(rbroadcast, "redis_ops"):
+            return None
+        return rbroadcast.redis_ops, rbroadcast.redis_bytes
 
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -181,7 +333,9 @@ class Simulator:
         Ensures DB is updated before applying the status-change locally.
         """
         try:
-            success = update_bike_status_and_position(
+            success = self.profiler.timed(
+                "backend_http",
+                update_bike_status_and_position,
                 scooter.id,
                 new_status,
                 scooter.lat,
@@ -203,17 +357,19 @@ class Simulator:
         Canonical charging status update (charging / chargingLow), DB-first.
         Ensures DB is updated before applying the status-change locally.
         """
+        state = self.states[scooter.id]
+
         # Never mark charging while actively rented
         if scooter.status == "active":
-            self.last_db_charging_status.pop(scooter.id, None)
+            state.charging_written = CHARGING_NONE
             return
 
         # Admin or out-of-bounds owns the status
-        if scooter.id in self.admin_locked_scooters or scooter.id in self.outofbounds_locked_scooters:
-            self.last_db_charging_status.pop(scooter.id, None)
+        if state.locks & (LOCK_ADMIN | LOCK_OUTOFBOUNDS):
+            state.charging_written = CHARGING_NONE
             return
 
-        last_written = self.last_db_charging_status.get(scooter.id)
+        last_written = CHARGING_STATUS_NAMES[state.charging_written]
 
         if in_charging_zone:
             next_charging_status = (
@@ -225,7 +381,7 @@ class Simulator:
             if last_written != next_charging_status:
                 self._update_bike_status_position_db_first(scooter, next_charging_status)
                 scooter.status = next_charging_status
-                self.last_db_charging_status[scooter.id] = next_charging_status
+                state.charging_written = CHARGING_STATUS_CODES[next_charging_status]
             return
 
         # We previously set charging / chargingLow and now left the zone === restore correct non-charging state
@@ -237,7 +393,7 @@ class Simulator:
                 self._update_bike_status_position_db_first(scooter, "available")
                 scooter.status = "available"
 
-            self.last_db_charging_status.pop(scooter.id, None)
+            state.charging_written = CHARGING_NONE
 
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -247,7 +403,9 @@ class Simulator:
         """
         Apply a permanent lock in place (stops movement immediately in places).
         """
-        if scooter_id not in self.deactivated_scooters:
+        state = self.states[scooter_id]
+
+        if not state.locks & LOCK_DEACTIVATED:
             def permanent_lock(scooter, elapsed_time):
                 return {
                     "lat": scooter.lat,
@@ -257,38 +415,41 @@ class Simulator:
                     "route_finished": False
                 }
 
-            self.per_scooter_special_behavior[scooter_id] = permanent_lock
-            self.deactivated_scooters.add(scooter_id)
-            self.admin_locked_scooters.add(scooter_id)
+            state.special_behavior = permanent_lock
+            state.locks |= LOCK_DEACTIVATED | LOCK_ADMIN
 
         else:
             # Already locked (battery/out-of-bounds). Still mark as admin-owned to prevent removal bugs.
-            self.admin_locked_scooters.add(scooter_id)
+            state.locks |= LOCK_ADMIN
 
     def _remove_admin_lock(self, scooter_id):
         """
         Remove any existing admin lock (used for non-critical status updates).
         """
-        if scooter_id not in self.admin_locked_scooters:
+        state = self.states[scooter_id]
+
+        if not state.locks & LOCK_ADMIN:
             return
 
-        self.admin_locked_scooters.remove(scooter_id)
+        state.locks &= ~LOCK_ADMIN
 
         # Only remove the movement override if the override was admin-owned.
         # If battery/out-of-bounds is owning the lock, do not disturb it.
-        if scooter_id in self.battery_locked_scooters or scooter_id in self.outofbounds_locked_scooters:
+        if state.locks & (LOCK_BATTERY | LOCK_OUTOFBOUNDS):
             return
 
-        if scooter_id in self.deactivated_scooters:
-            self.per_scooter_special_behavior[scooter_id] = None
-            self.deactivated_scooters.remove(scooter_id)
+        if state.locks & LOCK_DEACTIVATED:
+            state.special_behavior = None
+            state.locks &= ~LOCK_DEACTIVATED
 
     def _apply_battery_lock(self, scooter):
         """
         Apply low-battery lock immediately (immobilize + mark needCharging), DB-first.
         Safe to call multiple times - will not operate if already locked for any reason.
         """
-        if scooter.id in self.deactivated_scooters:
+        state = self.states[scooter.id]
+
+        if state.locks & LOCK_DEACTIVATED:
             return
 
         def lock_due_to_low_battery(scooter, elapsed_time):
@@ -300,9 +461,8 @@ class Simulator:
                 "activity": "needCharging"
             }
 
-        self.per_scooter_special_behavior[scooter.id] = lock_due_to_low_battery
-        self.deactivated_scooters.add(scooter.id)
-        self.battery_locked_scooters.add(scooter.id)
+        state.special_behavior = lock_due_to_low_battery
+        state.locks |= LOCK_DEACTIVATED | LOCK_BATTERY
 
         # Canonical status update should happen before when we apply the needCharging-lock-status.
         self._update_bike_status_position_db_first(scooter, "needCharging")
@@ -318,18 +478,20 @@ class Simulator:
         """
         Complete rental via API, then publish summary to Redis.
         """
-        rental_id = rental_state.get("rental_id")
-        if not rental_state.get("active") or not rental_id:
+        rental_id = rental_state.rental_id
+        if not rental_state.active or not rental_id:
             return None
 
-        rental_state["end_zone"] = end_zone
-        path_coordinates = self.rbroadcast.load_coords(rental_id)
+        rental_state.end_zone = end_zone
+        path_coordinates = self.profiler.timed("redis", self.rbroadcast.load_coords, rental_id)
 
         # Ensure last coordinate has 0 speed (realistic stop)
         if path_coordinates:
             path_coordinates[-1]["spd"] = 0.0
 
-        complete_rental(
+        self.profiler.timed(
+            "backend_http",
+            complete_rental,
             rental_id=rental_id,
             end_point={"lat": float(scooter.lat), "lng": float(scooter.lng)},
             end_zone=end_zone,
@@ -350,11 +512,11 @@ class Simulator:
         """
         Force-completes any active rental at the current position.
         """
-        rental_state = self.rentals[scooter.id]
-        if not rental_state["active"]:
+        rental_state = self.states[scooter.id].rental
+        if not rental_state.active:
             return
 
-        print(f"Forcing completion of active rental {rental_state['rental_id']} due to admin UI-event.")
+        print(f"Forcing completion of active rental {rental_state.rental_id} due to admin UI-event.")
 
         self._complete_rental_and_publish(
             scooter,
@@ -364,38 +526,7 @@ class Simulator:
         )
 
         self._return_user_to_pool(rental_state)
-        self._reset_rental_state(rental_state)
-
-
-
-    def _find_scooter_by_id(self, scooter_id):
-        """
-        Locate a scooter in the simulator by its ID, tolerating int/str mismatches.
-        """
-        # First try direct comparison
-        for scooter in self.scooters:
-            if scooter.id == scooter_id:
-                return scooter
-
-        # Fallback: compare as integers
-        try:
-            target_id_int = int(scooter_id)
-            for scooter in self.scooters:
-                if scooter.id == target_id_int:
-                    return scooter
-        except (TypeError, ValueError):
-            pass
-
-        # Fallback: compare as strings
-        try:
-            target_id_str = str(scooter_id)
-            for scooter in self.scooters:
-                if str(scooter.id) == target_id_str:
-                    return scooter
-        except Exception:
-            pass
-
-        return None
+        rental_state.reset()
 
     def _apply_queued_admin_status_updates(self, current_time):
         """
@@ -408,26 +539,30 @@ class Simulator:
         if not updates:
             return
 
+        # Latest update per scooter ("7" and 7 are the same scooter)
         last_by_scooter = {}
         for sid, status, ts in updates:
-            last_by_scooter[sid] = (status, ts)
+            last_by_scooter[normalize_scooter_id(sid)] = (status, ts)
 
         critical_statuses = {"deactivated", "needService", "onService"}
 
         for sid, (new_status, ts) in last_by_scooter.items():
-            scooter = self._find_scooter_by_id(sid)
+            scooter = self.find_scooter(sid)
             if not scooter:
                 print(f"[Simulator] WARNING: Admin update for unknown scooter {sid}")
                 continue
 
+            state = self.states[scooter.id]
+            state.dormant = None
+
             old_status = scooter.status
             print(f"[Simulator] Applying admin status update: scooter {scooter.id} -> '{new_status}' (was '{old_status}')")
 
             # Guard: never allow forcing "available" while a rental is active (sim-owned or external).
             # Revert DB to the current (old) status to avoid DB/simulator divergence.
             if new_status == "available":
-                sim_rental_active = self.rentals[scooter.id]["active"]
-                ext_rental_active = self.external_rentals[scooter.id]["active"]
+                sim_rental_active = state.rental.active
+                ext_rental_active = state.external_active
                 if sim_rental_active or ext_rental_active:
                     print(
                         f"[Simulator] WARNING: Rejecting admin status 'available' for scooter {scooter.id} "
@@ -445,8 +580,7 @@ class Simulator:
 
             if new_status in critical_statuses:
                 # Force-complete any active rental once, then lock permanently
-                rental_state = self.rentals[scooter.id]
-                if rental_state["active"]:
+                if state.rental.active:
                     self._force_complete_active_rental_at_current_position(
                         scooter,
                         current_time,
@@ -457,16 +591,14 @@ class Simulator:
                 if new_status == "available":
                     # Return it to normal simulation flow
                     # Clear all locking, battery/outofbounds logic will re-assert itself as it should
-                    self.outofbounds_locked_scooters.discard(scooter.id)
-                    self.battery_locked_scooters.discard(scooter.id)
-                    self.pending_battery_lock.discard(scooter.id)
+                    state.locks &= ~(LOCK_OUTOFBOUNDS | LOCK_BATTERY | LOCK_PENDING_BATTERY)
 
-                    if scooter.id in self.deactivated_scooters:
-                        self.deactivated_scooters.discard(scooter.id)
-                        self.per_scooter_special_behavior[scooter.id] = None
+                    if state.locks & LOCK_DEACTIVATED:
+                        state.locks &= ~LOCK_DEACTIVATED
+                        state.special_behavior = None
 
                     # Reset charging tracking so next tick can re-sync cleanly.
-                    self.last_db_charging_status.pop(scooter.id, None)
+                    state.charging_written = CHARGING_NONE
 
                 self._remove_admin_lock(scooter.id)
 
@@ -490,17 +622,21 @@ class Simulator:
         if not events:
             return
 
+        # Latest event per scooter ("7" and 7 are the same scooter)
         last_by_scooter = {}
-        for payload in events:
+        for payload, _ in events:
             sid = payload.get("scooter_id")
-            last_by_scooter[sid] = payload
+            last_by_scooter[normalize_scooter_id(sid)] = payload
 
         for sid, payload in last_by_scooter.items():
-            scooter = self._find_scooter_by_id(sid)
+            scooter = self.find_scooter(sid)
             if not scooter:
                 print(f"[Simulator] WARNING: Rental event for unknown scooter {sid}: {payload}")
                 continue
 
+            state = self.states[scooter.id]
+            state.dormant = None
+
             event_type = payload.get("type")
             rental_id = payload.get("rental_id")
 
@@ -511,17 +647,17 @@ class Simulator:
                 print(f"[Simulator] External rental started: scooter {scooter.id} rental {rental_id}")
 
                 # Enter external rental mode
-                self.external_rentals[scooter.id].update({
-                    "active": True,
-                    "rental_id": rental_id,
-                    "user_id": user_id,
-                    "user_name": user_name,
-                })
+                state.external = RentalState(
+                    rental_id=rental_id,
+                    active=True,
+                    user_id=user_id,
+                    user_name=user_name
+                )
 
                 # Reflect active locally so frontend does not show "available" while external rental runs.
 
                 # DB update is handled by backend.
-                if scooter.status not in NON_RENTABLE_STATUSES and scooter.id not in self.deactivated_scooters:
+                if scooter.status not in NON_RENTABLE_STATUSES and not state.locks & LOCK_DEACTIVATED:
                     scooter.status = "active"
 
                 # Start fresh route logging for this rental
@@ -532,29 +668,24 @@ class Simulator:
 
             elif event_type == "rental_ended":
                 # Exit external rental mode
-                active = self.external_rentals[scooter.id].get("active")
-                current_rental_id = self.external_rentals[scooter.id].get("rental_id")
+                active = state.external_active
+                current_rental_id = state.external.rental_id if state.external is not None else None
 
                 print(f"[Simulator] External rental ended: scooter {scooter.id} rental {rental_id}")
 
                 if active and current_rental_id and current_rental_id != rental_id:
                     print(f"[Simulator] WARNING: External rental id mismatch on end: expected {current_rental_id} got {rental_id}")
 
-                self.external_rentals[scooter.id].update({
-                    "active": False,
-                    "rental_id": None,
-                    "user_id": None,
-                    "user_name": None,
-                })
+                state.external = None
 
                 # If battery is low (or we deferred this during external rental), lock now
-                if scooter.id in self.pending_battery_lock or scooter.battery < LOW_BATTERY_THRESHOLD:
-                    self.pending_battery_lock.discard(scooter.id)
+                if state.locks & LOCK_PENDING_BATTERY or scooter.battery < LOW_BATTERY_THRESHOLD:
+                    state.locks &= ~LOCK_PENDING_BATTERY
                     self._apply_battery_lock(scooter)
                     continue  # keep it non-rentable
 
                 # If nothing else locks this scooter, return it to a rentable local state.
-                if scooter.id not in self.deactivated_scooters and scooter.status not in NON_RENTABLE_STATUSES:
+                if not state.locks & LOCK_DEACTIVATED and scooter.status not in NON_RENTABLE_STATUSES:
                     scooter.status = "available"
 
             else:
@@ -572,49 +703,79 @@ class Simulator:
     # "Back again"-logic: forward on even trips, reversed on odd (in practice, based on
     # completed trip counter's number, starting at 0)
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def get_route_for_trip(self, scooter_id):
-        trip_count = self.trip_counter[scooter_id]
-
-        route_id = self.scooter_to_route.get(scooter_id)
-        if route_id is None:
+    def get_route_direction_for_trip(self, scooter_id):
+        """
+        The compiled route_table.RouteDirection the scooter travels on its current trip,
+        None without a (known, non-empty) route.
+        """
+        state = self.states[scooter_id]
+        table = self.route_tables.get(state.route_id)
+        if table is None:
             return None
 
-        base_route = self.routes.get(route_id)
-        if not base_route:
-            return None
+        return table.for_trip(state.trip_counter)
 
-        return base_route if trip_count % 2 == 0 else base_route[::-1]
+    def get_route_for_trip(self, scooter_id):
+        direction = self.get_route_direction_for_trip(scooter_id)
+        return direction.waypoints if direction is not None else None
+
+    def get_segment_lengths_for_trip(self, scooter_id):
+        """
+        Segment lengths (meters) of the route returned by get_route_for_trip, in travel order.
+        """
+        direction = self.get_route_direction_for_trip(scooter_id)
+        return direction.segment_lengths if direction is not None else None
 
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Main simulation ticker - manages the heartbeat(s) that drive the simulation of the fleet
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def tick(self):
-        current_time = time.time()
+    def tick(self, slot=None):
+        """
+        Advance the scooters of one phase slot (all scooters when slot is None) by tick_interval.
+        """
+        current_time = self.clock.time()
+
+        profiler = self.profiler
+        profiler.begin_tick()
 
         # Apply queued inputs deterministically at the start of the tick
-        self._apply_queued_admin_status_updates(current_time)
-        self._apply_external_rental_events(current_time)
+        profiler.timed("admin_apply", self._apply_queued_admin_status_updates, current_time)
+        profiler.timed("rental_events", self._apply_external_rental_events, current_time)
+        self._check_zone_caches()
+
+        self.quiet_scooters = set()
+
+        # Speed cap per zone type, looked up once per tick
+        zone_speed_caps = self.zone_speed_caps()
 
-        for scooter in self.scooters:
+        # Per-phase seconds for the profiler, summed over the loop (cheaper than reporting per scooter)
+        clock = time.perf_counter
+        movement_s = zone_s = charging_s = scenario_s = redis_s = 0.0
+
+        # Scooters moved this tick:
+        # (scooter, state, prev_lat, prev_lng, status_before, movement_update, zone from the route or None)
+        moved = []
+
+        route_zones = profiler.timed("classify_zone", self._current_route_zones)
+
+        for scooter in self.scooters_in_slot(slot):
             scooter_id = scooter.id
-            prev_lat, prev_lng = self.last_position[scooter_id]
+            state = self.states[scooter_id]
 
-            external_mode = self.external_rentals[scooter_id]["active"]
-            external_rental_id = self.external_rentals[scooter_id]["rental_id"]
+            # Dormant scooters: battery accounting only, until woken or due for a heartbeat
+            if state.dormant is not None and self._tick_dormant(scooter, state, current_time):
+                continue
+
+            prev_lat, prev_lng = state.last_lat, state.last_lng
+            status_before = scooter.status
+
+            external_mode = state.external_active
+            external_rental_id = state.external.rental_id if external_mode else None
 
 
             # Battery logic for locking at sub-20%
-            if scooter.battery < LOW_BATTERY_THRESHOLD and scooter.id not in self.deactivated_scooters:
-                sim_rental_active = self.rentals[scooter.id]["active"]
-                ext_rental_active = self.external_rentals[scooter.id]["active"]
-
-                if sim_rental_active or ext_rental_active or scooter.status == "active":
-                    # Allow ride to finish, but ensure it won't become rentable afterwards
-                    self.pending_battery_lock.add(scooter.id)
-                else:
-                    # Not rented -> lock immediately
-                    self._apply_battery_lock(scooter)
+            self._enforce_low_battery_lock(scooter)
 
             # External rental mode:
             # - Do not move scooter along route
@@ -622,116 +783,64 @@ class Simulator:
             # - However: keep publishing scooter state
             # - keep logging coords under the external rental id
             if external_mode and external_rental_id:
-                in_charging_zone = self._is_in_charging_zone(scooter)
-
-                self._sync_charging_status_db_first(scooter, in_charging_zone)
-
-                print(f"DEBUG EXTERNAL RENTAL: scooter {scooter.id} | rental_id={external_rental_id} | activity=active | current_status={scooter.status}")
-
-                # Update physical state
-                scooter.tick(
-                    activity="active",
-                    speed_kmh=0.0,
-                    in_charging_zone=in_charging_zone,
-                    elapsed_time=UPDATE_INTERVAL
-                )
-
-                # Log coordinates every tick under external rental
-                self.rbroadcast.log_coord(
-                    external_rental_id,
-                    scooter.lat,
-                    scooter.lng,
-                    scooter.speed_kmh,
-                )
+                self._tick_external_rental(scooter, external_rental_id)
 
                 # Remember position for next tick
-                self.last_position[scooter_id] = (scooter.lat, scooter.lng)
-
-                # Publish state
-                publish_payload = {
-                    "id": scooter.id,
-                    "lat": round(scooter.lat, 7),
-                    "lng": round(scooter.lng, 7),
-                    "bat": round(scooter.battery, 1),
-                    "st": scooter.status,
-                    "spd": scooter.speed_kmh,
-                    "inChargingZone": in_charging_zone
-                }
-                scooter.rbroadcast.broadcast_state(publish_payload)
+                state.last_lat, state.last_lng = scooter.lat, scooter.lng
                 continue
 
 
             # Only route-move when a sim-owned rental is active (standing still is default)
-            current_route = None
-            if self.rentals[scooter_id]["active"] and scooter_id in self.scooter_to_route:
-                current_route = self.get_route_for_trip(scooter_id)
+            route_direction = None
+            if state.rental.active and state.route_id is not None:
+                route_direction = self.get_route_direction_for_trip(scooter_id)
 
 
             # Resolve movement: special behavior wins, otherwise route-follow when present, else stand still
-            movement_update = self._resolve_movement_for_scooter(scooter, current_route)
+            started = clock()
+            movement_update = self._resolve_movement_for_scooter(scooter, route_direction)
+            movement_s += clock() - started
 
             # Apply new position first - critical for accurate zone detection this tick
             scooter.lat = movement_update["lat"]
             scooter.lng = movement_update["lng"]
 
-            # Classify zone using the updates position
-            current_zone = self.city.classify_zone(scooter.lat, scooter.lng)
+            # On its route segment: zone from the route's zone intervals, no polygon test
+            route_zone = None
+            if route_direction is not None:
+                started = clock()
+                direction_zones = route_zones.for_trip(state.route_id, state.trip_counter)
+                if direction_zones is not None:
+                    route_zone = direction_zones.zone_at(state.route_index, scooter.lat, scooter.lng)
+                zone_s += clock() - started
+
+            moved.append((scooter, state, prev_lat, prev_lng, status_before, movement_update, route_zone))
+
+        # Classify the other zones using the updated positions - the whole slot in one call
+        started = clock()
+        unresolved = [entry[0] for entry in moved if entry[6] is None]
+        zone_codes = iter(self.city.classify_many(
+            [scooter.lat for scooter in unresolved],
+            [scooter.lng for scooter in unresolved]
+        ))
+        zone_s += clock() - started
+
+        for scooter, state, prev_lat, prev_lng, status_before, movement_update, route_zone in moved:
+            current_zone = route_zone or ZONE_NAMES[next(zone_codes)]
 
             # OUT OF BOUNDS: Permanent deactivation - lock position permanently
             if current_zone == 'outofbounds':
-                scooter.status = "deactivated"
-
-                # Canonical status update should happen after first applying the lock
-                if scooter.id not in self.outofbounds_locked_scooters:
-                    self._update_bike_status_position_db_first(scooter, "deactivated")
-
-                if scooter.id not in self.deactivated_scooters:
-                    def permanent_lock(scooter, elapsed_time):
-                        """Special override: scooter is out of bounds - deactivated, awaiting pickup."""
-                        return {
-                            "lat": scooter.lat,
-                            "lng": scooter.lng,
-                            "speed_kmh": 0.0,
-                            "activity": "deactivated",
-                            "route_finished": False
-                        }
-
-                    self.per_scooter_special_behavior[scooter.id] = permanent_lock
-                    self.deactivated_scooters.add(scooter.id)
-                    self.outofbounds_locked_scooters.add(scooter.id)
-
-                    print(f"Scooter {scooter.id} permanently deactivated - out of bounds")
-
-                    # Force-complete any active rental (sim-owned only)
-                    rental_state = self.rentals[scooter.id]
-                    if rental_state["active"]:
-                        print(f"Forcing completion of active rental {rental_state['rental_id']} due to out-of-bounds")
-
-                        self._complete_rental_and_publish(
-                            scooter,
-                            rental_state,
-                            end_zone="outofbounds",
-                            current_time=current_time
-                        )
-
-                        self._return_user_to_pool(rental_state)
-                        self._reset_rental_state(rental_state)
-
-                else:
-                    # Ensure the out-of-bounds reason is recorded even if already locked by another reason.
-                    self.outofbounds_locked_scooters.add(scooter.id)
+                self._enforce_out_of_bounds(scooter, current_time)
 
 
             # Apply movement override for deactivated scooters
-            if scooter.id in self.deactivated_scooters:
-                movement_update = self.per_scooter_special_behavior[scooter.id](scooter, UPDATE_INTERVAL)
+            if state.locks & LOCK_DEACTIVATED:
+                movement_update = state.special_behavior(scooter, self.tick_interval)
 
             # Speed limits for slow/parking/charging zones (DB-driven)
             intended_speed = movement_update["speed_kmh"]
-            speed_limited_zones = ['slow', 'parking', 'charging']
-            if current_zone in speed_limited_zones:
-                db_limit = self.city.get_speed_limit(current_zone)
-                max_allowed_kmh = db_limit if db_limit is not None else 5.0
+            max_allowed_kmh = zone_speed_caps.get(current_zone)
+            if max_allowed_kmh is not None:
                 final_speed = min(intended_speed, max_allowed_kmh)
             else:
                 final_speed = intended_speed
@@ -745,17 +854,19 @@ class Simulator:
 
             movement_update["speed_kmh"] = final_speed
 
-            # Charging detection
-            in_charging_zone = self._is_in_charging_zone(scooter)
+            # Charging detection (reuses this tick's classification - charging has top priority)
+            in_charging_zone = self._is_in_charging_zone(scooter, current_zone)
 
+            started, attributed = clock(), profiler.attributed
             self._sync_charging_status_db_first(scooter, in_charging_zone)
+            charging_s += clock() - started - (profiler.attributed - attributed)
 
             # Update physical state
             scooter.tick(
                 activity=final_activity,
                 speed_kmh=movement_update["speed_kmh"],
                 in_charging_zone=in_charging_zone,
-                elapsed_time=UPDATE_INTERVAL
+                elapsed_time=self.tick_interval
             )
 
             # Handle rental - safe fallback
@@ -774,10 +885,12 @@ class Simulator:
             # Efficiently execute registered custom scenario for this scooter only
             scenario = self.custom_scooter_scenarios.get(scooter.id)
             if scenario:
+                started, attributed = clock(), profiler.attributed
                 scenario(scooter, simulator=self)
+                scenario_s += clock() - started - (profiler.attributed - attributed)
 
             # Remember position for next tick
-            self.last_position[scooter_id] = (scooter.lat, scooter.lng)
+            state.last_lat, state.last_lng = scooter.lat, scooter.lng
 
             # Publish with inChargingZone flag for immediate frontend visual feedback
             publish_payload = {
@@ -789,24 +902,303 @@ class Simulator:
                 "spd": scooter.speed_kmh,
                 "inChargingZone": in_charging_zone
             }
+            started = clock()
             scooter.rbroadcast.broadcast_state(publish_payload)
+            redis_s += clock() - started
+
+            # Nothing changed and nothing going on - move to the dormant path until woken
+            if (scooter.lat, scooter.lng) == (prev_lat, prev_lng) and scooter.status == status_before:
+                self._try_make_dormant(scooter, state, current_time)
+
+        profiler.add("movement", movement_s)
+        profiler.add("classify_zone", zone_s)
+        profiler.add("charging_sync", charging_s)
+        profiler.add("custom_scenarios", scenario_s)
+        profiler.add("redis", redis_s)
+        profiler.end_tick()
+
+
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Publish the fleet state after a tick (one Redis batch)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def publish_states(self, scooters=None):
+        """
+        Publish the state of the given scooters (default: all) in one Redis batch.
+        Dormant scooters that only got battery accounting this tick are skipped,
+        they publish on their heartbeat.
+        """
+        scooters = self.scooters if scooters is None else scooters
+        with self.rbroadcast.batched():
+            for scooter in scooters:
+                if scooter.id not in self.quiet_scooters:
+                    scooter.publish()
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Phase slots - staggered ticking and publishing within the tick interval
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def phase_slot_of(self, scooter_id):
+        """
+        Phase slot of a scooter - stable across runs and processes, independent of its shard.
+        """
+        state = self.states.get(scooter_id)
+        if state is not None:
+            return state.phase_slot
+        return stable_bucket(scooter_id, self.phase_slots, salt="phase") if self.phase_slots > 1 else 0
+
+    def scooters_in_slot(self, slot):
+        """
+        The scooters ticked in the given phase slot (the whole fleet for None, or with one slot).
+        Slot membership is rebuilt when scooters were added since the last call.
+        """
+        if slot is None or self.phase_slots == 1:
+            return self.scooters
+
+        if self._phase_members is None or sum(map(len, self._phase_members)) != len(self.scooters):
+            self._phase_members = [[] for _ in range(self.phase_slots)]
+            for scooter in self.scooters:
+                self._phase_members[self.states[scooter.id].phase_slot].append(scooter)
+
+        return self._phase_members[slot]
+
+    def advance_phase(self, slot=0):
+        """
+        Tick and publish one phase slot (the whole fleet with a single slot) in one Redis batch,
+        and record the slot's load in phase_load.
+
+        The run loops call this phase_slots times per tick interval, cycling through the slots,
+        so every scooter still advances once per tick_interval while the work and the
+        scooter:state:tick messages are spread evenly over the interval.
+        """
+        started = time.perf_counter()
+        published_before = self.rbroadcast.states_published
+        ops_before, bytes_before = self.rbroadcast.redis_ops, self.rbroadcast.redis_bytes
+        self.profiler.begin_tick()
+
+        with self.rbroadcast.batched():
+            self.tick(slot if self.phase_slots > 1 else None)
+            redis_started = time.perf_counter()
+            self.publish_states(self.scooters_in_slot(slot))
+
+        # Publishing and the pipeline round trip
+        self.profiler.add("redis", time.perf_counter() - redis_started)
+        self.profiler.end_tick()
+
+        self.phase_load[slot] = {
+            "scooters": len(self.scooters_in_slot(slot)),
+            "published": self.rbroadcast.states_published - published_before,
+            "redis_ops": self.rbroadcast.redis_ops - ops_before,
+            "redis_bytes": self.rbroadcast.redis_bytes - bytes_before,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Dormant scooters - low-frequency path for scooters standing still with nothing going on
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def wake_scooter(self, scooter_id):
+        """
+        Put a scooter back on the full tick path (from the next scooter iteration on).
+        """
+        state = self.states.get(scooter_id)
+        if state is not None:
+            state.dormant = None
+
+    def _can_be_dormant(self, scooter, state):
+        """
+        True when nothing but the battery can change for this scooter while it stands still:
+        no rental, no custom scenario, no movement override other than a lock, and no rental
+        about to start.
+        """
+        if self.heartbeat_interval is None:
+            return False
+
+        if state.rental.active or state.external_active:
+            return False
+
+        if state.locks & LOCK_PENDING_BATTERY or scooter.id in self.custom_scooter_scenarios:
+            return False
+
+        # Locks (admin, battery, out of bounds) freeze the scooter - other behaviors may move it
+        if state.special_behavior is not None and not state.locks & LOCK_DEACTIVATED:
+            return False
+
+        return not self.can_start_rental(scooter)
+
+    def _try_make_dormant(self, scooter, state, current_time):
+        """
+        Move a scooter that did not change during a full tick to the dormant path.
+        Heartbeats are spread over the interval by scooter id, so dormant scooters do not
+        all come back for their full tick on the same tick.
+        """
+        if not self._can_be_dormant(scooter, state):
+            return
+
+        due = state.next_heartbeat
+        if due is None:
+            phase = stable_bucket(scooter.id, 1000, salt="heartbeat") / 1000
+            due = current_time + self.heartbeat_interval * phase
+        while due <= current_time:
+            due += self.heartbeat_interval
+
+        state.next_heartbeat = due
+        state.dormant = (scooter.lat, scooter.lng, scooter.status)
+
+    def _stays_dormant(self, scooter, state, current_time):
+        """
+        True while a dormant scooter may skip its full tick: its heartbeat is not due, it was
+        neither moved nor had its status changed outside the tick, and it is still unattended.
+        """
+        return (
+            current_time < state.next_heartbeat
+            and (scooter.lat, scooter.lng, scooter.status) == state.dormant
+            and self._can_be_dormant(scooter, state)
+        )
+
+    def _tick_dormant(self, scooter, state, current_time):
+        """
+        Dormant tick: battery accounting only - no zone classification, charging sync or publish.
+
+        Returns False (and wakes the scooter) when it needs the full tick instead: on its
+        heartbeat, when it was moved or its status changed outside the tick, when it is no
+        longer unattended, or when its battery would cross LOW_BATTERY_THRESHOLD (locks and
+        charging status are decided on the full path).
+        """
+        if not self._stays_dormant(scooter, state, current_time):
+            state.dormant = None
+            return False
+
+        battery_before = scooter.battery
+        scooter._update_battery(self.tick_interval)
+
+        if (battery_before < LOW_BATTERY_THRESHOLD) != (scooter.battery < LOW_BATTERY_THRESHOLD):
+            scooter.battery = battery_before
+            state.dormant = None
+            return False
+
+        self.quiet_scooters.add(scooter.id)
+        return True
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Per-scooter tick steps (shared by the classic loop and the fleet engine)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _enforce_low_battery_lock(self, scooter):
+        """
+        Lock a scooter below LOW_BATTERY_THRESHOLD, or defer the lock until its ride is over.
+        """
+        if scooter.battery >= LOW_BATTERY_THRESHOLD:
+            return
+
+        state = self.states[scooter.id]
+        if state.locks & LOCK_DEACTIVATED:
+            return
+
+        if state.rental.active or state.external_active or scooter.status == "active":
+            # Allow ride to finish, but ensure it won't become rentable afterwards
+            state.locks |= LOCK_PENDING_BATTERY
+        else:
+            # Not rented -> lock immediately
+            self._apply_battery_lock(scooter)
+
+    def _tick_external_rental(self, scooter, external_rental_id):
+        """
+        One tick for a scooter in external rental mode: stand still, keep logging coords
+        under the external rental id and keep publishing state.
+        """
+        in_charging_zone = self._is_in_charging_zone(scooter)
 
+        self._sync_charging_status_db_first(scooter, in_charging_zone)
+
+        print(f"DEBUG EXTERNAL RENTAL: scooter {scooter.id} | rental_id={external_rental_id} | activity=active | current_status={scooter.status}")
+
+        # Update physical state
+        scooter.tick(
+            activity="active",
+            speed_kmh=0.0,
+            in_charging_zone=in_charging_zone,
+            elapsed_time=self.tick_interval
+        )
+
+        # Log coordinates every tick under external rental
+        self.rbroadcast.log_coord(
+            external_rental_id,
+            scooter.lat,
+            scooter.lng,
+            scooter.speed_kmh,
+        )
+
+        # Publish state
+        publish_payload = {
+            "id": scooter.id,
+            "lat": round(scooter.lat, 7),
+            "lng": round(scooter.lng, 7),
+            "bat": round(scooter.battery, 1),
+            "st": scooter.status,
+            "spd": scooter.speed_kmh,
+            "inChargingZone": in_charging_zone
+        }
+        scooter.rbroadcast.broadcast_state(publish_payload)
+
+    def _enforce_out_of_bounds(self, scooter, current_time):
+        """
+        Permanently deactivate a scooter found out of bounds, locking its position and
+        force-completing any sim-owned rental.
+        """
+        state = self.states[scooter.id]
+        scooter.status = "deactivated"
+
+        # Canonical status update should happen after first applying the lock
+        if not state.locks & LOCK_OUTOFBOUNDS:
+            self._update_bike_status_position_db_first(scooter, "deactivated")
+
+        if not state.locks & LOCK_DEACTIVATED:
+            def permanent_lock(scooter, elapsed_time):
+                """Special override: scooter is out of bounds - deactivated, awaiting pickup."""
+                return {
+                    "lat": scooter.lat,
+                    "lng": scooter.lng,
+                    "speed_kmh": 0.0,
+                    "activity": "deactivated",
+                    "route_finished": False
+                }
+
+            state.special_behavior = permanent_lock
+            state.locks |= LOCK_DEACTIVATED | LOCK_OUTOFBOUNDS
+
+            print(f"Scooter {scooter.id} permanently deactivated - out of bounds")
+
+            # Force-complete any active rental (sim-owned only)
+            rental_state = state.rental
+            if rental_state.active:
+                print(f"Forcing completion of active rental {rental_state.rental_id} due to out-of-bounds")
+
+                self._complete_rental_and_publish(
+                    scooter,
+                    rental_state,
+                    end_zone="outofbounds",
+                    current_time=current_time
+                )
+
+                self._return_user_to_pool(rental_state)
+                rental_state.reset()
+
+        else:
+            # Ensure the out-of-bounds reason is recorded even if already locked by another reason.
+            state.locks |= LOCK_OUTOFBOUNDS
 
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Decide how a scooter should move this given tick
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~            
-    def _resolve_movement_for_scooter(self, scooter, route):
+    def _resolve_movement_for_scooter(self, scooter, route_direction):
         """
         Returns movement update for one tick.
         If a special behavior is active for this scooter → use it.
-        Otherwise → normal route-following movement (when route is present).
+        Otherwise → normal route-following movement (when a route_table.RouteDirection is given).
         """
-        scooter_id = scooter.id
-        special_behavior = self.per_scooter_special_behavior.get(scooter_id)
+        special_behavior = self.states[scooter.id].special_behavior
 
         if special_behavior is not None:
-            result = special_behavior(scooter, UPDATE_INTERVAL)
+            result = special_behavior(scooter, self.tick_interval)
             if result is not None:
                 return {
                     "lat": result.get("lat", scooter.lat),
@@ -817,7 +1209,7 @@ class Simulator:
                 }
 
         # No route present === stand still by default
-        if not route:
+        if route_direction is None:
             return {
                 "lat": scooter.lat,
                 "lng": scooter.lng,
@@ -827,7 +1219,7 @@ class Simulator:
             }
 
         # Normal route movement
-        return self.compute_update(scooter, route)
+        return self.compute_update(scooter, route_direction)
    
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -835,48 +1227,40 @@ class Simulator:
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def _handle_rental_tick(self, scooter, prev_lat, prev_lng, route_finished, current_time):
         scooter_id = scooter.id
-        rental_state = self.rentals[scooter_id]
+        state = self.states[scooter_id]
+        rental_state = state.rental
 
         # If scooter is under external rental control, do not auto-start/auto-end rentals here.
-        if self.external_rentals[scooter_id]["active"]:
+        if state.external_active:
             return
 
         # ~~~~~START RENTAL~~~~~
         if self.can_start_rental(scooter):
-            rental_state["active"] = True
-            rental_state["rental_id"] = self._new_rental_id()
-            rental_state["start_zone"] = self.classify_zone_at_point(prev_lat, prev_lng)
+            rental_state.active = True
+            rental_state.rental_id = self._new_rental_id()
+            rental_state.start_zone = self.classify_zone_at_point(prev_lat, prev_lng)
 
             self._assign_user(rental_state)
 
-            real_data = create_rental(
-                customer_id=rental_state["user_id"],
-                bike_id=scooter_id,
-                start_point={"lat": float(scooter.lat), "lng": float(scooter.lng)},
-                start_zone=rental_state["start_zone"],
-            )
-
-            real_id = real_data.get("rental_id") if isinstance(real_data, dict) else None
-            if real_id:
-                rental_state["rental_id"] = real_id
+            self._create_rental_db_first(scooter, rental_state)
 
             # Canonical status update to active (only if rentable)
             if scooter.status not in NON_RENTABLE_STATUSES:
                 self._update_bike_status_position_db_first(scooter, "active")
 
-            self.rbroadcast.clear_coords(rental_state["rental_id"])
+            self.rbroadcast.clear_coords(rental_state.rental_id)
             # Log first coordinate with 0 speed (realistic start)
             self.rbroadcast.log_coord(
-                rental_state["rental_id"],
+                rental_state.rental_id,
                 scooter.lat,
                 scooter.lng,
                 0.0  # Start from standstill
             )
 
         # ~~~~~LOG COORDINATES~~~~~
-        if scooter.status == "active" and rental_state["active"] and rental_state["rental_id"]:
+        if scooter.status == "active" and rental_state.active and rental_state.rental_id:
             self.rbroadcast.log_coord(
-                rental_state["rental_id"],
+                rental_state.rental_id,
                 scooter.lat,
                 scooter.lng,
                 scooter.speed_kmh,
@@ -886,18 +1270,18 @@ class Simulator:
         if not route_finished:
             return
 
-        if not rental_state["active"]:
+        if not rental_state.active:
             return
 
-        if not rental_state["rental_id"]:
+        if not rental_state.rental_id:
             return
 
-        rental_state["end_zone"] = self.classify_zone_at_point(scooter.lat, scooter.lng)
+        rental_state.end_zone = self.classify_zone_at_point(scooter.lat, scooter.lng)
 
         self._complete_rental_and_publish(
             scooter,
             rental_state,
-            end_zone=rental_state["end_zone"],
+            end_zone=rental_state.end_zone,
             current_time=current_time
         )
 
@@ -908,6 +1292,25 @@ class Simulator:
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Rental helpers
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _create_rental_db_first(self, scooter, rental_state):
+        """
+        Create the rental in the DB, and adopt the rental_id it was given there
+        (the generated one is kept when the API call fails).
+        """
+        real_data = self.profiler.timed(
+            "backend_http",
+            create_rental,
+            customer_id=rental_state.user_id,
+            bike_id=scooter.id,
+            start_point={"lat": float(scooter.lat), "lng": float(scooter.lng)},
+            start_zone=rental_state.start_zone,
+        )
+
+        real_id = real_data.get("rental_id") if isinstance(real_data, dict) else None
+        if real_id:
+            rental_state.rental_id = real_id
+
+
     def _assign_user(self, rental_state):
         """
         Assign a user from the pool or fall back to a simulated user
@@ -918,23 +1321,23 @@ class Simulator:
         else:
             user = {"user_id": 1, "user_name": "Simulated User"}
 
-        rental_state["user_id"] = user["user_id"]
-        rental_state["user_name"] = user["user_name"]
+        rental_state.user_id = user["user_id"]
+        rental_state.user_name = user["user_name"]
 
 
     def _publish_completed_rental(self, scooter, rental_state, current_time, coords):
         """
         Publish completed rental summary to Redis
         """
-        self.rbroadcast.publish_completed({
+        self.profiler.timed("redis", self.rbroadcast.publish_completed, {
             "type": "completed_rental",
-            "rental_id": rental_state["rental_id"],
+            "rental_id": rental_state.rental_id,
             "scooter_id": scooter.id,
             "coords": coords,
-            "user_id": rental_state.get("user_id"),
-            "user_name": rental_state.get("user_name"),
-            "start_zone": rental_state.get("start_zone"),
-            "end_zone": rental_state.get("end_zone"),
+            "user_id": rental_state.user_id,
+            "user_name": rental_state.user_name,
+            "start_zone": rental_state.start_zone,
+            "end_zone": rental_state.end_zone,
         })
 
 
@@ -942,10 +1345,10 @@ class Simulator:
         """
         Make user available for future simulated rentals
         """
-        if rental_state.get("user_id") is not None:
+        if rental_state.user_id is not None:
             self.user_pool.append({
-                "user_id": rental_state["user_id"],
-                "user_name": rental_state["user_name"],
+                "user_id": rental_state.user_id,
+                "user_name": rental_state.user_name,
             })
 
 
@@ -953,88 +1356,90 @@ class Simulator:
         """
         Update trip count and end or continue simulation
         """
-        scooter_id = scooter.id
-        next_trip_count = self.trip_counter[scooter_id] + 1
+        state = self.states[scooter.id]
 
-        self.trip_counter[scooter_id] = next_trip_count
-        self._reset_rental_state(rental_state)
+        state.trip_counter += 1
+        rental_state.reset()
 
         # If we dipped below threshold during the ride, lock now that rental is over
-        if scooter.id in self.pending_battery_lock or scooter.battery < LOW_BATTERY_THRESHOLD:
-            self.pending_battery_lock.discard(scooter.id)
+        if state.locks & LOCK_PENDING_BATTERY or scooter.battery < LOW_BATTERY_THRESHOLD:
+            state.locks &= ~LOCK_PENDING_BATTERY
             self._apply_battery_lock(scooter)
 
         in_charging = self._is_in_charging_zone(scooter)
         scooter.end_trip(in_charging_zone=in_charging)
 
 
-    def _reset_rental_state(self, rental_state):
-        """
-        Clear per-rental state for next trip
-        """
-        rental_state.update({
-            "active": False,
-            "rental_id": None,
-            "user_id": None,
-            "user_name": None,
-            "start_zone": "free",
-            "end_zone": "free",
-        })
-
-
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Normal route - next movement on tick
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def compute_update(self, scooter, route):
+    def compute_update(self, scooter, route_direction):
         """
         Calculates the scooter's next position, speed, and activity for this tick
         when following a normal route (no special behavior override).
 
         It:
 
-        * Moves smoothly toward the next waypoint at constant max-speed on straights
-        * Detects when a full route is finished (triggers rental end)
-        * Applies realistic slowdown during turns
+        * Moves smoothly along the route at constant max-speed, spending the tick's whole
+          distance budget across as many waypoints as it reaches (so long ticks do not stall
+          at every waypoint)
+        * Detects when a full route is finished (triggers rental end, the rest of the budget is dropped)
+        * Reports the average speed over the distance actually traveled
+        * Applies realistic slowdown during turns: the sharpest turn taken this tick slows it
+          down by its precomputed factor (route_table.RouteDirection.turn_slowdown)
+
+        route_direction is the compiled route in the direction of the current trip; all
+        segment lengths and turn factors come from it.
 
         This is the default, reasonably realistic movement every scooter uses
         unless a special per-scooter scenario overrides it.
 
         Uses some helpful boilerplate constructions, and the calculate_distance_in_m-function
         brought in from utils.py, for the calculations.
-        """
-        scooter_id = scooter.id
-        route_state = self.next_waypoint_index[scooter_id]
-        current_index = route_state["route_index"]
-        target_point = route[current_index]
-
-        distance_to_target = calculate_distance_in_m((scooter.lat, scooter.lng), target_point)
-        max_distance_this_tick = NOMINAL_MAX_SPEED_MPS * UPDATE_INTERVAL
-
-        if distance_to_target <= max_distance_this_tick:
-            new_lat, new_lng = target_point
-            route_state["route_index"] += 1
-            route_finished = route_state["route_index"] >= len(route)
-            if route_finished:
-                route_state["route_index"] = 0
-        else:
-            fraction = max_distance_this_tick / distance_to_target
-            new_lat = scooter.lat + (target_point[0] - scooter.lat) * fraction
-            new_lng = scooter.lng + (target_point[1] - scooter.lng) * fraction
-            route_finished = False
-
-        distance_traveled_meters = calculate_distance_in_m((scooter.lat, scooter.lng), (new_lat, new_lng))
-        raw_speed_kmh = distance_traveled_meters / UPDATE_INTERVAL * 3.6
-
-        previous_travel_direction = self.last_travel_direction[scooter_id]
-        current_travel_direction = math.atan2(new_lng - scooter.lng, new_lat - scooter.lat)
 
-        if previous_travel_direction is not None:
-            travel_direction_change = abs(current_travel_direction - previous_travel_direction)
-            travel_direction_change = min(travel_direction_change, abs(math.pi * 2 - travel_direction_change))
-            turn_slowdown = 1 - min(travel_direction_change / math.pi, 0.4)
-            raw_speed_kmh *= turn_slowdown
-
-        self.last_travel_direction[scooter_id] = current_travel_direction
+        kinematics.route_kinematics is the batched equivalent, used by the fleet engine;
+        keep the two in step.
+        """
+        state = self.states[scooter.id]
+        current_index = state.route_index
+
+        route = route_direction.waypoints
+        segment_lengths = route_direction.segment_lengths
+        turn_slowdown = route_direction.turn_slowdown
+
+        new_lat, new_lng = scooter.lat, scooter.lng
+        distance_budget = NOMINAL_MAX_SPEED_MPS * self.tick_interval
+        distance_traveled_meters = 0.0
+        route_finished = False
+        slowdown = 1.0
+
+        # Hop over every waypoint within reach this tick
+        distance_to_target = calculate_distance_in_m((new_lat, new_lng), route[current_index])
+        while distance_to_target <= distance_budget:
+            distance_budget -= distance_to_target
+            distance_traveled_meters += distance_to_target
+            new_lat, new_lng = route[current_index]
+            slowdown = min(slowdown, turn_slowdown[current_index])
+            current_index += 1
+
+            # End of the route ends the trip (and the rental) - the rest of the budget is not used
+            if current_index >= len(route):
+                route_finished = True
+                current_index = 0
+                break
+
+            distance_to_target = segment_lengths[current_index - 1]
+
+        # Then cover what is left of the budget towards the next waypoint
+        if not route_finished and distance_budget > 0:
+            target_point = route[current_index]
+            fraction = distance_budget / distance_to_target
+            new_lat = new_lat + (target_point[0] - new_lat) * fraction
+            new_lng = new_lng + (target_point[1] - new_lng) * fraction
+            distance_traveled_meters += distance_budget
+
+        state.route_index = current_index
+        raw_speed_kmh = distance_traveled_meters / self.tick_interval * 3.6 * slowdown
         final_speed_kmh = round(raw_speed_kmh, 2)
 
         return {
@@ -1049,12 +1454,15 @@ class Simulator:
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Charging zone detection - now uses accurate polygon from City object
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def _is_in_charging_zone(self, scooter):
+    def _is_in_charging_zone(self, scooter, zone=None):
         """
         Returns true if scooter is found to be in charging zone and not active.
+        zone: the scooter's classification at its current position, when already known.
         """
         if scooter.status == "active":
             return False
+        if zone is not None:
+            return zone == 'charging'
         return self.city.is_inside(scooter.lat, scooter.lng, 'charging')
 
 
@@ -1067,7 +1475,54 @@ class Simulator:
         charging -> parking -> city (free) -> slow -> outofbounds
         """
         return self.city.classify_zone(lat, lng)
-    
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Zone intervals along the routes
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _current_route_zones(self):
+        """
+        The route_zones.RouteZones of the city's current zones - computed on first use, and
+        again whenever the city's zones were reloaded since.
+        """
+        if self.route_zones is None or not self.route_zones.is_current(self.city):
+            started = time.perf_counter()
+            self.route_zones = RouteZones(self.city, self.route_tables)
+            print(
+                f"[GEO] Zone intervals along {len(self.route_zones.directions)} route(s) "
+                f"({self.route_zones.stretch_count()} stretches) in {time.perf_counter() - started:.2f}s"
+            )
+        return self.route_zones
+
+    def _check_zone_caches(self):
+        """
+        Drop every zone cached per scooter position once the city's zones were reloaded
+        (City.set_zones) - the position still matches, the zone may not.
+        """
+        if self._zone_caches_version != self.city.zones_version:
+            self._invalidate_zone_caches()
+            self._zone_caches_version = self.city.zones_version
+
+    def _invalidate_zone_caches(self):
+        """
+        Dormant scooters keep the zone they fell asleep in - put them back on the full path.
+        """
+        for state in self.states.values():
+            state.dormant = None
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Zone speed caps
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def zone_speed_caps(self):
+        """
+        Speed cap (km/h) per zone type: DB limit (or 5 km/h) for slow/parking/charging.
+        Zone types without a cap are not in the dict.
+        """
+        caps = {}
+        for zone_type in SPEED_LIMITED_ZONES:
+            db_limit = self.city.get_speed_limit(zone_type)
+            caps[zone_type] = db_limit if db_limit is not None else DEFAULT_ZONE_SPEED_LIMIT
+        return caps
+
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Can start rental?-check
@@ -1076,18 +1531,18 @@ class Simulator:
         """
         Determines if a scooter is eligible to start a new rental.
         """
-        rental_state = self.rentals[scooter.id]
+        state = self.states[scooter.id]
 
         # External rentals - simulator must never auto-start.
-        if self.external_rentals[scooter.id]["active"]:
+        if state.external_active:
             return False
 
         # Already rented? Denied.
-        if rental_state["active"]:
+        if state.rental.active:
             return False
 
         # Route missing? Denied.
-        if scooter.id not in self.scooter_to_route:
+        if state.route_id is None:
             return False
 
         # Battery <20%? Denied.
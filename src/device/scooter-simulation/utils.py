@@ -6,6 +6,11 @@ Provides utility functions for the scooter simulation.
 """
 
 import math
+import hashlib
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000  # ~Earth radius in meters
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Calculate distance in meters
@@ -23,8 +28,6 @@ def calculate_distance_in_m(coord1, coord2):
 
     @return == Distance in meters as a float.
     """
-    EARTH_RADIUS_M = 6_371_000  # ~Earth radius in meters
-
     lat1_rad, lon1_rad = math.radians(coord1[0]), math.radians(coord1[1])
     lat2_rad, lon2_rad = math.radians(coord2[0]), math.radians(coord2[1])
 
@@ -36,3 +39,66 @@ def calculate_distance_in_m(coord1, coord2):
 
     return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(haversine))
 
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Calculate distances in meters (vectorized)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def calculate_distances_in_m(lat1, lng1, lat2, lng2):
+    """
+    Array version of calculate_distance_in_m: element-wise haversine distances in metres
+    between (lat1, lng1) and (lat2, lng2), all given as equally shaped NumPy arrays.
+    """
+    lat1_rad, lon1_rad = np.radians(lat1), np.radians(lng1)
+    lat2_rad, lon2_rad = np.radians(lat2), np.radians(lng2)
+
+    delta_lat = lat2_rad - lat1_rad
+    delta_lon = lon2_rad - lon1_rad
+
+    haversine = (np.sin(delta_lat / 2) ** 2 +
+                 np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon / 2) ** 2)
+
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(haversine))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Route segment lengths
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def calculate_segment_lengths_in_m(waypoints):
+    """
+    Length in meters of every segment of a route: element i is the distance from
+    waypoint i to waypoint i + 1 (one element less than there are waypoints).
+    """
+    return [
+        calculate_distance_in_m(waypoints[i], waypoints[i + 1])
+        for i in range(len(waypoints) - 1)
+    ]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Scooter id normalization
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def normalize_scooter_id(scooter_id):
+    """
+    Canonical form of a scooter id, for lookups that must tolerate int/str mismatches:
+    numeric ids (also when given as strings, as they arrive from Redis) become ints,
+    anything else its string.
+    """
+    try:
+        return int(scooter_id)
+    except (TypeError, ValueError):
+        return str(scooter_id)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Stable per-scooter bucket
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def stable_bucket(scooter_id, buckets, salt=""):
+    """
+    Bucket 0..buckets-1 for a scooter id, the same in every process and on every run.
+    Numeric ids given as strings (as they arrive from Redis) land in the same bucket as ints.
+    Each salt gives an independent spread, so e.g. the phase slots within one shard stay balanced.
+    """
+    key = str(normalize_scooter_id(scooter_id))
+
+    digest = hashlib.blake2b(key.encode(), digest_size=8, salt=salt.encode()).digest()
+    return int.from_bytes(digest, "big") % buckets
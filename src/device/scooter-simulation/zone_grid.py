@@ -0,0 +1,233 @@
+"""
+@module zone_grid
+
+Rasterized zone lookup: the city's zone classification precomputed on a grid of small cells.
+
+Zones are static for hours at a time, so for very large fleets the classification of a
+position can be read from a grid over the zones' bounding box (e.g. 2 m cells), one array
+index per lookup. Every cell stores the resolved zone code of the whole cell, or AMBIGUOUS
+for cells that a polygon boundary passes through (or comes close to) - those, and only
+those, are looked up with the exact Shapely test by the City.
+
+The grid is painted polygon by polygon, lowest priority first, so a cell ends up with the
+code of the highest priority zone holding its centre: an even-odd scanline fill per cell
+row over all rings of the polygon (holes included). Boundary cells are found by walking
+every ring edge in half-cell steps and marking the 3x3 cells around each step - a margin
+that also absorbs rounding between degrees and cells. Outside the boundary cells a whole
+cell is on one side of every edge, so its centre's zone is the zone of every point in it.
+
+The grid is padded by two cells on every side: a position outside the grid is outside
+every polygon's bounding box, i.e. out of bounds.
+
+Grids can be saved to / loaded from disk (.npz), keyed by a fingerprint of the zones and
+the cell size, so a grid is only reused for exactly the zones it was built from.
+"""
+
+import hashlib
+import math
+import os
+
+import numpy as np
+import shapely
+
+
+# Cell code of cells a polygon boundary passes through
+AMBIGUOUS = -1
+
+METERS_PER_DEG_LAT = 111_320.0
+
+# Padding (cells) around the zones' bounding box
+PADDING = 2
+
+
+class ZoneGrid:
+    """
+    Zone codes of the cells of a grid over (lng, lat): codes[row, col] covers
+    lng origin_lng + col * cell_lng .. + cell_lng, lat origin_lat + row * cell_lat .. + cell_lat.
+    """
+    def __init__(self, codes, origin_lng, origin_lat, cell_lng, cell_lat, cell_m, outside_code, fingerprint=None):
+        self.codes = codes
+        self.origin_lng = origin_lng
+        self.origin_lat = origin_lat
+        self.cell_lng = cell_lng
+        self.cell_lat = cell_lat
+        self.cell_m = cell_m
+        self.outside_code = outside_code
+        self.fingerprint = fingerprint
+        self.rows, self.cols = codes.shape
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def ambiguous_share(self):
+        """
+        Share (0..1) of the cells that fall back to the exact test.
+        """
+        return float(np.count_nonzero(self.codes == AMBIGUOUS)) / self.codes.size if self.codes.size else 0.0
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Lookups
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def lookup(self, lat, lng):
+        """
+        Zone code of the cell holding (lat, lng), AMBIGUOUS when it needs the exact test.
+        """
+        col = (lng - self.origin_lng) / self.cell_lng
+        row = (lat - self.origin_lat) / self.cell_lat
+        if 0.0 <= col < self.cols and 0.0 <= row < self.rows:
+            return int(self.codes[int(row), int(col)])
+        if math.isnan(col) or math.isnan(row):
+            return AMBIGUOUS
+        return self.outside_code
+
+    def lookup_many(self, lats, lngs):
+        """
+        lookup() over arrays of positions, as an int8 array.
+        """
+        cols = (np.asarray(lngs, dtype=np.float64) - self.origin_lng) / self.cell_lng
+        rows = (np.asarray(lats, dtype=np.float64) - self.origin_lat) / self.cell_lat
+
+        codes = np.full(cols.shape, self.outside_code, dtype=np.int8)
+        codes[np.isnan(cols) | np.isnan(rows)] = AMBIGUOUS
+
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        codes[inside] = self.codes[rows[inside].astype(np.intp), cols[inside].astype(np.intp)]
+        return codes
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Building
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    @classmethod
+    def build(cls, layers, cell_m, outside_code, fingerprint=None):
+        """
+        Rasterize layers [(zone code, polygons), ...], lowest priority first, on cells of
+        about cell_m x cell_m meters. Cells in no polygon get outside_code.
+        """
+        polygons = [poly for _, layer in layers for poly in layer]
+        if polygons:
+            min_lng, min_lat, max_lng, max_lat = shapely.total_bounds(polygons)
+        else:
+            min_lng = min_lat = max_lng = max_lat = 0.0
+
+        cell_lat = cell_m / METERS_PER_DEG_LAT
+        cell_lng = cell_m / (METERS_PER_DEG_LAT * math.cos(math.radians((min_lat + max_lat) / 2)))
+
+        origin_lng = min_lng - PADDING * cell_lng
+        origin_lat = min_lat - PADDING * cell_lat
+        cols = int(math.ceil((max_lng - min_lng) / cell_lng)) + 2 * PADDING
+        rows = int(math.ceil((max_lat - min_lat) / cell_lat)) + 2 * PADDING
+
+        grid = cls(
+            np.full((rows, cols), outside_code, dtype=np.int8),
+            origin_lng, origin_lat, cell_lng, cell_lat, cell_m, outside_code, fingerprint
+        )
+
+        for code, layer in layers:
+            for poly in layer:
+                grid._fill(grid._rings(poly), code)
+
+        for poly in polygons:
+            for ring in grid._rings(poly):
+                grid._mark_boundary(ring)
+
+        return grid
+
+    def _rings(self, poly):
+        """
+        Every ring (exterior and holes, of every part) of a polygon, as (col, row) arrays in
+        cell units.
+        """
+        rings = shapely.get_rings(shapely.get_parts(poly))
+        scale = np.array([self.cell_lng, self.cell_lat])
+        origin = np.array([self.origin_lng, self.origin_lat])
+        return [(shapely.get_coordinates(ring) - origin) / scale for ring in rings]
+
+    def _fill(self, rings, code):
+        """
+        Set code on every cell whose centre is inside the rings (even-odd).
+        """
+        edges = np.concatenate([np.stack([ring[:-1], ring[1:]], axis=1) for ring in rings])
+        (x0, y0), (x1, y1) = edges[:, 0].T, edges[:, 1].T
+
+        # Rows whose centre line (row + 0.5) each edge crosses, half-open in y
+        low, high = np.minimum(y0, y1), np.maximum(y0, y1)
+        first = np.ceil(low - 0.5).astype(np.intp)
+        last = np.ceil(high - 0.5).astype(np.intp) - 1
+        counts = np.maximum(last - first + 1, 0)
+        if not counts.sum():
+            return
+
+        edge = np.repeat(np.arange(len(edges)), counts)
+        row = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        y = row + 0.5
+        x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+
+        # Crossings sorted per row pair up into inside spans [x_in, x_out)
+        order = np.lexsort((x, row))
+        row, x = row[order], x[order]
+        for r, x_in, x_out in zip(row[0::2], x[0::2], x[1::2]):
+            first_col = max(int(math.ceil(x_in - 0.5)), 0)
+            last_col = min(int(math.ceil(x_out - 0.5)), self.cols)
+            if first_col < last_col:
+                self.codes[r, first_col:last_col] = code
+
+    def _mark_boundary(self, ring):
+        """
+        Mark every cell within a cell of the ring's edges AMBIGUOUS.
+        """
+        start, end = ring[:-1], ring[1:]
+        steps = np.maximum(np.ceil(np.hypot(*(end - start).T) * 2).astype(np.intp), 1) + 1
+
+        edge = np.repeat(np.arange(len(start)), steps)
+        t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps - 1, steps)
+        points = start[edge] + (end[edge] - start[edge]) * t[:, None]
+
+        cells = np.floor(points).astype(np.intp)
+        for d_col in (-1, 0, 1):
+            for d_row in (-1, 0, 1):
+                self.codes[
+                    np.clip(cells[:, 1] + d_row, 0, self.rows - 1),
+                    np.clip(cells[:, 0] + d_col, 0, self.cols - 1)
+                ] = AMBIGUOUS
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Disk cache
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            codes=self.codes,
+            geometry=np.array([self.origin_lng, self.origin_lat, self.cell_lng, self.cell_lat, self.cell_m]),
+            outside_code=np.array(self.outside_code),
+            fingerprint=np.array(self.fingerprint or ""),
+        )
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """
+        The grid saved at path, None when there is none - or it was built from other zones
+        (fingerprint differs).
+        """
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            if fingerprint is not None and str(data["fingerprint"]) != fingerprint:
+                return None
+            origin_lng, origin_lat, cell_lng, cell_lat, cell_m = data["geometry"].tolist()
+            return cls(
+                data["codes"], origin_lng, origin_lat, cell_lng, cell_lat, cell_m,
+                int(data["outside_code"]), fingerprint
+            )
+
+
+def zones_fingerprint(zones_wkt, cell_m):
+    """
+    Digest of zone definitions (backend format) and a cell size, identifying a grid.
+    """
+    digest = hashlib.sha256(repr(cell_m).encode())
+    for zone in zones_wkt:
+        digest.update(zone['zone_type'].lower().encode())
+        digest.update(zone['coordinates_wkt'].encode())
+    return digest.hexdigest()[:32]